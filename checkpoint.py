@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+
+#written to checkpoint long running analyses (FVA, SteadyCom sweeps) to an append-only JSONL file, so that a job
+#which gets killed can be restarted and skip everything that already finished. The settings of the run (fixed rates,
+#fraction of optimum...) are kept in a header line, and a file written with other settings is not resumed from or
+#added to, so results of two different problems are never mixed
+
+import json
+import os
+
+#returns a value the way it comes back from a checkpoint file, for comparing settings with those in a file
+#anything that is not JSON serializable becomes a string
+#value - value to convert, such as a dictionary of settings
+def as_stored(value):
+
+    return json.loads(json.dumps(value,sort_keys=True,default=str))
+
+#the first line of the file is the header: {"header": settings}, each line after it is one finished item:
+#{"key": ..., "record": ...}
+class Checkpoint(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #path - path of the JSONL file, created on the first write if it does not exist
+    #settings - dictionary of the settings of the run, JSON serializable (anything else is compared as a string), None
+    #           to not check the settings
+    def __init__(self,path,settings=None):
+
+        self.path = path
+
+        #kept the way they come back from the file, so they compare equal to the header
+        self.settings = None if settings is None else as_stored(settings)
+
+        #the file is only opened when the first record is written
+        self.file = None
+
+    #returns the settings in the header of the file, None if the file is empty or has no header
+    def header(self):
+
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+
+            return None
+
+        with open(self.path,'r') as checkpoint_file:
+
+            try:
+
+                entry = json.loads(checkpoint_file.readline())
+
+            except ValueError:
+
+                return None
+
+        return entry.get('header') if isinstance(entry,dict) else None
+
+    #raises a ValueError if the file has items and was written with settings other than those of this Checkpoint
+    def check_settings(self):
+
+        if self.settings is None or not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+
+            return
+
+        header = self.header()
+
+        if header != self.settings:
+
+            raise ValueError("checkpoint "+str(self.path)+" was written with settings "+str(header)+", not "+str(self.settings))
+
+    #reads every finished item from the file
+    #returns a dictionary of records keyed by item key, a line cut short by a killed job is ignored
+    def load(self):
+
+        records = {}
+
+        if not os.path.exists(self.path):
+
+            return records
+
+        self.check_settings()
+
+        with open(self.path,'r') as checkpoint_file:
+
+            for line in checkpoint_file:
+
+                try:
+
+                    entry = json.loads(line)
+
+                except ValueError:
+
+                    #this will be the last line if the job was killed while writing it
+                    continue
+
+                #the header is not an item
+                if 'key' not in entry:
+
+                    continue
+
+                records[entry['key']] = entry['record']
+
+        return records
+
+    #appends one finished item to the file and flushes it, so that it survives the job being killed
+    #key - item key, such as a reaction id or a scenario name
+    #record - JSON serializable results of the item, anything else (e.g. timedelta) is written as a string
+    def write(self,key,record):
+
+        if self.file is None:
+
+            #never add to the items of another run
+            self.check_settings()
+
+            #make sure a line cut short by a killed job does not swallow the first new record
+            needs_newline = False
+
+            is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+            if not is_new:
+
+                with open(self.path,'rb') as checkpoint_file:
+
+                    checkpoint_file.seek(-1,os.SEEK_END)
+
+                    needs_newline = checkpoint_file.read(1) != b"\n"
+
+            self.file = open(self.path,'a')
+
+            if needs_newline:
+
+                self.file.write("\n")
+
+            if is_new and self.settings is not None:
+
+                self.file.write(json.dumps({'header': self.settings})+"\n")
+
+        self.file.write(json.dumps({'key': key, 'record': record},default=str)+"\n")
+        self.file.flush()
+
+    #closes the file if it is open
+    def close(self):
+
+        if self.file is not None:
+
+            self.file.close()
+
+            self.file = None
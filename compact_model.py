@@ -0,0 +1,265 @@
+#!/usr/bin/python
+
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+
+#written to skip parsing the SBML files at the start of every job, each SBML file is converted once into a folder of
+#numpy arrays (the stoichiometric matrix in compressed sparse column form, the bounds and the objective) and a JSON
+#file of string tables (ids, names, formulas, compartments, gene reaction rules). The arrays are memory-mapped, so
+#worker processes can open the same files without each reading a copy, and a cobra model is only made when asked for
+#note that annotations and notes are not kept, everything needed to build and solve the models is
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy
+import scipy.sparse
+
+import cobra
+from cobra import Model, Reaction, Metabolite, Gene
+from cobra.util.array import create_stoichiometric_matrix
+
+#bump this whenever the files written by convert_sbml change
+FORMAT_VERSION = 1
+
+#folder the converted models are kept in when no other is given, inside the default folder of model_cache.ModelCache
+#(which only touches its own .pkl files), so converting does not leave folders next to the SBML files
+STORE_DIR = os.path.join('steadycom_cache','models')
+
+#names of the array files in the folder of a model
+ARRAY_NAMES = ["S_data", "S_indices", "S_indptr", "lower_bounds", "upper_bounds", "objective"]
+
+class CompactModel(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #path - folder written by convert_sbml
+    #mmap_mode - as for numpy.load, 'r' to memory-map the arrays read only, None to read them into memory
+    def __init__(self,path,mmap_mode='r'):
+
+        self.path = path
+
+        with open(os.path.join(path,"tables.json"),'r') as tables_file:
+
+            self.tables = json.load(tables_file)
+
+        self.id = self.tables['id']
+        self.name = self.tables['name']
+
+        self.reaction_ids = self.tables['reactions']['id']
+        self.metabolite_ids = self.tables['metabolites']['id']
+
+        arrays = {name: numpy.load(os.path.join(path,name+".npy"),mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+
+        self.lower_bounds = arrays['lower_bounds']
+        self.upper_bounds = arrays['upper_bounds']
+        self.objective = arrays['objective']
+
+        #the sparse matrix is made over the memory-mapped arrays, not a copy of them
+        self.S = scipy.sparse.csc_matrix((arrays['S_data'],arrays['S_indices'],arrays['S_indptr']),shape=(len(self.metabolite_ids),len(self.reaction_ids)),copy=False)
+
+        #cobra model, only made by to_cobra
+        self.model = None
+
+    #returns the cobra model, made from the arrays and tables the first time it is asked for
+    def to_cobra(self):
+
+        if self.model is not None:
+
+            return self.model
+
+        model = Model(self.id,name=self.name)
+
+        mets = self.tables['metabolites']
+
+        new_mets = [Metabolite(mets['id'][i],formula=mets['formula'][i],name=mets['name'][i],charge=mets['charge'][i],compartment=mets['compartment'][i]) for i in range(len(mets['id']))]
+
+        rxns = self.tables['reactions']
+
+        new_rxns = []
+
+        objective = {}
+
+        for j in range(len(rxns['id'])):
+
+            new_rxn = Reaction(rxns['id'][j],name=rxns['name'][j],subsystem=rxns['subsystem'][j],lower_bound=float(self.lower_bounds[j]),upper_bound=float(self.upper_bounds[j]))
+
+            new_rxn.gene_reaction_rule = rxns['gene_reaction_rule'][j]
+
+            #column of the stoichiometric matrix of this reaction
+            start = self.S.indptr[j]
+            end = self.S.indptr[j + 1]
+
+            new_rxn.add_metabolites({new_mets[row]: float(value) for row, value in zip(self.S.indices[start:end], self.S.data[start:end])})
+
+            if self.objective[j] != 0:
+
+                objective[new_rxn] = float(self.objective[j])
+
+            new_rxns.append(new_rxn)
+
+        #add everything to the model at once
+        model.add_metabolites(new_mets)
+        model.add_reactions(new_rxns)
+
+        model.compartments = self.tables['compartments']
+
+        #genes of no gene reaction rule are not made by add_reactions, they are added the way cobra.io does and
+        #model.repair() below points them to the model
+        model.genes.extend([Gene(gene_id) for gene_id in self.tables['gene_names'] if gene_id not in model.genes])
+
+        #gene names are not part of the gene reaction rules
+        for gene in model.genes:
+
+            gene.name = self.tables['gene_names'].get(gene.id,"")
+
+        model.objective = objective
+
+        #need to sprinkle these around whenever changing the model so changes stick correctly
+        model.solver.update()
+        model.repair()
+
+        self.model = model
+
+        return model
+
+#returns the SHA-256 hex digest of the content of a file
+#file_path - path of the file
+def file_hash(file_path):
+
+    digest = hashlib.sha256()
+
+    with open(file_path,'rb') as source_file:
+
+        for chunk in iter(lambda: source_file.read(1024**2), b""):
+
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+#returns the folder a converted SBML file is kept in
+#sbml_file - path of the SBML file
+#store_dir - folder to keep the converted models in, None for STORE_DIR
+def compact_path(sbml_file,store_dir=None):
+
+    if store_dir is None:
+
+        store_dir = STORE_DIR
+
+    return os.path.join(store_dir,os.path.splitext(os.path.basename(sbml_file))[0]+".model")
+
+#converts an SBML file to the compact format, returns the folder it was written to
+#sbml_file - path of the SBML file
+#path - folder to write, None for compact_path(sbml_file)
+#model - the model of the SBML file if it has been read already, otherwise it is read here
+def convert_sbml(sbml_file,path=None,model=None):
+
+    if path is None:
+
+        path = compact_path(sbml_file)
+
+    if model is None:
+
+        model = cobra.io.read_sbml_model(sbml_file)
+
+    stoich_matrix = create_stoichiometric_matrix(model,array_type='lil').tocsc()
+
+    arrays = {
+
+        'S_data': stoich_matrix.data.astype(numpy.float64),
+        'S_indices': stoich_matrix.indices.astype(numpy.int32),
+        'S_indptr': stoich_matrix.indptr.astype(numpy.int32),
+        'lower_bounds': numpy.array([rxn.lower_bound for rxn in model.reactions],dtype=numpy.float64),
+        'upper_bounds': numpy.array([rxn.upper_bound for rxn in model.reactions],dtype=numpy.float64),
+        'objective': numpy.array([rxn.objective_coefficient for rxn in model.reactions],dtype=numpy.float64),
+
+    }
+
+    tables = {
+
+        'format_version': FORMAT_VERSION,
+        'source_sha256': file_hash(sbml_file),
+        'id': model.id,
+        'name': model.name,
+        'compartments': dict(model.compartments),
+        'gene_names': {gene.id: gene.name for gene in model.genes},
+        'reactions': {
+
+            'id': [rxn.id for rxn in model.reactions],
+            'name': [rxn.name for rxn in model.reactions],
+            'subsystem': [rxn.subsystem for rxn in model.reactions],
+            'gene_reaction_rule': [rxn.gene_reaction_rule for rxn in model.reactions],
+
+        },
+        'metabolites': {
+
+            'id': [met.id for met in model.metabolites],
+            'name': [met.name for met in model.metabolites],
+            'formula': [met.formula for met in model.metabolites],
+            'charge': [met.charge for met in model.metabolites],
+            'compartment': [met.compartment for met in model.metabolites],
+
+        },
+
+    }
+
+    #write into a temporary folder and move it into place, so that a killed job never leaves half a model
+    temp_path = path+"."+str(os.getpid())+".tmp"
+
+    if os.path.exists(temp_path):
+
+        shutil.rmtree(temp_path)
+
+    os.makedirs(temp_path)
+
+    for name in ARRAY_NAMES:
+
+        numpy.save(os.path.join(temp_path,name+".npy"),arrays[name])
+
+    with open(os.path.join(temp_path,"tables.json"),'w') as tables_file:
+
+        json.dump(tables,tables_file)
+
+    if os.path.exists(path):
+
+        shutil.rmtree(path)
+
+    os.rename(temp_path,path)
+
+    return path
+
+#returns the CompactModel of an SBML file, converting the file first if it has not been or if it changed since
+#sbml_file - path of the SBML file
+#store_dir - folder to keep the converted models in, None for STORE_DIR
+#mmap_mode - as in CompactModel
+def open_sbml(sbml_file,store_dir=None,mmap_mode='r'):
+
+    path = compact_path(sbml_file,store_dir)
+
+    tables_path = os.path.join(path,"tables.json")
+
+    up_to_date = False
+
+    if os.path.exists(tables_path):
+
+        with open(tables_path,'r') as tables_file:
+
+            tables = json.load(tables_file)
+
+        up_to_date = tables.get('format_version') == FORMAT_VERSION and tables.get('source_sha256') == file_hash(sbml_file)
+
+    if not up_to_date:
+
+        convert_sbml(sbml_file,path)
+
+    return CompactModel(path,mmap_mode=mmap_mode)
+
+#returns the cobra model of an SBML file by way of the compact format, the drop in for cobra.io.read_sbml_model
+#sbml_file - path of the SBML file
+#store_dir - folder to keep the converted models in, None for STORE_DIR
+def read_model(sbml_file,store_dir=None):
+
+    return open_sbml(sbml_file,store_dir).to_cobra()
@@ -18,6 +18,8 @@ import warnings
 import re
 import cobra
 from datetime import datetime
+from instrument import Instrument
+from results import FluxResult
 
 import copy
 
@@ -29,11 +31,13 @@ class FBA(object):
     #initialization of class:
     #self - needs to be passed itself
     #model - model which FVA will be applied to
-    def __init__(self,model,bigM=1000):
+    #session - if True, run() reuses the solver problem of self.model instead of copying the model for every call
+    def __init__(self,model,bigM=1000,session=False):
 
         #add the models to the self object
         self.model = model.copy()
         self.bigM = bigM
+        self.session = session
 
         #update model pointers to make sure copied model works
         self.model.solver.update()
@@ -62,58 +66,75 @@ class FBA(object):
     #note that this only works for setting a single reaction as the objective
     def run(self,objective,obj_dir="max",fixed_rates=dict()):
 
+        #in session mode the optlang problem is built once, so skip the copy entirely
+        if self.session:
+
+            return self.run_session(objective,obj_dir,fixed_rates)
+
+        #time spent copying, building, updating/repairing and solving, returned as fba_results['phase_times']
+        timer = Instrument(report_step=None)
+
         #repair the self model before copying
-        self.model.solver.update()
-        self.model.repair()
+        with timer.phase("update_repair"):
+
+            self.model.solver.update()
+            self.model.repair()
         
         #make a copy of the model for fba
-        FBA_model = self.model.copy()
+        with timer.phase("copy"):
 
-        #try to make sure the model is good to go for solving
-        FBA_model.solver.update()
-        FBA_model.repair()
-        
-        #give the problem a name
-        FBA_model.problem.name = "flux balance analysis (FBA)"
+            FBA_model = self.model.copy()
 
-        #try to make sure the model is good to go for solving
-        FBA_model.solver.update()
-        FBA_model.repair()
+        with timer.phase("update_repair"):
+
+            #try to make sure the model is good to go for solving
+            FBA_model.solver.update()
+            FBA_model.repair()
+            
+            #give the problem a name
+            FBA_model.problem.name = "flux balance analysis (FBA)"
+
+            #try to make sure the model is good to go for solving
+            FBA_model.solver.update()
+            FBA_model.repair()
 
         #initialize an empty dictionary for returning with results
-        fba_results = { }
+        fba_results = FluxResult()
 
-        #change the objective if needed
-        obj_eqn = FBA_model.problem.Objective(Zero, direction=obj_dir)
+        #set the objective and the fixed rates
+        with timer.phase("build"):
 
-        #save a reaction index
-        rxn_index = 0
+            #change the objective if needed
+            obj_eqn = FBA_model.problem.Objective(Zero, direction=obj_dir)
 
-        #go through each reaction, see which matches the identifier
-        for rxn in FBA_model.reactions:
+            #save a reaction index
+            rxn_index = 0
 
-            #check if the reaction matches the objective id passed
-            if bool(re.fullmatch(str(rxn.id),objective)):
+            #go through each reaction, see which matches the identifier
+            for rxn in FBA_model.reactions:
 
-                #set the linear coefficient
-                obj_eqn = FBA_model.problem.Objective(rxn.flux_expression,direction=obj_dir)
+                #check if the reaction matches the objective id passed
+                if bool(re.fullmatch(str(rxn.id),objective)):
+
+                    #set the linear coefficient
+                    obj_eqn = FBA_model.problem.Objective(rxn.flux_expression,direction=obj_dir)
             
-            #if the reaction is in the fixed rates dictionary, fix its rate
-            if rxn.id in fixed_rates.keys():
+                #if the reaction is in the fixed rates dictionary, fix its rate
+                if rxn.id in fixed_rates.keys():
 
-                #set dummy bounds
-                FBA_model.reactions[FBA_model.reactions.index(rxn.id)].upper_bound = 10000
-                FBA_model.reactions[FBA_model.reactions.index(rxn.id)].lower_bound = -10000
+                    #set dummy bounds
+                    FBA_model.reactions[FBA_model.reactions.index(rxn.id)].upper_bound = 10000
+                    FBA_model.reactions[FBA_model.reactions.index(rxn.id)].lower_bound = -10000
                 
-                #enforce bounds we want to enforce
-                FBA_model.reactions[FBA_model.reactions.index(rxn.id)].lower_bound = fixed_rates[rxn.id]
-                FBA_model.reactions[FBA_model.reactions.index(rxn.id)].upper_bound = fixed_rates[rxn.id]
+                    #enforce bounds we want to enforce
+                    FBA_model.reactions[FBA_model.reactions.index(rxn.id)].lower_bound = fixed_rates[rxn.id]
+                    FBA_model.reactions[FBA_model.reactions.index(rxn.id)].upper_bound = fixed_rates[rxn.id]
 
-                #fix the model
-                FBA_model.solver.update()
-                FBA_model.repair()
+                    #fix the model
+                    FBA_model.solver.update()
+                    FBA_model.repair()
 
-        FBA_model.objective = obj_eqn
+            FBA_model.objective = obj_eqn
 
         #solve, but put in a try/except framework in case there is an error
         try:
@@ -121,30 +142,23 @@ class FBA(object):
             start_time_fba = datetime.now()
 
             #last fix of the model
-            FBA_model.solver.update()
-            FBA_model.repair()
+            with timer.phase("update_repair"):
+
+                FBA_model.solver.update()
+                FBA_model.repair()
 
             #try to solve, here is where the error may get thrown
-            fba_soln = FBA_model.optimize()
+            with timer.phase("solve"):
+
+                fba_soln = FBA_model.optimize()
 
             end_time_fba = datetime.now()
 
             #get the total solve time
             total_time_fba = end_time_fba - start_time_fba
 
-            #write and store the lower bound, flux, and upper bound for each reaction
-            for rxn in FBA_model.reactions:
-
-                #write the results to the output dictionary
-                #I believe this would be most useful set up as a nested dictionary
-                
-                #initialize element to nest
-                fba_results[rxn.id] = { }
-
-                #add nestings
-                fba_results[rxn.id]['lb'] = rxn.lower_bound
-                fba_results[rxn.id]['flux'] = fba_soln.fluxes[rxn.id]
-                fba_results[rxn.id]['ub'] = rxn.upper_bound
+            #store the lower bound, flux, and upper bound of every reaction as columns, the fluxes are in reaction order
+            fba_results.set_reactions(FBA_model.reactions,fba_soln.fluxes.to_numpy())
             
             #state that no exception occured
             fba_results['exception']=False
@@ -179,10 +193,130 @@ class FBA(object):
 
             #return objective value of NaN since the problem was not solved
             fba_results['objective'] = "NaN"
+
+        #seconds spent in each phase
+        fba_results['phase_times'] = timer.phase_times
         
         #return our dictionary
         return fba_results
 
+    #this will perform FBA on the persistent solver problem of self.model rather than on a copy
+    #only the objective and the fixed bounds are changed, and cobra's context manager puts them back afterwards
+    #takes the same arguments and returns the same dictionary as run()
+    # objective - the reaction id of the reaction that is to be the objective
+    # obj_dir - direction for optimization, must be "min" or "max"
+    # fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values
+    def run_session(self,objective,obj_dir="max",fixed_rates=dict()):
+
+        #initialize an empty dictionary for returning with results
+        fba_results = FluxResult()
+
+        #time spent building and solving, there is no copy or repair in session mode
+        timer = Instrument(report_step=None)
+
+        start_time_fba = datetime.now()
+
+        #everything changed inside of this block is reverted when the block exits
+        with self.model as session_model:
+
+            #solve, but put in a try/except framework in case there is an error
+            try:
+
+                with timer.phase("build"):
+
+                    #swap in the objective, an unknown id gives an empty objective like run() does
+                    if objective in session_model.reactions:
+
+                        session_model.objective = {session_model.reactions.get_by_id(objective): 1}
+
+                    else:
+
+                        session_model.objective = session_model.problem.Objective(Zero)
+
+                    session_model.objective_direction = obj_dir
+
+                    #fix the rates that need to be fixed, setting both bounds at once avoids lb > ub errors
+                    for rxn_id in fixed_rates:
+
+                        if rxn_id in session_model.reactions:
+
+                            session_model.reactions.get_by_id(rxn_id).bounds = (fixed_rates[rxn_id], fixed_rates[rxn_id])
+
+                #solve without building a cobra Solution object, only the status and primal values are needed
+                #the solver is called directly so a non-optimal status is reported below rather than raised
+                with timer.phase("solve"):
+
+                    session_model.solver.optimize()
+
+                fba_status = session_model.solver.status
+
+                end_time_fba = datetime.now()
+
+                #get the total solve time
+                total_time_fba = end_time_fba - start_time_fba
+
+                #only read back primal values if there are any
+                if fba_status == OPTIMAL:
+
+                    primals = session_model.solver.primal_values
+
+                    fba_objective = session_model.solver.objective.value
+
+                else:
+
+                    primals = None
+
+                    fba_objective = float("nan")
+
+                #store the lower bound, flux, and upper bound of every reaction as columns
+                if primals is None:
+
+                    fba_results.set_reactions(session_model.reactions,float("nan"))
+
+                else:
+
+                    fba_results.set_reactions(session_model.reactions,[primals[rxn.id] - primals[rxn.reverse_id] for rxn in session_model.reactions])
+
+                #state that no exception occured
+                fba_results['exception']=False
+
+                fba_results['status'] = fba_status
+
+                #return the solution time in the dictionary
+                fba_results['total_time'] = str(total_time_fba)
+
+                #return the objective
+                fba_results['objective'] = fba_objective
+
+            #if an exception occurs, store as "e"
+            except Exception as e:
+
+                #get the timein information
+                end_time_fba = datetime.now()
+
+                #print the total solve time
+                total_time_fba = end_time_fba - start_time_fba
+
+                #state that an exception occured
+                fba_results['exception']=True
+
+                fba_results['status'] = "exception occurred"
+
+                #save the exception string to return
+                fba_results['exception_str']=str(e)
+
+                #return the solution time in the dictionary
+                fba_results['total_time'] = str(total_time_fba)
+
+                #return objective value of NaN since the problem was not solved
+                fba_results['objective'] = "NaN"
+
+        #seconds spent in each phase
+        fba_results['phase_times'] = timer.phase_times
+
+        #return our dictionary
+        return fba_results
+
     #this will perform parsimonious FBA
     #note that directions, reversibility, objective, and bounds should be defined in the SBML
     #we will allow playing aroudn with various settings later
@@ -191,13 +325,19 @@ class FBA(object):
     # fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the flux values
     # tolerance - numerical tolerance for FBA
     #note that this only works for setting a single reaction as the objective
+    #the shadow prices of both stages are returned under 'shadow_prices' as {met_id: {'shadow_bio', 'shadow_flux'}}
     def run_pFBA(self,objective,obj_dir="max",fixed_rates=dict()):
 
+        #time spent copying, building each stage and solving, returned as pfba_results['phase_times']
+        timer = Instrument(report_step=None)
+
         #repair the self model before copying
         self.model.solver.update()
         self.model.repair()
         
-        pFBA_model = self.model.copy()
+        with timer.phase("copy"):
+
+            pFBA_model = self.model.copy()
 
         #try to make sure the model is good to go for solving
         pFBA_model.solver.update()
@@ -209,44 +349,38 @@ class FBA(object):
         #change the objective if needed
         pFBA_model.objective = pFBA_model.problem.Objective(Zero, direction=obj_dir)
 
-        #save a reaction index
-        rxn_index = 0
-
         #try to make sure the model is good to go for solving
         pFBA_model.solver.update()
         pFBA_model.repair()
 
-        #go through each reaction, see which matches the identifier
-        for rxn in pFBA_model.reactions:
+        #set the objective and the fixed rates in one pass, the solver is only updated once afterwards
+        with timer.phase("build"):
 
-            #check if the reaction matches the objective id passed
-            if bool(re.fullmatch(str(rxn.id),objective)):
+            obj_coefs = { }
 
-                #set the linear coefficient
-                pFBA_model.objective.set_linear_coefficients({rxn.forward_variable: 1})
-                pFBA_model.objective.set_linear_coefficients({rxn.reverse_variable: -1})
-            
-            #if the reaction is in the fixed rates dictionary, fix its rate
-            if rxn.id in fixed_rates.keys():
+            #go through each reaction, see which matches the identifier
+            for rxn in pFBA_model.reactions:
 
-                #set dummy bounds
-                pFBA_model.reactions[pFBA_model.reactions.index(rxn.id)].upper_bound = 10 * self.bigM
-                pFBA_model.reactions[pFBA_model.reactions.index(rxn.id)].lower_bound = -10 * self.bigM
+                #check if the reaction matches the objective id passed
+                if bool(re.fullmatch(str(rxn.id),objective)):
 
-                #enforce the bounds we want
-                pFBA_model.reactions[pFBA_model.reactions.index(rxn.id)].lower_bound = fixed_rates[rxn.id]
-                pFBA_model.reactions[pFBA_model.reactions.index(rxn.id)].upper_bound = fixed_rates[rxn.id]
+                    obj_coefs[rxn.forward_variable] = 1
+                    obj_coefs[rxn.reverse_variable] = -1
+                
+                #if the reaction is in the fixed rates dictionary, fix its rate
+                #setting both bounds at once avoids lb > ub errors without the dummy bounds
+                if rxn.id in fixed_rates:
 
-                #fix the model
-                pFBA_model.solver.update()
-                pFBA_model.repair()
+                    rxn.bounds = (fixed_rates[rxn.id], fixed_rates[rxn.id])
 
-        #try to make sure the model is good to go for solving
-        pFBA_model.solver.update()
-        pFBA_model.repair()
+            pFBA_model.objective.set_linear_coefficients(obj_coefs)
+
+            #try to make sure the model is good to go for solving
+            pFBA_model.solver.update()
+            pFBA_model.repair()
 
         #initialize an empty dictionary for returning with results
-        pfba_results = { }
+        pfba_results = FluxResult()
 
         #solve, but put in a try/except framework in case there is an error
         try:
@@ -266,42 +400,31 @@ class FBA(object):
             print("solving first problem")
 
             #this does the "maximize objective" step
-            fba_soln = pFBA_model.optimize()
+            with timer.phase("solve"):
+
+                fba_soln = pFBA_model.optimize()
 
             print("first problem solved")
 
-            #return shadow prices
+            #return shadow prices, kept under 'shadow_prices' keyed by metabolite ID so a metabolite with the ID of a
+            #reaction does not land in the reaction table
+            pfba_results['shadow_prices'] = { }
+
             for met in pFBA_model.metabolites:
 
                 #initialize element to nest
-                pfba_results[met.id] = { }
+                pfba_results['shadow_prices'][met.id] = { }
                 
-                pfba_results[met.id]['shadow_bio'] = pFBA_model.solver.shadow_prices[met.id]
-
-            #next we fix the objective value, most of the time this will be fixing the biomas rate
-            pFBA_model.reactions[pFBA_model.reactions.index(objective)].lower_bound = fba_soln.objective_value
-            pFBA_model.reactions[pFBA_model.reactions.index(objective)].upper_bound = fba_soln.objective_value
+                pfba_results['shadow_prices'][met.id]['shadow_bio'] = pFBA_model.solver.shadow_prices[met.id]
 
-            
-            #go through each reaction, see which matches the identifier
-            #create a new objective equation minimizing the sum of flux rates
-            pFBA_model.objective = pFBA_model.problem.Objective(Zero, direction='min')
+            #build the whole parsimony stage in one batch
+            with timer.phase("build_parsimony"):
 
-            #go through each reaction, see which matches the identifier
-            for rxn in pFBA_model.reactions:
+                #next we fix the objective value, most of the time this will be fixing the biomas rate
+                pFBA_model.reactions.get_by_id(objective).bounds = (fba_soln.objective_value, fba_soln.objective_value)
 
-                #make a variable to store the absolute value of each reaction rate
-                v_plus_rxn = pFBA_model.problem.Variable(name='v_+_{}'.format(rxn.id),lb=0,ub=2*self.bigM)
-
-                #create two constraints to get back the absolute value
-                v_plus_const_1 = pFBA_model.problem.Constraint(v_plus_rxn - rxn.flux_expression,lb=0,ub=2*self.bigM,name='v_+_1_{}'.format(rxn.id),sloppy=True)
-                v_plus_const_2 = pFBA_model.problem.Constraint(v_plus_rxn + rxn.flux_expression,lb=0,ub=2*self.bigM,name='v_+_2_{}'.format(rxn.id),sloppy=True)
-
-                #add these constraints to the model
-                pFBA_model.add_cons_vars([v_plus_const_1, v_plus_const_2], sloppy=False)
-
-                #set the objective so that we are minimizing the sum of absolute values
-                pFBA_model.objective.set_linear_coefficients({v_plus_rxn: 1})
+                #create a new objective equation minimizing the sum of flux rates
+                parsimony_objective(pFBA_model)
 
                 #try to make sure the model is good to go for solving
                 pFBA_model.solver.update()
@@ -310,7 +433,9 @@ class FBA(object):
             #minimize sum of fluxes for the objective being fixed
             print("solving second problem")
 
-            pfba_soln  = pFBA_model.optimize()
+            with timer.phase("solve"):
+
+                pfba_soln  = pFBA_model.optimize()
 
             print("second problem solved")
             
@@ -319,19 +444,8 @@ class FBA(object):
             #get the total solve time
             total_time_fba = end_time_pfba - start_time_pfba
 
-            #write and store the lower bound, flux, and upper bound for each reaction
-            for rxn in pFBA_model.reactions:
-
-                #write the results to the output dictionary
-                #I believe this would be most useful set up as a nested dictionary
-                
-                #initialize element to nest
-                pfba_results[rxn.id] = { }
-
-                #add nestings
-                pfba_results[rxn.id]['lb'] = rxn.lower_bound
-                pfba_results[rxn.id]['flux'] = pfba_soln.fluxes[rxn.id]
-                pfba_results[rxn.id]['ub'] = rxn.upper_bound
+            #store the lower bound, flux, and upper bound of every reaction as columns, the fluxes are in reaction order
+            pfba_results.set_reactions(pFBA_model.reactions,pfba_soln.fluxes.to_numpy())
 
             #state that no exception occured
             pfba_results['exception']=False
@@ -349,7 +463,7 @@ class FBA(object):
             for met in self.model.metabolites:
                 
                 #now assign the shadow price based on the flux rates
-                pfba_results[met.id]['shadow_flux'] = pFBA_model.solver.shadow_prices[met.id]
+                pfba_results['shadow_prices'][met.id]['shadow_flux'] = pFBA_model.solver.shadow_prices[met.id]
 
         #if an exception occurs, store as "e"
         except Exception as e:
@@ -375,6 +489,24 @@ class FBA(object):
 
             #return objective value of NaN since the problem was not solved
             pfba_results['objective'] = "NaN"
+
+        #seconds spent in each phase
+        pfba_results['phase_times'] = timer.phase_times
         
         #return our dictionary
         return pfba_results
+
+#replaces the objective of model with minimizing the sum of absolute fluxes, the parsimony stage of pFBA
+#each reaction is already split into non-negative forward and reverse variables, so the absolute value of its rate at the
+#optimum is forward + reverse, and the whole objective is written in a single call without extra variables or constraints
+# model - cobra model whose objective is replaced
+# reactions - reactions whose fluxes are summed, by default every reaction of model
+def parsimony_objective(model,reactions=None):
+
+    if reactions is None:
+
+        reactions = model.reactions
+
+    model.objective = model.problem.Objective(Zero, direction='min')
+
+    model.objective.set_linear_coefficients({var: 1 for rxn in reactions for var in (rxn.forward_variable, rxn.reverse_variable)})
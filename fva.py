@@ -14,11 +14,17 @@ from optlang.symbolics import Zero, add
 
 import cobra
 from fba import FBA
+from checkpoint import Checkpoint
+from instrument import Instrument
 import os
 import sys
 import copy
 import warnings
 import re
+import multiprocessing
+import time
+from functools import partial
+from collections import deque
 from os.path import join
 from datetime import datetime
 
@@ -57,11 +63,54 @@ class FVA(object):
     #will use what is defined in the init to run FVA
     # fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values 
     # tolerance - numerical tolerance for FBA
-    def analyze(self,fixed_rates=dict(),tolerance=1E-3):
+    # processes - number of worker processes to spread the LPs over, None or 1 solves them one after another here
+    # batch_size - number of reactions sent to a worker at a time, by default about four batches per worker
+    # in_place - if True, keep one LP alive and only change its objective between solves so the basis carries over
+    # prune - if True, skip LPs whose answer is already proven by earlier flux vectors, this only works on a kept LP so
+    #         prune implies in_place
+    # fraction_of_optimum - if given, only explore fluxes that keep the model objective at this fraction of its optimum
+    #                       the objective constraint is added once and every min/max runs on that one LP
+    # blocked - reaction ids known to be blocked (see find_blocked), reported with a min and max of 0 without solving
+    #           pass True to run find_blocked first
+    # checkpoint - path of a JSONL file each finished reaction is appended to, see checkpoint.py
+    # resume_from - path of a checkpoint file from an earlier run, reactions in it are not solved again
+    #               new reactions are appended to the same file unless checkpoint says otherwise
+    # progress_hook - function called with a progress dictionary (done, total, items_per_second, eta) after every
+    #                 reaction, and with the summary stored as fva_results['instrumentation'] at the end, see instrument.py
+    def analyze(self,fixed_rates=dict(),tolerance=1E-3,processes=None,batch_size=None,in_place=False,prune=False,fraction_of_optimum=None,blocked=None,checkpoint=None,resume_from=None,progress_hook=None):
+
+        #find the blocked reactions first if asked to
+        if blocked is True:
+
+            blocked = self.find_blocked(fixed_rates)
+
+        elif blocked is None:
+
+            blocked = []
+
+        blocked = set(blocked)
+
+        #the flux vectors pruning uses only exist on a kept LP
+        if prune:
+
+            in_place = True
+
+        #hand off to the process pool if more than one process is asked for
+        if processes is not None and processes > 1:
+
+            return self.analyze_parallel(fixed_rates,processes,batch_size,in_place,prune,fraction_of_optimum,blocked,checkpoint,resume_from,progress_hook)
+
+        #hand off to the warm-started single LP, which is also where the objective constraint lives
+        if in_place or fraction_of_optimum is not None:
+
+            return self.analyze_in_place(fixed_rates,prune,fraction_of_optimum,blocked,checkpoint,resume_from,progress_hook)
 
         #use a dictionary to report the results
         fva_results = { }
 
+        #reactions finished in an earlier run, and where to write the ones finished in this run
+        resumed, checkpoint_file = _open_checkpoint(checkpoint,resume_from,fixed_rates,fraction_of_optimum)
+
         #try to make sure the model is good to go for solving
         self.model.solver.update()
         self.model.repair()
@@ -75,20 +124,8 @@ class FVA(object):
         #get the total number of reactions for reporting progress
         num_rxns = len(self.model.reactions)
 
-        #progress checks variables
-        done_10 = False     #true if 10% done
-        done_20 = False     #true if 20% done
-        done_30 = False     #true if 30% done
-        done_40 = False     #true if 40% done
-        done_50 = False     #true if 50% done
-        done_60 = False     #true if 60% done
-        done_70 = False     #true if 70% done
-        done_80 = False     #true if 80% done
-        done_90 = False     #true if 90% done
-        done_100 = False     #true if 100% done
-
-        #counter for number of reactions done thus far
-        num_rxns_done = 0
+        #progress reports and time spent in each phase
+        instrument = Instrument(num_rxns,hook=progress_hook)
 
         #essentially, we need to run FBA with different
         for rxn in self.model.reactions:
@@ -97,8 +134,10 @@ class FVA(object):
             fva_results[rxn.id] = { }
 
             #try to make sure the model is good to go for solving
-            self.model.solver.update()
-            self.model.repair()
+            with instrument.phase("update_repair"):
+
+                self.model.solver.update()
+                self.model.repair()
 
             #if the reaction is in the fixed rates dictionary, fix its rate
             if rxn.id in fixed_rates.keys():
@@ -112,127 +151,876 @@ class FVA(object):
                 fva_results[rxn.id]['lb'] = rxn.lower_bound
                 fva_results[rxn.id]['ub'] = rxn.upper_bound
 
-            #try to make sure the model is good to go for solving
-            self.model.solver.update()
-            self.model.repair()
-            
-            #solve for minimizing the current reaction rate
-            min_results = fba_object.run(str(rxn.id),"min",fixed_rates)
+            #reactions finished before a restart are taken from the checkpoint
+            if rxn.id in resumed:
 
-            #change how reporting happens based on wheter or not an exception happended
-            if min_results['exception']:
+                fva_results[rxn.id] = resumed[rxn.id]
 
-                #here if an exception happened, report as "NaN" where it makes sense
-                fva_results[rxn.id]['min'] = "NaN"
+            else:
 
-                #save that there is an exception
-                fva_results[rxn.id]['exception'] = True
+                #blocked reactions cannot carry flux, so there is nothing to solve
+                if rxn.id in blocked:
 
-                #save what the exception is for later reporting
-                fva_results[rxn.id]['exception_str'] = min_results['exception_str']
+                    min_results = {'exception': False, 'objective': 0}
+                    max_results = {'exception': False, 'objective': 0}
 
-            else:
+                else:
 
-                #here then no exception occurs, we can use the numbers
-                fva_results[rxn.id]['min'] = min_results['objective']
+                    #try to make sure the model is good to go for solving
+                    with instrument.phase("update_repair"):
 
-                #save that there is no exception
-                fva_results[rxn.id]['exception'] = False
+                        self.model.solver.update()
+                        self.model.repair()
 
-            #try to make sure the model is good to go for solving
+                    #solve for minimizing the current reaction rate
+                    min_results = fba_object.run(str(rxn.id),"min",fixed_rates)
+
+                    #try to make sure the model is good to go for solving
+                    with instrument.phase("update_repair"):
+
+                        self.model.solver.update()
+                        self.model.repair()
+
+                    #repeat the above to get the maximum flux
+                    #solve for maximizing the current reaction rate
+                    max_results = fba_object.run(rxn.id,"max",fixed_rates)
+
+                    #copy, build, update/repair and solve times of both FBA runs
+                    instrument.add_phase_times(min_results['phase_times'])
+                    instrument.add_phase_times(max_results['phase_times'])
+
+                #store the min and max in the results
+                _record_min_max(fva_results[rxn.id],min_results,max_results)
+
+                if checkpoint_file is not None:
+
+                    checkpoint_file.write(rxn.id,fva_results[rxn.id])
+
+            #report on progress
+            instrument.step()
+
+        #keep track of how long this takes
+        end_time_fva = datetime.now()
+
+        #total time
+        total_time_fva = end_time_fva - start_time_fva
+
+        #keep track of how long it took
+        fva_results['total_time'] = total_time_fva
+
+        #rate, phase times and solve time histogram
+        fva_results['instrumentation'] = instrument.summary()
+
+        fva_results['phase_times'] = fva_results['instrumentation']['phase_times']
+
+        if checkpoint_file is not None:
+
+            checkpoint_file.close()
+
+        #return our dictionary
+        return fva_results
+
+    #finds the reactions which can never carry flux, using a few LPs instead of a min and max for every reaction
+    #a reaction direction being tested gets an indicator variable z in [0, epsilon] with z <= v (or z <= -v), and the
+    #sum of indicators is maximized. Every reaction carrying flux in the solution is not blocked and its indicators
+    #are switched off, which repeats on the same LP until the sum is zero
+    #z <= v also forces v >= 0, so this is only exact for directions a reaction cannot reverse. The directions are
+    #therefore tested as: irreversible reactions together, then the remaining reversible reactions one orientation
+    #at a time, and finally a plain max and min of each reversible reaction still not seen carrying flux (and of each
+    #irreversible reaction left if its rounds stopped on numerical noise)
+    #returns the list of blocked reaction ids in model order
+    # fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    # epsilon - upper bound of the indicator variables, should be small compared to typical fluxes
+    # tolerance - flux magnitude above which a reaction counts as carrying flux
+    def find_blocked(self,fixed_rates=dict(),epsilon=1E-3,tolerance=1E-7):
+
+        #reactions which have not yet been seen carrying flux
+        candidates = set(rxn.id for rxn in self.model.reactions)
+
+        #number of LPs it took, for reporting, kept in a list so the nested functions can count
+        num_solves = [0]
+
+        #anything added to the model in here is removed afterwards
+        with self.model:
+
+            _fix_rates(self.model,fixed_rates)
+
+            #indicator variable and constraint for each direction a reaction is allowed to run in
+            #they start switched off: z fixed at 0 and the constraint without a bound, so v is not restricted
+            indicators = { }
+            new_cons_vars = []
+
+            for rxn in self.model.reactions:
+
+                if rxn.upper_bound > 0:
+
+                    z_plus = self.model.problem.Variable('z_+_{}'.format(rxn.id),lb=0,ub=0)
+                    z_plus_const = self.model.problem.Constraint(z_plus - rxn.forward_variable + rxn.reverse_variable,ub=None,name='z_+_const_{}'.format(rxn.id))
+
+                    indicators[(rxn.id,"plus")] = (z_plus, z_plus_const)
+                    new_cons_vars.extend([z_plus, z_plus_const])
+
+                if rxn.lower_bound < 0:
+
+                    z_minus = self.model.problem.Variable('z_-_{}'.format(rxn.id),lb=0,ub=0)
+                    z_minus_const = self.model.problem.Constraint(z_minus + rxn.forward_variable - rxn.reverse_variable,ub=None,name='z_-_const_{}'.format(rxn.id))
+
+                    indicators[(rxn.id,"minus")] = (z_minus, z_minus_const)
+                    new_cons_vars.extend([z_minus, z_minus_const])
+
+            #add everything in one go
+            self.model.add_cons_vars(new_cons_vars)
+
+            #apparently this is needed otherwise the new variables won't register
             self.model.solver.update()
-            self.model.repair()
 
-            #repeat the above to get the maximum flux
-            #solve for maximizing the current reaction rate
-            max_results = fba_object.run(rxn.id,"max",fixed_rates)
+            #maximize the sum of indicators
+            self.model.objective = self.model.problem.Objective(Zero,direction='max')
+            self.model.objective.set_linear_coefficients({indicators[key][0]: 1 for key in indicators})
 
-            #change how reporting happens based on wheter or not an exception happended
-            if max_results['exception']:
+            #forward and reverse variable names of every reaction, looked up once since reverse_id is rebuilt on every access
+            flux_names = [(r.id, r.forward_variable.name, r.reverse_variable.name) for r in self.model.reactions]
 
-                #here if an exception happened, report as "NaN" where it makes sense
-                fva_results[rxn.id]['max'] = "NaN"
+            #removes every reaction carrying flux in the current solution from the candidates, returns how many
+            def mark_active():
 
-            else:
+                primals = self.model.solver.primal_values
+
+                active = [rxn_id for rxn_id, fwd_name, rev_name in flux_names if rxn_id in candidates and abs(primals[fwd_name] - primals[rev_name]) > tolerance]
+
+                candidates.difference_update(active)
+
+                return len(active)
+
+            #set when indicator_rounds stops on a solution that is only above zero by numerical noise, the reactions it
+            #leaves then have not been shown to be blocked
+            noisy_exit = [False]
+
+            #switches an indicator on or off
+            def switch(key,on):
+
+                z, z_const = indicators[key]
+
+                if on:
+
+                    z_const.ub = 0
+                    z.ub = epsilon
+
+                else:
+
+                    z.ub = 0
+                    z_const.ub = None
+
+            #maximizes the sum of the given indicators until none of their reactions can be found carrying flux
+            def indicator_rounds(keys):
+
+                num_found = 0
+
+                for key in keys:
+
+                    switch(key,True)
+
+                while True:
+
+                    status = self.model.solver.optimize()
+
+                    num_solves[0] += 1
+
+                    #stop once no remaining reaction can carry flux
+                    if status != OPTIMAL or self.model.solver.objective.value <= tolerance:
+
+                        break
+
+                    num_new = mark_active()
+
+                    #guard against a solution which is only above zero by numerical noise
+                    if num_new == 0:
+
+                        noisy_exit[0] = True
+
+                        break
+
+                    num_found += num_new
 
-                #here then no exception occurs, we can use the numbers
-                fva_results[rxn.id]['max'] = max_results['objective']
+                    #switch off the indicators of the reactions that were found
+                    for key in keys:
 
-            #decide if need to report on progress
-            num_rxns_done += 1
+                        if key[0] not in candidates and indicators[key][0].ub > 0:
 
-            if num_rxns_done >= 0.1 * num_rxns and not done_10:
+                            switch(key,False)
 
-                done_10 = True
+                #leave everything switched off
+                for key in keys:
 
-                print("10% complete")
+                    if indicators[key][0].ub > 0:
 
-            elif num_rxns_done >= 0.2 * num_rxns and not done_20:
+                        switch(key,False)
 
-                done_20 = True
+                return num_found
 
-                print("20% complete")
+            #maximizes or minimizes the flux of one reaction, removing whatever carries flux from the candidates
+            def plain_solve(rxn_id,obj_dir):
 
-            elif num_rxns_done >= 0.3 * num_rxns and not done_30:
+                self.model.objective = {self.model.reactions.get_by_id(rxn_id): 1}
+                self.model.objective_direction = obj_dir
 
-                done_30 = True
+                status = self.model.solver.optimize()
 
-                print("30% complete")
+                num_solves[0] += 1
 
-            elif num_rxns_done >= 0.4 * num_rxns and not done_40:
+                if status == OPTIMAL:
 
-                done_40 = True
+                    mark_active()
 
-                print("40% complete")    
+            #irreversible reactions, z <= v does not restrict anything here so this is exact
+            irreversible = [key for key in indicators if (key[1] == "plus" and self.model.reactions.get_by_id(key[0]).lower_bound >= 0) or (key[1] == "minus" and self.model.reactions.get_by_id(key[0]).upper_bound <= 0)]
 
-            elif num_rxns_done >= 0.5 * num_rxns and not done_50:
+            indicator_rounds(irreversible)
 
-                done_50 = True
+            #if the rounds stopped on numerical noise, the irreversible reactions left get a plain max (min if they only
+            #run backwards) to be sure, as the reversible reactions do below
+            if noisy_exit[0]:
 
-                print("50% complete")    
+                for rxn_id, direction in irreversible:
 
-            elif num_rxns_done >= 0.6 * num_rxns and not done_60:
+                    if rxn_id in candidates:
 
-                done_60 = True
+                        plain_solve(rxn_id,"max" if direction == "plus" else "min")
 
-                print("60% complete")    
+            #reversible reactions one orientation at a time, for as long as either finds something
+            reversible = [rxn.id for rxn in self.model.reactions if rxn.lower_bound < 0 and rxn.upper_bound > 0]
 
-            elif num_rxns_done >= 0.7 * num_rxns and not done_70:
+            num_found = 1
 
-                done_70 = True
+            while num_found > 0:
 
-                print("70% complete")    
+                num_found = 0
 
-            elif num_rxns_done >= 0.8 * num_rxns and not done_80:
+                for direction in ["plus","minus"]:
 
-                done_80 = True
+                    num_found += indicator_rounds([(rxn_id,direction) for rxn_id in reversible if rxn_id in candidates])
 
-                print("80% complete")    
+            #whatever reversible reaction is left gets a plain max and min to be sure
+            for rxn_id in reversible:
 
-            elif num_rxns_done >= 0.9 * num_rxns and not done_90:
+                for obj_dir in ["max","min"]:
 
-                done_90 = True
+                    if rxn_id not in candidates:
 
-                print("90% complete")    
+                        break
 
-            elif num_rxns_done >= 1 * num_rxns and not done_100:
+                    plain_solve(rxn_id,obj_dir)
 
-                done_100 = True
+        print("found "+str(len(candidates))+" blocked reactions in "+str(num_solves[0])+" LPs")
 
-                print("100% complete")   
+        #return in model order
+        return [rxn.id for rxn in self.model.reactions if rxn.id in candidates]
+
+    #this will perform FVA with the min/max LPs spread over a pool of worker processes
+    #the FBA session is built once here and handed to the workers, where fork is available they inherit it without a copy
+    # fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values
+    # processes - number of worker processes
+    # batch_size - number of reactions sent to a worker at a time, by default about four batches per worker
+    # in_place - if True, each worker solves its batches warm-started on one LP, see analyze_in_place
+    # prune - if True, each worker skips LPs already proven by the flux vectors it has seen, implies in_place
+    # fraction_of_optimum - if given, the objective constraint is added to the shared session before the workers start
+    # blocked - reaction ids known to be blocked, reported with a min and max of 0 without solving
+    # checkpoint - path of a JSONL file each finished reaction is appended to
+    # resume_from - path of a checkpoint file from an earlier run, reactions in it are not solved again
+    # progress_hook - function called with the progress after every batch and with the summary at the end
+    def analyze_parallel(self,fixed_rates=dict(),processes=2,batch_size=None,in_place=False,prune=False,fraction_of_optimum=None,blocked=None,checkpoint=None,resume_from=None,progress_hook=None):
+
+        if blocked is None:
+
+            blocked = set()
+
+        #the flux vectors pruning uses only exist on a kept LP
+        if prune:
+
+            in_place = True
+
+        #use a dictionary to report the results
+        fva_results = { }
+
+        #reactions finished in an earlier run, and where to write the ones finished in this run
+        resumed, checkpoint_file = _open_checkpoint(checkpoint,resume_from,fixed_rates,fraction_of_optimum)
+
+        #keep track of how long this takes
+        start_time_fva = datetime.now()
+
+        #build the FBA session once, the workers reuse its solver problem for every LP
+        fba_object = FBA(self.model,session=True)
+
+        #progress reports and time spent in each phase, the total is set once the reactions to solve are known
+        instrument = Instrument(hook=progress_hook)
+
+        #the session model is a private copy, so the objective constraint can stay on it for good
+        if fraction_of_optimum is not None:
+
+            optimum = _fix_objective(fba_object.model,fixed_rates,fraction_of_optimum,instrument)
+
+            fva_results['optimum'] = optimum
+
+        #the bounds are known before solving, so define them here so that the results keep the model order
+        for rxn in self.model.reactions:
+
+            fva_results[rxn.id] = { }
+
+            if rxn.id in fixed_rates.keys():
+
+                fva_results[rxn.id]['lb'] = fixed_rates[rxn.id]
+                fva_results[rxn.id]['ub'] = fixed_rates[rxn.id]
+
+            else:
+
+                fva_results[rxn.id]['lb'] = rxn.lower_bound
+                fva_results[rxn.id]['ub'] = rxn.upper_bound
+
+        #split the reaction ids into batches for the workers
+        #when warm starting, keep similar reactions in the same batch
+        if in_place:
+
+            rxn_ids = _order_reactions(self.model)
+
+        else:
+
+            rxn_ids = [rxn.id for rxn in self.model.reactions]
+
+        #finished and blocked reactions are not sent to the workers
+        rxn_ids = _record_blocked(fva_results,_record_resumed(fva_results,rxn_ids,resumed),blocked)
+
+        num_rxns = len(rxn_ids)
+
+        instrument.total = num_rxns
+
+        if batch_size is None:
+
+            batch_size = max(1, -(-num_rxns // (4 * processes)))
+
+        batches = [rxn_ids[i:i + batch_size] for i in range(0, num_rxns, batch_size)]
+
+        #prefer fork so the workers start with the model already built
+        if "fork" in multiprocessing.get_all_start_methods():
+
+            mp_context = multiprocessing.get_context("fork")
+
+        else:
+
+            mp_context = multiprocessing.get_context()
+
+        #number of LPs that pruning did not need to solve
+        num_skipped = 0
+
+        start_time_phase = datetime.now()
+
+        with mp_context.Pool(processes,initializer=_init_worker,initargs=(fba_object,)) as pool:
+
+            #merge each batch as soon as it comes back
+            for batch_results in pool.imap_unordered(partial(_solve_batch,fixed_rates=fixed_rates,in_place=in_place,prune=prune),batches):
+
+                for rxn_id, min_results, max_results in batch_results:
+
+                    _record_min_max(fva_results[rxn_id],min_results,max_results)
+
+                    if checkpoint_file is not None:
+
+                        checkpoint_file.write(rxn_id,fva_results[rxn_id])
+
+                    num_skipped += min_results.get('skipped',False) + max_results.get('skipped',False)
+
+                    #solve times measured in the worker
+                    instrument.add_phase_times(min_results.get('phase_times',{}))
+                    instrument.add_phase_times(max_results.get('phase_times',{}))
+
+                #report on progress
+                instrument.step(len(batch_results))
+
+        #wall time of the pool, the solve phase adds up the time of every worker
+        instrument.add_time("min_max",(datetime.now() - start_time_phase).total_seconds())
 
         #keep track of how long this takes
         end_time_fva = datetime.now()
 
-        #total time
-        total_time_fva = end_time_fva - start_time_fva
+        #keep track of how long it took
+        fva_results['total_time'] = end_time_fva - start_time_fva
+
+        #rate, phase times and solve time histogram
+        fva_results['instrumentation'] = instrument.summary()
+
+        fva_results['phase_times'] = fva_results['instrumentation']['phase_times']
+
+        #report how many LPs pruning saved
+        if prune:
+
+            fva_results['skipped_solves'] = num_skipped
+
+        if checkpoint_file is not None:
+
+            checkpoint_file.close()
+
+        #return our dictionary
+        return fva_results
+
+    #this will perform FVA on a single LP which is kept alive for all reactions
+    #only the objective coefficients of the current reaction change between solves, so the solver starts each
+    #solve from the basis of the previous one. Reactions are ordered so that neighbouring solves are similar
+    #with prune, every flux vector seen is used to keep a lowest and highest observed flux for each reaction. A min
+    #(max) LP is skipped when a reaction has already been seen at its lower (upper) bound, since nothing can beat it
+    # fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values
+    #with fraction_of_optimum, the model objective is solved once and added as a single constraint before the min/max
+    #solves, which is removed again afterwards. The optimum is returned as fva_results['optimum']
+    # prune - if True, skip LPs whose answer is already proven by earlier flux vectors
+    # fraction_of_optimum - if given, only explore fluxes that keep the model objective at this fraction of its optimum
+    # blocked - reaction ids known to be blocked, reported with a min and max of 0 without solving
+    # checkpoint - path of a JSONL file each finished reaction is appended to
+    # resume_from - path of a checkpoint file from an earlier run, reactions in it are not solved again
+    # progress_hook - function called with the progress after every reaction and with the summary at the end
+    def analyze_in_place(self,fixed_rates=dict(),prune=False,fraction_of_optimum=None,blocked=None,checkpoint=None,resume_from=None,progress_hook=None):
+
+        if blocked is None:
+
+            blocked = set()
+
+        #use a dictionary to report the results
+        fva_results = { }
+
+        #reactions finished in an earlier run, and where to write the ones finished in this run
+        resumed, checkpoint_file = _open_checkpoint(checkpoint,resume_from,fixed_rates,fraction_of_optimum)
+
+        #keep track of how long this takes
+        start_time_fva = datetime.now()
+
+        #the bounds are known before solving, so define them here so that the results keep the model order
+        for rxn in self.model.reactions:
+
+            fva_results[rxn.id] = { }
+
+            if rxn.id in fixed_rates.keys():
+
+                fva_results[rxn.id]['lb'] = fixed_rates[rxn.id]
+                fva_results[rxn.id]['ub'] = fixed_rates[rxn.id]
+
+            else:
+
+                fva_results[rxn.id]['lb'] = rxn.lower_bound
+                fva_results[rxn.id]['ub'] = rxn.upper_bound
+
+        #order the reactions so that each solve starts close to the optimum of the one before
+        #finished and blocked reactions are left out of the solves
+        rxn_ids = _record_blocked(fva_results,_record_resumed(fva_results,_order_reactions(self.model),resumed),blocked)
+
+        #progress reports and time spent in each phase
+        instrument = Instrument(len(rxn_ids),hook=progress_hook)
+
+        #number of LPs that pruning did not need to solve
+        num_skipped = 0
+
+        #anything added to the model in here, such as the objective constraint, is removed afterwards
+        with self.model:
+
+            if fraction_of_optimum is not None:
+
+                optimum = _fix_objective(self.model,fixed_rates,fraction_of_optimum,instrument)
+
+                fva_results['optimum'] = optimum
+
+            start_time_phase = datetime.now()
+
+            for rxn_id, min_results, max_results in _in_place_min_max(self.model,rxn_ids,fixed_rates,prune):
+
+                _record_min_max(fva_results[rxn_id],min_results,max_results)
+
+                if checkpoint_file is not None:
+
+                    checkpoint_file.write(rxn_id,fva_results[rxn_id])
+
+                num_skipped += min_results.get('skipped',False) + max_results.get('skipped',False)
+
+                instrument.add_phase_times(min_results.get('phase_times',{}))
+                instrument.add_phase_times(max_results.get('phase_times',{}))
+
+                #report on progress
+                instrument.step()
+
+            instrument.add_time("min_max",(datetime.now() - start_time_phase).total_seconds())
+
+        #keep track of how long this takes
+        end_time_fva = datetime.now()
 
         #keep track of how long it took
-        fva_results['total_time'] = total_time_fva
+        fva_results['total_time'] = end_time_fva - start_time_fva
+
+        #rate, phase times and solve time histogram
+        fva_results['instrumentation'] = instrument.summary()
+
+        fva_results['phase_times'] = fva_results['instrumentation']['phase_times']
+
+        #report how many LPs pruning saved
+        if prune:
+
+            fva_results['skipped_solves'] = num_skipped
+
+        if checkpoint_file is not None:
+
+            checkpoint_file.close()
 
         #return our dictionary
         return fva_results
 
+#opens the checkpoint of an FVA run
+#returns the dictionary of reactions finished in an earlier run and the Checkpoint to write to (None if not wanted)
+#a checkpoint written with other fixed rates or another fraction of the optimum raises a ValueError, see checkpoint.py
+# checkpoint - path of the file finished reactions are appended to, defaults to resume_from
+# resume_from - path of a checkpoint file from an earlier run
+# fixed_rates, fraction_of_optimum - as in FVA.analyze, the settings the results depend on
+def _open_checkpoint(checkpoint,resume_from,fixed_rates,fraction_of_optimum):
+
+    settings = {'fixed_rates': fixed_rates, 'fraction_of_optimum': fraction_of_optimum}
+
+    resumed = { }
+
+    if resume_from is not None:
+
+        resumed = Checkpoint(resume_from,settings).load()
+
+        print("resuming with "+str(len(resumed))+" reactions already finished")
+
+    if checkpoint is None:
+
+        checkpoint = resume_from
+
+    if checkpoint is None:
+
+        return resumed, None
+
+    return resumed, Checkpoint(checkpoint,settings)
+
+#copies the reactions finished in an earlier run into the results and returns the reaction ids which still need solving
+# fva_results - FVA results dictionary, already holding the nested dictionary with the bounds of each reaction
+# rxn_ids - reaction ids to solve, in order
+# resumed - dictionary of finished reactions loaded from a checkpoint
+def _record_resumed(fva_results,rxn_ids,resumed):
+
+    for rxn_id in resumed:
+
+        if rxn_id in fva_results:
+
+            fva_results[rxn_id] = resumed[rxn_id]
+
+    return [rxn_id for rxn_id in rxn_ids if rxn_id not in resumed]
+
+#records a min and max of 0 for each blocked reaction and returns the reaction ids which still need solving
+# fva_results - FVA results dictionary, already holding the nested dictionary with the bounds of each reaction
+# rxn_ids - reaction ids to solve, in order
+# blocked - set of blocked reaction ids
+def _record_blocked(fva_results,rxn_ids,blocked):
+
+    for rxn_id in blocked:
+
+        if rxn_id in fva_results:
+
+            _record_min_max(fva_results[rxn_id],{'exception': False, 'objective': 0},{'exception': False, 'objective': 0})
+
+    if blocked:
+
+        fva_results['blocked_reactions'] = len(blocked)
+
+    return [rxn_id for rxn_id in rxn_ids if rxn_id not in blocked]
+
+#stores the min and max FBA results for one reaction in its nested FVA results dictionary
+# rxn_results - the nested dictionary for the reaction, already holding its bounds
+# min_results - results dictionary of the minimization
+# max_results - results dictionary of the maximization
+def _record_min_max(rxn_results,min_results,max_results):
+
+    #change how reporting happens based on wheter or not an exception happended
+    if min_results['exception']:
+
+        #here if an exception happened, report as "NaN" where it makes sense
+        rxn_results['min'] = "NaN"
+
+        #save that there is an exception
+        rxn_results['exception'] = True
+
+        #save what the exception is for later reporting
+        rxn_results['exception_str'] = min_results['exception_str']
+
+    else:
+
+        #here then no exception occurs, we can use the numbers
+        rxn_results['min'] = min_results['objective']
+
+        #save that there is no exception
+        rxn_results['exception'] = False
+
+    #change how reporting happens based on wheter or not an exception happended
+    if max_results['exception']:
+
+        #here if an exception happened, report as "NaN" where it makes sense
+        rxn_results['max'] = "NaN"
+
+    else:
+
+        #here then no exception occurs, we can use the numbers
+        rxn_results['max'] = max_results['objective']
+
+#FBA session of a worker process, set once per worker by _init_worker
+_worker_fba = None
+
+#runs once in each worker process of FVA.analyze_parallel
+# fba_object - session-mode FBA object the worker solves its LPs with
+def _init_worker(fba_object):
+
+    global _worker_fba
+
+    _worker_fba = fba_object
+
+#solves the min and max LPs for a batch of reactions in a worker process
+#only the fields FVA needs are sent back, not the flux vectors
+# rxn_ids - list of reaction ids in the batch
+# fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values
+# in_place - if True, solve the batch warm-started on the worker's LP
+# prune - if True, skip LPs already proven by the flux vectors seen in this batch, implies in_place
+def _solve_batch(rxn_ids,fixed_rates,in_place=False,prune=False):
+
+    if in_place or prune:
+
+        return list(_in_place_min_max(_worker_fba.model,rxn_ids,fixed_rates,prune))
+
+    batch_results = []
+
+    for rxn_id in rxn_ids:
+
+        min_results = _worker_fba.run(rxn_id,"min",fixed_rates)
+        max_results = _worker_fba.run(rxn_id,"max",fixed_rates)
+
+        #keep only the exception information and the objective
+        batch_results.append((rxn_id,_summary(min_results),_summary(max_results)))
+
+    return batch_results
+
+#cuts an FBA results dictionary down to what FVA needs
+#a session solve that is not optimal is reported as an exception, as the copy path and the in-place path do
+# fba_results - dictionary returned by FBA.run
+def _summary(fba_results):
+
+    summary = {'exception': fba_results['exception'], 'objective': fba_results['objective'], 'phase_times': fba_results['phase_times']}
+
+    if fba_results['exception']:
+
+        summary['exception_str'] = fba_results['exception_str']
+
+    elif fba_results.get('status',OPTIMAL) != OPTIMAL:
+
+        summary['exception'] = True
+        summary['objective'] = "NaN"
+        summary['exception_str'] = "solver status: "+str(fba_results['status'])
+
+    return summary
+
+#solves the min and max LP of each reaction in turn on the solver problem of model
+#the objective starts empty and only the coefficients of the current reaction are set and cleared again, so
+#the solver keeps its basis from one solve to the next. Everything is put back when the generator finishes
+#yields (reaction id, min summary, max summary) with the fields of _summary, pruned LPs are marked 'skipped'
+# model - cobra model whose solver problem is used
+# rxn_ids - reaction ids in the order they should be solved
+# fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values
+# prune - if True, skip LPs whose answer is already proven by earlier flux vectors
+def _in_place_min_max(model,rxn_ids,fixed_rates,prune=False):
+
+    with model:
+
+        _fix_rates(model,fixed_rates)
+
+        #start from an empty objective
+        model.objective = model.problem.Objective(Zero)
+
+        objective = model.solver.objective
+
+        #lowest and highest flux seen so far for each reaction, and how close to a bound counts as reaching it
+        lowest = { }
+        highest = { }
+        prune_tol = model.solver.configuration.tolerances.feasibility
+
+        #forward and reverse variable names of every reaction, looked up once since reverse_id is rebuilt on every access
+        flux_names = [(r.id, r.forward_variable.name, r.reverse_variable.name) for r in model.reactions]
+
+        for rxn_id in rxn_ids:
+
+            rxn = model.reactions.get_by_id(rxn_id)
+
+            #a flux vector already at the bound answers the LP without solving it
+            if prune and lowest.get(rxn_id,float("inf")) <= rxn.lower_bound + prune_tol and highest.get(rxn_id,float("-inf")) >= rxn.upper_bound - prune_tol:
+
+                yield rxn_id, {'exception': False, 'objective': rxn.lower_bound, 'skipped': True}, {'exception': False, 'objective': rxn.upper_bound, 'skipped': True}
+
+                continue
+
+            #put the current reaction in the objective
+            objective.set_linear_coefficients({rxn.forward_variable: 1, rxn.reverse_variable: -1})
+
+            min_max = []
+
+            for obj_dir in ["min","max"]:
+
+                if prune and obj_dir == "min" and lowest.get(rxn_id,float("inf")) <= rxn.lower_bound + prune_tol:
+
+                    min_max.append({'exception': False, 'objective': rxn.lower_bound, 'skipped': True})
+
+                    continue
+
+                if prune and obj_dir == "max" and highest.get(rxn_id,float("-inf")) >= rxn.upper_bound - prune_tol:
+
+                    min_max.append({'exception': False, 'objective': rxn.upper_bound, 'skipped': True})
+
+                    continue
+
+                try:
+
+                    objective.direction = obj_dir
+
+                    start_time_solve = time.perf_counter()
+
+                    status = model.solver.optimize()
+
+                    phase_times = {'solve': time.perf_counter() - start_time_solve}
+
+                    if status == OPTIMAL:
+
+                        min_max.append({'exception': False, 'objective': objective.value, 'phase_times': phase_times})
+
+                        #widen the envelopes with the new flux vector
+                        if prune:
+
+                            _observe(model,flux_names,lowest,highest)
+
+                    #a min or max that is not optimal has no answer, report it the way a raised solver error is
+                    else:
+
+                        min_max.append({'exception': True, 'objective': "NaN", 'exception_str': "solver status: "+str(status), 'phase_times': phase_times})
+
+                #if an exception occurs, store as "e"
+                except Exception as e:
+
+                    min_max.append({'exception': True, 'objective': "NaN", 'exception_str': str(e)})
+
+            #take the reaction back out of the objective
+            objective.set_linear_coefficients({rxn.forward_variable: 0, rxn.reverse_variable: 0})
+
+            yield rxn_id, min_max[0], min_max[1]
+
+#fixes the given rates on model, setting both bounds at once avoids lb > ub errors
+#inside a model context the old bounds come back when the context exits
+# model - cobra model whose reactions are fixed
+# fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+def _fix_rates(model,fixed_rates):
+
+    for rxn_id in fixed_rates:
+
+        if rxn_id in model.reactions:
+
+            model.reactions.get_by_id(rxn_id).bounds = (fixed_rates[rxn_id], fixed_rates[rxn_id])
+
+#solves the objective of model once and adds it as a constraint at the given fraction of the optimum
+#the fraction is taken of the distance from zero in the direction of the objective, so the bound is below the optimum
+#for a max and above it for a min whatever the sign of the optimum
+#inside a model context the constraint is removed when the context exits, outside of one it stays
+#returns the optimum, or None if the objective could not be optimized (then no constraint is added)
+# model - cobra model to constrain
+# fixed_rates - dictionary of fluxes which are fixed while finding the optimum
+# fraction_of_optimum - fraction of the optimum the objective has to keep
+# instrument - Instrument the time of each phase is added to
+def _fix_objective(model,fixed_rates,fraction_of_optimum,instrument):
+
+    #the optimum has to be found with the same fixed rates the min/max solves will use
+    with instrument.phase("optimum"):
+
+        with model:
+
+            _fix_rates(model,fixed_rates)
+
+            #slim_optimize raises on a non-optimal status when error_value is None, so check the status here
+            model.solver.optimize()
+
+            optimum = model.solver.objective.value if model.solver.status == OPTIMAL else None
+
+    with instrument.phase("constraint"):
+
+        if optimum is not None:
+
+            if model.objective.direction == "max":
+
+                bound = optimum - (1 - fraction_of_optimum) * abs(optimum)
+
+            else:
+
+                bound = optimum + (1 - fraction_of_optimum) * abs(optimum)
+
+            fix_objective_as_constraint(model,fraction_of_optimum,bound)
+
+    return optimum
+
+#widens the lowest and highest observed flux of each reaction with the current solution of model
+# model - cobra model which has just been solved to optimality
+# flux_names - list of (reaction id, forward variable name, reverse variable name)
+# lowest - dictionary of the lowest flux seen for each reaction id, updated in place
+# highest - dictionary of the highest flux seen for each reaction id, updated in place
+def _observe(model,flux_names,lowest,highest):
+
+    primals = model.solver.primal_values
+
+    for rxn_id, fwd_name, rev_name in flux_names:
+
+        flux = primals[fwd_name] - primals[rev_name]
+
+        if flux < lowest.get(rxn_id,float("inf")):
+
+            lowest[rxn_id] = flux
+
+        if flux > highest.get(rxn_id,float("-inf")):
+
+            highest[rxn_id] = flux
+
+#orders the reactions of a model so that reactions next to each other share metabolites
+#does a breadth-first walk over the reaction-metabolite graph, currency metabolites which appear in more than
+#hub_size reactions are not walked through since they connect almost everything
+# model - cobra model whose reactions are ordered
+# hub_size - metabolites in more reactions than this are not used to find neighbours
+def _order_reactions(model,hub_size=20):
+
+    rxn_order = []
+
+    visited = set()
+
+    for start_rxn in model.reactions:
+
+        if start_rxn.id in visited:
+
+            continue
+
+        visited.add(start_rxn.id)
+
+        queue = deque([start_rxn])
+
+        #walk outwards from the start reaction
+        while queue:
+
+            rxn = queue.popleft()
+
+            rxn_order.append(rxn.id)
+
+            for met in rxn.metabolites:
+
+                if len(met.reactions) > hub_size:
+
+                    continue
+
+                for next_rxn in sorted(met.reactions, key=lambda r: r.id):
+
+                    if next_rxn.id not in visited:
 
+                        visited.add(next_rxn.id)
 
+                        queue.append(next_rxn)
 
+    return rxn_order
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+
+#written to keep track of progress and timing of long running loops (FVA, building the community model) in one place
+#rather than a ladder of done_10 ... done_100 flags in each of them. Reports items per second and an ETA, the time
+#spent in each phase (copy, build, update/repair, solve) and a histogram of the solve times
+
+import math
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+class Instrument(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #total - number of items the loop will go through, 0 if only timing phases
+    #label - name printed in front of the progress reports
+    #hook - function called with the progress dictionary after every item and with the summary dictionary at the end
+    #report_step - percentage between printed progress reports, None to not print at all
+    def __init__(self,total=0,label="",hook=None,report_step=10):
+
+        self.total = total
+        self.label = label
+        self.hook = hook
+        self.report_step = report_step
+
+        #number of items done thus far, and the next percentage to print
+        self.num_done = 0
+        self.next_report = report_step
+
+        #seconds spent in each phase
+        self.phase_times = { }
+
+        #seconds taken by each solve
+        self.solve_times = []
+
+        self.start_time = time.perf_counter()
+
+    #times the code inside a with block and adds it to the named phase
+    #name - name of the phase, such as "copy", "build", "update_repair" or "solve"
+    @contextmanager
+    def phase(self,name):
+
+        start_time = time.perf_counter()
+
+        try:
+
+            yield
+
+        finally:
+
+            self.add_time(name,time.perf_counter() - start_time)
+
+    #adds time to a phase, solve times also go in the histogram
+    #name - name of the phase
+    #seconds - time to add
+    def add_time(self,name,seconds):
+
+        self.phase_times[name] = self.phase_times.get(name,0) + seconds
+
+        if name == "solve":
+
+            self.solve_times.append(seconds)
+
+    #adds the phase times measured somewhere else, such as in FBA.run or in a worker process
+    #phase_times - dictionary of phase name to seconds
+    def add_phase_times(self,phase_times):
+
+        for name in phase_times:
+
+            self.add_time(name,phase_times[name])
+
+    #marks items as done, prints a progress report when the next step is reached and calls the hook
+    #num - number of items done
+    def step(self,num=1):
+
+        self.num_done += num
+
+        progress = self.progress()
+
+        #report on progress in report_step steps
+        while self.report_step is not None and self.next_report <= 100 and self.num_done >= self.next_report / 100 * self.total:
+
+            print(self.label+str(self.next_report)+"% complete ("+"{:.1f}".format(progress['items_per_second'])+" per s, ETA "+str(timedelta(seconds=round(progress['eta'])))+")")
+
+            self.next_report += self.report_step
+
+        if self.hook is not None:
+
+            self.hook(progress)
+
+    #returns a dictionary of how far along the loop is
+    def progress(self):
+
+        elapsed = time.perf_counter() - self.start_time
+
+        items_per_second = self.num_done / elapsed if elapsed > 0 else 0.0
+
+        #time left at the current rate
+        if items_per_second > 0:
+
+            eta = (self.total - self.num_done) / items_per_second
+
+        else:
+
+            eta = float("nan")
+
+        return {'label': self.label, 'done': self.num_done, 'total': self.total, 'elapsed': elapsed, 'items_per_second': items_per_second, 'eta': max(eta,0.0)}
+
+    #returns the final dictionary of rate, phase times and solve time histogram, and hands it to the hook
+    def summary(self):
+
+        summary = self.progress()
+
+        summary['phase_times'] = dict(self.phase_times)
+        summary['solve_times'] = histogram(self.solve_times)
+
+        if self.hook is not None:
+
+            self.hook(summary)
+
+        return summary
+
+#bins times into a histogram with logarithmic bins, since solve times span several orders of magnitude
+#returns a dictionary of bin edges, counts per bin and a few summary statistics, all in seconds
+#times - list of times in seconds
+#bins_per_decade - number of bins for each factor of ten
+def histogram(times,bins_per_decade=4):
+
+    if len(times) == 0:
+
+        return {'count': 0, 'total': 0.0, 'edges': [], 'counts': []}
+
+    ordered = sorted(times)
+
+    #smallest time taken as a microsecond so the log is defined
+    low = math.floor(math.log10(max(ordered[0],1E-6)) * bins_per_decade)
+    high = math.floor(math.log10(max(ordered[-1],1E-6)) * bins_per_decade) + 1
+
+    edges = [10 ** (i / bins_per_decade) for i in range(low, high + 1)]
+
+    counts = [0] * (high - low)
+
+    for t in ordered:
+
+        counts[min(math.floor(math.log10(max(t,1E-6)) * bins_per_decade) - low, high - low - 1)] += 1
+
+    return {
+
+        'count': len(ordered),
+        'total': sum(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'median': ordered[len(ordered) // 2],
+        'max': ordered[-1],
+        'edges': edges,
+        'counts': counts,
+
+    }
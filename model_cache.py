@@ -0,0 +1,167 @@
+#!/usr/bin/python
+
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+
+#written to keep fully built community models on disk, reading the SBML files, merging the members, adding the medium
+#and scaling the mass balances takes far longer than loading the finished community back from a pickle
+#entries are keyed by a hash of the content of the SBML files and of everything else that goes into the build, so
+#changing a file or a setting gives a new entry rather than a stale one, and the least recently used entries are
+#deleted once the cache grows past its size limit
+
+import hashlib
+import json
+import os
+import pickle
+
+#bump this whenever the way the community is built changes, so entries built the old way are not used
+CACHE_VERSION = 2
+
+class ModelCache(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #directory - folder the entries are kept in, created on the first store
+    #max_bytes - largest total size of the entries, the least recently used are deleted past this
+    #enabled - if False nothing is loaded or stored, every build starts from the SBML files
+    def __init__(self,directory='steadycom_cache',max_bytes=1024**3,enabled=True):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    #returns the key of a community, a hex digest of everything the built community depends on
+    #sbml_files - paths of the member SBML files, in member order
+    #exch_tag, media, X_k, biomass_dict, bigM - as given to SteadyCom
+    #options - any other settings of the build, such as remove_blocked
+    def key(self,sbml_files,exch_tag,media,X_k,biomass_dict,bigM,options=None):
+
+        digest = hashlib.sha256()
+
+        digest.update(str(CACHE_VERSION).encode())
+
+        #hash the content of the files rather than their names or dates, so a moved or touched file still hits
+        for sbml_file in sbml_files:
+
+            with open(sbml_file,'rb') as model_file:
+
+                for chunk in iter(lambda: model_file.read(1024**2), b""):
+
+                    digest.update(chunk)
+
+        settings = {'exch_tag': exch_tag, 'media': media, 'X_k': X_k, 'biomass_dict': biomass_dict, 'bigM': bigM, 'options': options}
+
+        digest.update(json.dumps(settings,sort_keys=True,default=str).encode())
+
+        return digest.hexdigest()
+
+    #returns the path of the file of an entry
+    #key - key of the entry
+    def path(self,key):
+
+        return os.path.join(self.directory,key+".pkl")
+
+    #returns the stored object of a key, None if the cache is disabled or there is no usable entry
+    #key - key of the entry
+    def load(self,key):
+
+        if not self.enabled:
+
+            return None
+
+        entry_path = self.path(key)
+
+        if not os.path.exists(entry_path):
+
+            return None
+
+        try:
+
+            with open(entry_path,'rb') as entry_file:
+
+                stored = pickle.load(entry_file)
+
+        except Exception:
+
+            #a file cut short or written by an incompatible version is rebuilt rather than trusted
+            os.remove(entry_path)
+
+            return None
+
+        #mark the entry as recently used for eviction
+        os.utime(entry_path)
+
+        return stored
+
+    #stores an object under a key, then deletes the least recently used entries past max_bytes
+    #key - key of the entry
+    #stored - object to store, such as a SteadyCom object
+    def store(self,key,stored):
+
+        if not self.enabled:
+
+            return
+
+        os.makedirs(self.directory,exist_ok=True)
+
+        entry_path = self.path(key)
+
+        #write to a temporary file first so that a killed job never leaves half an entry under the real name
+        temp_path = entry_path+"."+str(os.getpid())+".tmp"
+
+        with open(temp_path,'wb') as entry_file:
+
+            pickle.dump(stored,entry_file,protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temp_path,entry_path)
+
+        self.evict(keep=key)
+
+    #deletes the least recently used entries until the cache is no larger than max_bytes
+    #keep - key of an entry that is never deleted, such as the one just stored
+    def evict(self,keep=None):
+
+        if not os.path.isdir(self.directory):
+
+            return
+
+        entries = []
+
+        for file_name in os.listdir(self.directory):
+
+            if file_name.endswith(".pkl"):
+
+                entry_path = os.path.join(self.directory,file_name)
+
+                entries.append((os.path.getmtime(entry_path),os.path.getsize(entry_path),entry_path))
+
+        total_bytes = sum([entry[1] for entry in entries])
+
+        #oldest first
+        for mtime, size, entry_path in sorted(entries):
+
+            if total_bytes <= self.max_bytes:
+
+                break
+
+            if keep is not None and entry_path == self.path(keep):
+
+                continue
+
+            os.remove(entry_path)
+
+            total_bytes -= size
+
+    #deletes every entry
+    def clear(self):
+
+        if not os.path.isdir(self.directory):
+
+            return
+
+        for file_name in os.listdir(self.directory):
+
+            if file_name.endswith(".pkl") or file_name.endswith(".tmp"):
+
+                os.remove(os.path.join(self.directory,file_name))
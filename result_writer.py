@@ -0,0 +1,327 @@
+#!/usr/bin/python
+
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+
+#written to write the results of max_mu, max_sum and the like in bulk rather than one line per reaction. Each run gives
+#two tables, the reactions (member, reaction, lb, flux, ub) and the community exchanges (metabolite, x_c and the
+#exchange flux of each member), and one summary row (status, objectives, time to solve). Which exchange reaction of which
+#member belongs to each community exchange is worked out once from the exchange sets, so writing a run is a few array
+#lookups. Formats:
+#tsv - gzip compressed tab separated files, <name>.reactions.tsv.gz and <name>.exchanges.tsv.gz in a folder, plus runs.tsv
+#parquet - <name>.reactions.parquet and <name>.exchanges.parquet in a folder, plus runs.tsv, needs pyarrow
+#hdf5 - a single file, the IDs are written once and each run is a group of float arrays with the summary as attributes,
+#       needs h5py. The smallest for thousands of runs
+#pyarrow and h5py are only imported when their format is used
+
+import gzip
+import json
+import os
+
+import numpy
+
+from results import FluxResult
+
+#file formats that can be written
+FORMATS = ('tsv', 'parquet', 'hdf5')
+
+#keys of the results that go in the summary row of a run, when they are there
+SUMMARY_KEYS = ('status', 'exception', 'exception_str', 'mu_objective', 'bio_objective', 'flux_objective', 'objective', 'soln_time', 'total_time')
+
+class ResultWriter(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #path - folder for tsv and parquet, file for hdf5, created if not there
+    #member_ids - model IDs of the members, in member order
+    #exch_sets - dictionary of exchanged metabolite ID to its exchange reactions (cobra reactions or reaction IDs)
+    #file_format - one of FORMATS
+    #compression - gzip level for tsv and hdf5, codec name for parquet, None for the default of the format
+    def __init__(self,path,member_ids,exch_sets,file_format='tsv',compression=None):
+
+        if file_format not in FORMATS:
+
+            raise ValueError("file_format must be one of "+", ".join(FORMATS)+", not "+str(file_format))
+
+        self.path = path
+        self.file_format = file_format
+        self.compression = compression
+
+        self.member_ids = list(member_ids)
+
+        #longest member IDs first, so a member ID that ends another is not taken for it
+        self.suffixes = sorted([("_"+member_id, member_id) for member_id in self.member_ids],key=lambda suffix: -len(suffix[0]))
+
+        #the exchange reaction ID of each member for each community exchange, None where the member has none
+        self.exch_mets = list(exch_sets)
+
+        self.exch_ids = []
+
+        for met in self.exch_mets:
+
+            rxn_ids = [rxn if isinstance(rxn,str) else rxn.id for rxn in exch_sets[met]]
+
+            self.exch_ids.append([self.member_rxn(rxn_ids,member_id) for member_id in self.member_ids])
+
+        #positions of the reactions in the results, worked out for the reaction IDs of the first run written
+        self.layout_ids = None
+
+        #reaction IDs already checked against the IDs in the hdf5 file
+        self.checked_ids = None
+
+        self.file = None
+
+        if file_format == 'hdf5':
+
+            import h5py
+
+            directory = os.path.dirname(os.path.abspath(path))
+
+            os.makedirs(directory,exist_ok=True)
+
+            self.file = h5py.File(path,'a')
+
+        else:
+
+            os.makedirs(path,exist_ok=True)
+
+    #returns a ResultWriter for the results of a SteadyCom (or SparseSteadyCom) object
+    #path, file_format, compression - as for ResultWriter
+    #community - SteadyCom object, its members and exchange sets are used
+    @classmethod
+    def from_community(cls,path,community,file_format='tsv',compression=None):
+
+        #the sparse backend keeps its exchange sets as column positions
+        if hasattr(community,'exch_mets'):
+
+            exch_sets = {met: [community.rxn_ids[j] for j in community.exch_sets[met]] for met in community.exch_mets}
+
+        else:
+
+            exch_sets = community.exch_sets
+
+        return cls(path,[model.id for model in community.members],exch_sets,file_format,compression)
+
+    #returns the member a community reaction belongs to and its reaction ID in the member, the member is "" and the ID
+    #is unchanged for reactions of no member
+    #rxn_id - community reaction ID, which ends in _<model ID> for the reactions of a member
+    def rxn_member(self,rxn_id):
+
+        for suffix, member_id in self.suffixes:
+
+            if rxn_id.endswith(suffix):
+
+                return member_id, rxn_id[:-len(suffix)]
+
+        return "", rxn_id
+
+    #returns the reaction of a member among reaction IDs of the community, None if the member has none
+    #rxn_ids - community reaction IDs, which end in _<model ID>
+    #member_id - model ID of the member
+    def member_rxn(self,rxn_ids,member_id):
+
+        for rxn_id in rxn_ids:
+
+            if self.rxn_member(rxn_id)[0] == member_id:
+
+                return rxn_id
+
+        return None
+
+    #works out the member and member reaction ID of every reaction and the positions of the member exchanges
+    #runs once for each set of reaction IDs, results of the same community share the same IDs
+    #ids - reaction IDs of a FluxResult
+    #index - dictionary of reaction ID to position of the same FluxResult
+    def make_layout(self,ids,index):
+
+        self.rxn_members = []
+        self.rxn_local_ids = []
+
+        for rxn_id in ids:
+
+            member, local_id = self.rxn_member(rxn_id)
+
+            self.rxn_members.append(member)
+            self.rxn_local_ids.append(local_id)
+
+        #position of each member exchange in the reaction table, -1 where the member has none
+        self.exch_positions = numpy.array([[index.get(rxn_id,-1) if rxn_id is not None else -1 for rxn_id in row] for row in self.exch_ids],dtype=numpy.int64).reshape(len(self.exch_mets),len(self.member_ids))
+
+        self.layout_ids = ids
+
+    #returns the reaction table of a run: dictionary of column name to list or array
+    #results - FluxResult (or results dictionary) of max_mu, max_sum or the like
+    def reaction_table(self,results):
+
+        results = FluxResult.from_dict(results)
+
+        if results.ids is not self.layout_ids:
+
+            self.make_layout(results.ids,results.index)
+
+        return {'member': self.rxn_members, 'reaction': self.rxn_local_ids, 'lb': results.lb, 'flux': results.flux, 'ub': results.ub}
+
+    #returns the community exchange table of a run: metabolite, x_c and the exchange flux of each member, 0 where the
+    #member has no exchange reaction for the metabolite
+    #results - FluxResult (or results dictionary) of max_mu, max_sum or the like
+    def exchange_table(self,results):
+
+        results = FluxResult.from_dict(results)
+
+        if results.ids is not self.layout_ids:
+
+            self.make_layout(results.ids,results.index)
+
+        x_c = results['x_c'] if 'x_c' in results else {}
+
+        exch_table = {'metabolite': self.exch_mets, 'x_c': numpy.array([x_c.get(met,numpy.nan) for met in self.exch_mets],dtype=float)}
+
+        #an extra zero at the end of the fluxes is what -1 picks out for the missing exchanges
+        padded_flux = numpy.append(results.flux,0)
+
+        for k, member_id in enumerate(self.member_ids):
+
+            exch_table[member_id] = padded_flux[self.exch_positions[:, k]]
+
+        return exch_table
+
+    #returns the summary row of a run, the keys of SUMMARY_KEYS the results have, as strings and floats
+    #results - FluxResult (or results dictionary) of max_mu, max_sum or the like
+    def summary(self,results):
+
+        summary = { }
+
+        for key in SUMMARY_KEYS:
+
+            if key in results:
+
+                value = results[key]
+
+                summary[key] = value if isinstance(value,(bool, int, float)) else str(value)
+
+        return summary
+
+    #writes the reaction and exchange tables and the summary of one run
+    #results - FluxResult (or results dictionary) of max_mu, max_sum or the like
+    #name - name of the run, used in file names (tsv, parquet) or as the group (hdf5), must be unique
+    def write(self,results,name='run'):
+
+        results = FluxResult.from_dict(results)
+
+        tables = {'reactions': self.reaction_table(results), 'exchanges': self.exchange_table(results)}
+
+        summary = self.summary(results)
+
+        if self.file_format == 'tsv':
+
+            for table_name in tables:
+
+                self.write_tsv(os.path.join(self.path,name+"."+table_name+".tsv.gz"),tables[table_name])
+
+            self.write_run(name,summary)
+
+        elif self.file_format == 'parquet':
+
+            for table_name in tables:
+
+                self.write_parquet(os.path.join(self.path,name+"."+table_name+".parquet"),tables[table_name])
+
+            self.write_run(name,summary)
+
+        else:
+
+            self.write_hdf5(name,tables,summary)
+
+    #writes a table as a gzip compressed tab separated file, in a single write
+    #file_path - path of the file
+    #table - dictionary of column name to list or array
+    def write_tsv(self,file_path,table):
+
+        columns = [table[column].tolist() if isinstance(table[column],numpy.ndarray) else table[column] for column in table]
+
+        lines = ["\t".join(table)]
+
+        lines.extend(["\t".join(map(str, row)) for row in zip(*columns)])
+
+        with gzip.open(file_path,'wt',compresslevel=6 if self.compression is None else self.compression) as table_file:
+
+            table_file.write("\n".join(lines)+"\n")
+
+    #writes a table as a parquet file
+    #file_path - path of the file
+    #table - dictionary of column name to list or array
+    def write_parquet(self,file_path,table):
+
+        import pyarrow
+        import pyarrow.parquet
+
+        #the ID columns repeat the same few values, so are dictionary encoded
+        arrow_table = pyarrow.table({column: pyarrow.array(values).dictionary_encode() if not isinstance(values,numpy.ndarray) else pyarrow.array(values) for column, values in table.items()})
+
+        pyarrow.parquet.write_table(arrow_table,file_path,compression='zstd' if self.compression is None else self.compression)
+
+    #appends the summary of a run to runs.tsv in the folder, the summary is written as JSON so every run has one line
+    #name - name of the run
+    #summary - summary row of the run
+    def write_run(self,name,summary):
+
+        with open(os.path.join(self.path,"runs.tsv"),'a') as runs_file:
+
+            runs_file.write(name+"\t"+json.dumps(summary,default=str)+"\n")
+
+    #writes the tables of a run as a group of the hdf5 file, the ID columns are written once for the whole file
+    #name - name of the run
+    #tables - dictionary of table name to table
+    #summary - summary row of the run, written as attributes of the group
+    def write_hdf5(self,name,tables,summary):
+
+        import h5py
+
+        compression = 4 if self.compression is None else self.compression
+
+        for table_name, table in tables.items():
+
+            id_columns = [column for column in table if not isinstance(table[column],numpy.ndarray)]
+
+            #IDs are the same for every run of the community, so only the first run writes them
+            if table_name not in self.file:
+
+                id_group = self.file.create_group(table_name)
+
+                for column in id_columns:
+
+                    id_group.create_dataset(column,data=numpy.array(table[column],dtype=object),dtype=h5py.string_dtype())
+
+            elif self.checked_ids is not self.layout_ids and any([list(self.file[table_name][column].asstr()[:]) != list(table[column]) for column in id_columns]):
+
+                raise ValueError("results of run "+name+" do not have the reactions or exchanges already in "+str(self.path))
+
+        self.checked_ids = self.layout_ids
+
+        run_group = self.file.create_group("runs/"+name)
+
+        for table_name, table in tables.items():
+
+            table_group = run_group.create_group(table_name)
+
+            for column in table:
+
+                if isinstance(table[column],numpy.ndarray):
+
+                    table_group.create_dataset(column,data=table[column],compression='gzip',compression_opts=compression)
+
+        for key, value in summary.items():
+
+            run_group.attrs[key] = value
+
+        self.file.flush()
+
+    #closes the hdf5 file, nothing to do for the other formats
+    def close(self):
+
+        if self.file is not None:
+
+            self.file.close()
+
+            self.file = None
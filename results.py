@@ -0,0 +1,385 @@
+#!/usr/bin/python
+
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+
+#written to hold the results of FBA, pFBA, max_mu and max_sum as arrays rather than as one small dictionary per
+#reaction. The lower bounds, fluxes and upper bounds of the reactions are the rows of one 3 x n float array next to a
+#list of reaction IDs, and the community exchanges (x_c) are an array next to a list of metabolite IDs. The old nested
+#dictionary access still works, results[rxn_id]['flux'], results['x_c'][met] and results['status'] all read the same
+#values as before, so scripts written against the dictionaries do not need to change. to_pandas and to_arrow hand the
+#arrays over without copying them (pandas and pyarrow are only imported when asked for)
+
+from collections.abc import Mapping, MutableMapping
+
+import numpy
+
+#names of the rows of the reaction table, in order
+COLUMNS = ('lb', 'flux', 'ub')
+
+#reaction ID tuples and their indices already made, results of the same model share one copy rather than each holding
+#its own list and dictionary, which would be most of the memory of a result
+_INDEX_CACHE = {}
+
+#largest number of ID tuples kept in _INDEX_CACHE
+INDEX_CACHE_SIZE = 16
+
+#returns a tuple of the IDs and a dictionary of ID to position, shared with every other result of the same IDs
+#never change what is returned, make new ones instead
+#ids - list of IDs
+def shared_index(ids):
+
+    ids = tuple(ids)
+
+    if ids not in _INDEX_CACHE:
+
+        if len(_INDEX_CACHE) >= INDEX_CACHE_SIZE:
+
+            _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+
+        _INDEX_CACHE[ids] = (ids, {key: i for i, key in enumerate(ids)})
+
+    return _INDEX_CACHE[ids]
+
+#a mapping of a fixed set of IDs to the entries of a float array, used for x_c
+class ArrayMap(Mapping):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #ids - list of keys, in the order of values
+    #values - values of the keys, kept as a float array
+    def __init__(self,ids,values):
+
+        self.ids, self.index = shared_index(ids)
+
+        self.values = numpy.asarray(values,dtype=float)
+
+    #the index is not pickled, it is shared again when unpickled
+    def __getstate__(self):
+
+        state = dict(self.__dict__)
+
+        del state['index']
+
+        return state
+
+    def __setstate__(self,state):
+
+        self.__dict__.update(state)
+
+        self.ids, self.index = shared_index(self.ids)
+
+    def __getitem__(self,key):
+
+        return self.values[self.index[key]]
+
+    #only keys that are already there can be written
+    def __setitem__(self,key,value):
+
+        self.values[self.index[key]] = value
+
+    def __iter__(self):
+
+        return iter(self.ids)
+
+    def __len__(self):
+
+        return len(self.ids)
+
+    def __repr__(self):
+
+        return "ArrayMap("+str(dict(zip(self.ids, self.values.tolist())))+")"
+
+    #returns a plain dictionary of python floats, for JSON
+    def to_dict(self):
+
+        return dict(zip(self.ids, self.values.tolist()))
+
+    #returns a pandas Series over the values, not a copy of them
+    #name - name of the series
+    def to_pandas(self,name='x_c'):
+
+        import pandas
+
+        return pandas.Series(self.values,index=pandas.Index(self.ids,name='metabolite'),name=name,copy=False)
+
+    #returns a pyarrow table of the keys and values, the value column is not a copy
+    #name - name of the value column
+    def to_arrow(self,name='x_c'):
+
+        import pyarrow
+
+        return pyarrow.table({'metabolite': pyarrow.array(self.ids,type=pyarrow.string()), name: pyarrow.array(self.values)})
+
+#the {'lb','flux','ub'} of one reaction of a FluxResult, reads and writes go straight to the reaction table
+class ReactionRow(MutableMapping):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #results - FluxResult the reaction is in
+    #rxn_id - reaction ID, looked up on every access so the row stays right if reactions are appended
+    def __init__(self,results,rxn_id):
+
+        self.results = results
+        self.rxn_id = rxn_id
+
+    def __getitem__(self,column):
+
+        if column not in COLUMNS:
+
+            raise KeyError(column)
+
+        return self.results.table[COLUMNS.index(column), self.results.index[self.rxn_id]]
+
+    def __setitem__(self,column,value):
+
+        if column not in COLUMNS:
+
+            raise KeyError(column)
+
+        self.results.table[COLUMNS.index(column), self.results.index[self.rxn_id]] = value
+
+    #the columns are fixed, a reaction always has all three
+    def __delitem__(self,column):
+
+        raise TypeError("the columns of a reaction cannot be deleted")
+
+    def __iter__(self):
+
+        return iter(COLUMNS)
+
+    def __len__(self):
+
+        return len(COLUMNS)
+
+    def __repr__(self):
+
+        return str(dict(self))
+
+#results of one FBA, pFBA, max_mu or max_sum solve
+#every key that is not a reaction or x_c (status, exception, objectives, times, phase_times, ex_sets...) is kept as is
+class FluxResult(MutableMapping):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #ids - reaction IDs
+    #lb, flux, ub - arrays (or scalars for every reaction) of the lower bounds, fluxes and upper bounds, in the order of ids
+    #x_c - dictionary or ArrayMap of the community exchanges, None if there are none
+    #info - the other keys of the results
+    def __init__(self,ids=(),lb=0,flux=0,ub=0,x_c=None,**info):
+
+        self.info = dict(info)
+
+        self.x_c = None
+
+        self.set_columns(ids,lb,flux,ub)
+
+        if x_c is not None:
+
+            self['x_c'] = x_c
+
+    #replaces the reaction table
+    #ids - reaction IDs
+    #lb, flux, ub - arrays (or scalars for every reaction) of the lower bounds, fluxes and upper bounds, in the order of ids
+    def set_columns(self,ids,lb,flux,ub):
+
+        self.ids, self.index = shared_index(ids)
+
+        self.table = numpy.empty((len(COLUMNS), len(self.ids)))
+
+        self.table[0] = lb
+        self.table[1] = flux
+        self.table[2] = ub
+
+    #replaces the reaction table with the bounds of cobra reactions and their fluxes
+    #reactions - list of cobra reactions
+    #flux - array of fluxes in the order of reactions, or one value for every reaction such as 0 if not solved
+    def set_reactions(self,reactions,flux):
+
+        self.set_columns([rxn.id for rxn in reactions],[rxn.lower_bound for rxn in reactions],flux,[rxn.upper_bound for rxn in reactions])
+
+    #adds reactions to the end of the reaction table
+    #ids - reaction IDs, none of them already in the table
+    #lb, flux, ub - as for set_columns
+    def append(self,ids,lb,flux,ub):
+
+        ids = list(ids)
+
+        new_rows = numpy.empty((len(COLUMNS), len(ids)))
+
+        new_rows[0] = lb
+        new_rows[1] = flux
+        new_rows[2] = ub
+
+        self.ids, self.index = shared_index(self.ids + tuple(ids))
+
+        self.table = numpy.concatenate([self.table, new_rows],axis=1)
+
+    #sets x_c from metabolite IDs and their values
+    #mets - metabolite IDs
+    #values - array of values in the order of mets, or one value for every metabolite
+    def set_x_c(self,mets,values):
+
+        mets = list(mets)
+
+        self.x_c = ArrayMap(mets,numpy.broadcast_to(numpy.asarray(values,dtype=float),(len(mets),)).copy())
+
+    #the rows of the reaction table, as arrays in the order of ids
+    @property
+    def lb(self):
+
+        return self.table[0]
+
+    @property
+    def flux(self):
+
+        return self.table[1]
+
+    @property
+    def ub(self):
+
+        return self.table[2]
+
+    #the index is not pickled, it is shared again when unpickled
+    def __getstate__(self):
+
+        state = dict(self.__dict__)
+
+        del state['index']
+
+        return state
+
+    def __setstate__(self,state):
+
+        self.__dict__.update(state)
+
+        self.ids, self.index = shared_index(self.ids)
+
+    #a reaction gives a ReactionRow, so results[rxn_id]['flux'] = value writes into the reaction table as it did in the
+    #nested dictionaries
+    def __getitem__(self,key):
+
+        if key in self.index:
+
+            return ReactionRow(self,key)
+
+        if key == 'x_c' and self.x_c is not None:
+
+            return self.x_c
+
+        return self.info[key]
+
+    #a {'lb','flux','ub'} dictionary is written into the reaction table, adding the reaction if it is new
+    #for a reaction already there any of the three can be given, anything else raises a KeyError as for ReactionRow
+    def __setitem__(self,key,value):
+
+        if key in self.index:
+
+            row = ReactionRow(self,key)
+
+            for column in value:
+
+                row[column] = value[column]
+
+        elif key == 'x_c':
+
+            self.x_c = value if isinstance(value,ArrayMap) else ArrayMap(list(value),list(value.values()))
+
+        elif isinstance(value,Mapping) and set(value) == set(COLUMNS):
+
+            self.append([key],value['lb'],value['flux'],value['ub'])
+
+        else:
+
+            self.info[key] = value
+
+    #only the other keys and x_c can be deleted, the reaction table is set as a whole
+    def __delitem__(self,key):
+
+        if key == 'x_c' and self.x_c is not None:
+
+            self.x_c = None
+
+        else:
+
+            del self.info[key]
+
+    def __iter__(self):
+
+        yield from self.ids
+
+        if self.x_c is not None:
+
+            yield 'x_c'
+
+        yield from self.info
+
+    def __len__(self):
+
+        return len(self.ids) + (self.x_c is not None) + len(self.info)
+
+    def __contains__(self,key):
+
+        return key in self.index or (key == 'x_c' and self.x_c is not None) or key in self.info
+
+    def __repr__(self):
+
+        return "FluxResult("+str(len(self.ids))+" reactions, status="+str(self.info.get('status'))+")"
+
+    #returns the results as the old nested dictionary of python values, for JSON
+    def to_dict(self):
+
+        results = dict(self.info)
+
+        for i, (lb, flux, ub) in enumerate(self.table.T.tolist()):
+
+            results[self.ids[i]] = {'lb': lb, 'flux': flux, 'ub': ub}
+
+        if self.x_c is not None:
+
+            results['x_c'] = self.x_c.to_dict()
+
+        return results
+
+    #returns a FluxResult of a nested results dictionary, such as one read back from a checkpoint
+    #results - dictionary with a {'lb','flux','ub'} dictionary per reaction
+    @classmethod
+    def from_dict(cls,results):
+
+        if isinstance(results,FluxResult):
+
+            return results
+
+        rxn_ids = [key for key, value in results.items() if isinstance(value,Mapping) and set(value) == set(COLUMNS)]
+
+        info = {key: value for key, value in results.items() if key != 'x_c' and key not in set(rxn_ids)}
+
+        flux_result = cls(rxn_ids,[results[rxn_id]['lb'] for rxn_id in rxn_ids],[results[rxn_id]['flux'] for rxn_id in rxn_ids],[results[rxn_id]['ub'] for rxn_id in rxn_ids],**info)
+
+        if 'x_c' in results:
+
+            flux_result['x_c'] = results['x_c']
+
+        return flux_result
+
+    #returns a pandas DataFrame of the reaction table, indexed by reaction ID, over the same array rather than a copy
+    def to_pandas(self):
+
+        import pandas
+
+        #the table is stored one row per column, which is the layout pandas keeps a float block in, so no copy is made
+        return pandas.DataFrame(self.table.T,index=pandas.Index(self.ids,name='reaction'),columns=list(COLUMNS),copy=False)
+
+    #returns a pyarrow table of the reaction table, the float columns are not copies
+    def to_arrow(self):
+
+        import pyarrow
+
+        columns = {'reaction': pyarrow.array(self.ids,type=pyarrow.string())}
+
+        for row, column in enumerate(COLUMNS):
+
+            columns[column] = pyarrow.array(self.table[row])
+
+        return pyarrow.table(columns)
@@ -0,0 +1,63 @@
+#!/usr/bin/python
+#! python 3.9
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+#written to check that building a community of more than two members with SteadyCom.from_members grows linearly
+#with the total number of reactions, compared with building the two member community and calling add_member
+
+#imports
+import cobra
+from steadycom import SteadyCom
+import time
+import os
+import sys
+
+#get the current directory to use for importing things
+curr_dir = os.getcwd()
+
+#largest number of members to build, can be given on the command line
+max_members = 6
+
+if len(sys.argv) > 1:
+
+    max_members = int(sys.argv[1])
+
+model1 = cobra.io.read_sbml_model(curr_dir + "/iCTH669_comm.sbml")
+model2 = cobra.io.read_sbml_model(curr_dir + "/iTSA525_comm.sbml")
+
+#further members are variants of the two models, only the ID needs to differ
+members = [model1, model2]
+
+for i in range(max_members - 2):
+
+    variant = [model1, model2][i % 2].copy()
+
+    variant.id = variant.id + "_v" + str(i + 1)
+
+    members.append(variant)
+
+print("members\treactions\tfrom_members (s)\tper reaction (ms)\tadd_member (s)")
+
+for num_members in range(2, max_members + 1):
+
+    start_time = time.perf_counter()
+
+    comm_obj = SteadyCom.from_members(members[:num_members],"EXCH_",log_file=os.devnull,bigM=1000)
+
+    build_time = time.perf_counter() - start_time
+
+    num_rxns = len(comm_obj.combined_model.reactions)
+
+    #the same community one member at a time
+    start_time = time.perf_counter()
+
+    comm_obj = SteadyCom(members[0],members[1],"EXCH_",log_file=os.devnull,bigM=1000)
+
+    for member in members[2:num_members]:
+
+        comm_obj.add_member(member,"EXCH_")
+
+    add_time = time.perf_counter() - start_time
+
+    print(str(num_members)+"\t"+str(num_rxns)+"\t"+"{:.3f}".format(build_time)+"\t"+"{:.3f}".format(1E3 * build_time / num_rxns)+"\t"+"{:.3f}".format(add_time))
@@ -0,0 +1,107 @@
+#!/usr/bin/python
+#! python 3.9
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+#written to compare the copy-per-call FBA.run path with the session mode of FBA on the bundled SBML files
+
+#imports
+import cobra
+from fba import FBA
+from datetime import datetime
+import math
+import os
+import sys
+
+#get the current directory to use for importing things
+curr_dir = os.getcwd()
+
+#bundled models to benchmark
+sbml_files = [
+
+    "iCTH669_comm.sbml",
+    "iCTH669_w_GLGC_non_comm.sbml",
+    "iTSA525.sbml",
+    "iTSA525_comm.sbml",
+
+]
+
+#number of reactions to run a min and a max FBA for, can be given on the command line
+num_calls = 20
+
+if len(sys.argv) > 1:
+
+    num_calls = int(sys.argv[1])
+
+print("model\treactions\tcalls\tcopy per call (s)\tsession (s)\traw solve (s)\tspeedup\tmax objective difference")
+
+#for each bundled model
+for sbml_file in sbml_files:
+
+    model = cobra.io.read_sbml_model(curr_dir + "/" + sbml_file)
+
+    #reactions whose min and max flux will be found
+    rxn_ids = [rxn.id for rxn in model.reactions[:num_calls]]
+
+    #time the current copy-per-call path
+    copy_fba = FBA(model)
+
+    copy_objectives = []
+
+    start_time = datetime.now()
+
+    for rxn_id in rxn_ids:
+
+        copy_objectives.append(copy_fba.run(rxn_id,"min")['objective'])
+        copy_objectives.append(copy_fba.run(rxn_id,"max")['objective'])
+
+    copy_time = (datetime.now() - start_time).total_seconds()
+
+    #time the session path
+    session_fba = FBA(model,session=True)
+
+    session_objectives = []
+
+    start_time = datetime.now()
+
+    for rxn_id in rxn_ids:
+
+        session_objectives.append(session_fba.run(rxn_id,"min")['objective'])
+        session_objectives.append(session_fba.run(rxn_id,"max")['objective'])
+
+    session_time = (datetime.now() - start_time).total_seconds()
+
+    #time the raw solves on their own as the lower limit of what either path can reach
+    raw_time = 0
+
+    for rxn_id in rxn_ids:
+
+        for obj_dir in ["min","max"]:
+
+            with model:
+
+                model.objective = rxn_id
+                model.objective_direction = obj_dir
+
+                start_time = datetime.now()
+
+                model.slim_optimize()
+
+                raw_time = raw_time + (datetime.now() - start_time).total_seconds()
+
+    #check that both paths agree, infeasible problems give NaN in both
+    max_diff = 0
+
+    for copy_obj, session_obj in zip(copy_objectives, session_objectives):
+
+        try:
+
+            if not (math.isnan(float(copy_obj)) and math.isnan(float(session_obj))):
+
+                max_diff = max(max_diff, abs(float(copy_obj) - float(session_obj)))
+
+        except (TypeError, ValueError):
+
+            max_diff = float("nan")
+
+    print(sbml_file+"\t"+str(len(model.reactions))+"\t"+str(2*len(rxn_ids))+"\t"+"{:.3f}".format(copy_time)+"\t"+"{:.3f}".format(session_time)+"\t"+"{:.3f}".format(raw_time)+"\t"+"{:.1f}".format(copy_time/session_time)+"\t"+"{:.2e}".format(max_diff))
@@ -0,0 +1,81 @@
+#!/usr/bin/python
+#! python 3.9
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+#written to check that building the parsimony (second) stage of pFBA scales linearly with the number of reactions
+#on the merged iCTH669 + iTSA525 community model, run as a regression benchmark after changing the pFBA stages
+
+#imports
+import cobra
+from steadycom import SteadyCom
+from fba import parsimony_objective
+import time
+import os
+import sys
+
+#get the current directory to use for importing things
+curr_dir = os.getcwd()
+
+#number of times each build is repeated, the fastest is reported, can be given on the command line
+num_repeats = 5
+
+if len(sys.argv) > 1:
+
+    num_repeats = int(sys.argv[1])
+
+#build the merged community the same way run_steadycom_test.py does
+model1 = cobra.io.read_sbml_model(curr_dir + "/iCTH669_comm.sbml")
+model2 = cobra.io.read_sbml_model(curr_dir + "/iTSA525_comm.sbml")
+
+bigM = 1000
+
+comm_obj = SteadyCom(model1,model2,"EXCH_",log_file='pfba_benchmark_log.txt',bigM=bigM)
+
+comm_obj.define_abundance({"iCTH669":0.58125,"iTSA525":1-0.58125})
+
+media = {met: bigM for met in ["h_e","nh4_e","h2o_e","ca2_e","mg2_e","k_e","so4_e","pi_e","fe3_e","na1_e","cu2_e"]}
+
+media["cellb_e"] = 5/2
+media["xylb_e"] = 3
+
+comm_obj.define_medium(media)
+
+biomass_eqns = {"iCTH669":"BIOMASS","iTSA525":"biomass_target"}
+
+comm_obj.build_comm_x(biomass_eqns)
+
+model = comm_obj.combined_model
+
+num_rxns = len(model.reactions)
+
+print("reactions\tbuild (s)\tbuild per reaction (us)")
+
+#build the parsimony objective over more and more of the reactions
+for fraction in [0.125, 0.25, 0.5, 0.75, 1]:
+
+    rxns = model.reactions[:int(fraction * num_rxns)]
+
+    best_time = float("inf")
+
+    for repeat in range(num_repeats):
+
+        #the objective is put back when the context exits
+        with model:
+
+            start_time = time.perf_counter()
+
+            parsimony_objective(model,rxns)
+
+            model.solver.update()
+
+            best_time = min(best_time, time.perf_counter() - start_time)
+
+    print(str(len(rxns))+"\t"+"{:.4f}".format(best_time)+"\t"+"{:.2f}".format(1E6 * best_time / len(rxns)))
+
+#the build phase of the full second stages, as logged by max_mu and max_sum
+mu_results = comm_obj.max_mu()
+max_results = comm_obj.max_sum(biomass_eqns)
+
+print("max_mu phase times (s): "+str(mu_results['phase_times']))
+print("max_sum phase times (s): "+str(max_results['phase_times']))
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+#! python 3.9
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+#written to compare the scipy sparse/HiGHS backend of sparse_lp.py with the optlang path of steadycom.py and fba.py on
+#the iCTH669 + iTSA525 community, reports the build and solve times of each and the largest difference in the results
+
+#imports
+import cobra
+from steadycom import SteadyCom
+from sparse_lp import SparseSteadyCom, SparseFBA
+from fba import FBA
+import time
+import os
+
+#get the current directory to use for importing things
+curr_dir = os.getcwd()
+
+model1 = cobra.io.read_sbml_model(curr_dir + "/iCTH669_comm.sbml")
+model2 = cobra.io.read_sbml_model(curr_dir + "/iTSA525_comm.sbml")
+
+bigM = 1000
+
+abundances = {"iCTH669":0.58125,"iTSA525":1-0.58125}
+
+media = {met: bigM for met in ["h_e","nh4_e","h2o_e","ca2_e","mg2_e","k_e","so4_e","pi_e","fe3_e","na1_e","cu2_e"]}
+
+media["cellb_e"] = 5/2
+media["xylb_e"] = 3
+
+biomass_eqns = {"iCTH669":"BIOMASS","iTSA525":"biomass_target"}
+
+#build both communities the same way
+start_time = time.perf_counter()
+
+sparse_comm = SparseSteadyCom([model1,model2],"EXCH_",bigM=bigM)
+sparse_comm.define_abundance(abundances)
+sparse_comm.define_medium(media)
+sparse_comm.build_comm_x(biomass_eqns)
+
+sparse_build = time.perf_counter() - start_time
+
+start_time = time.perf_counter()
+
+comm_obj = SteadyCom(model1,model2,"EXCH_",log_file='sparse_benchmark_log.txt',bigM=bigM)
+comm_obj.define_abundance(abundances)
+comm_obj.define_medium(media)
+comm_obj.build_comm_x(biomass_eqns)
+
+optlang_build = time.perf_counter() - start_time
+
+print("build (s)\tsparse: "+"{:.3f}".format(sparse_build)+"\toptlang: "+"{:.3f}".format(optlang_build))
+
+#max_mu and max_sum on both
+for name, sparse_run, optlang_run, objective_key in [("max_mu", lambda: sparse_comm.max_mu(), lambda: comm_obj.max_mu(), 'mu_objective'),
+                                                     ("max_sum", lambda: sparse_comm.max_sum(biomass_eqns), lambda: comm_obj.max_sum(biomass_eqns), 'bio_objective')]:
+
+    start_time = time.perf_counter()
+
+    sparse_results = sparse_run()
+
+    sparse_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+
+    optlang_results = optlang_run()
+
+    optlang_time = time.perf_counter() - start_time
+
+    flux_diff = max([abs(sparse_results[rxn_id]['flux'] - optlang_results[rxn_id]['flux']) for rxn_id in sparse_comm.rxn_ids])
+
+    print(name+" (s)\tsparse: "+"{:.3f}".format(sparse_time)+"\toptlang: "+"{:.3f}".format(optlang_time))
+    print(name+" objective\tsparse: "+str(sparse_results[objective_key])+"\toptlang: "+str(optlang_results[objective_key]))
+    print(name+" flux sum\tsparse: "+str(sparse_results['flux_objective'])+"\toptlang: "+str(optlang_results['flux_objective']))
+    #the parsimonious fluxes need not be unique, so this can be large while both objectives agree
+    print(name+" largest flux difference: "+str(flux_diff))
+
+#FBA and pFBA of each member on its own objective
+for model in [model1,model2]:
+
+    objective = [rxn.id for rxn in model.reactions if rxn.objective_coefficient != 0][0]
+
+    sparse_fba = SparseFBA(model)
+    fba_object = FBA(model)
+
+    for name in ["run", "run_pFBA"]:
+
+        sparse_results = getattr(sparse_fba,name)(objective)
+        optlang_results = getattr(fba_object,name)(objective)
+
+        print(model.id+" "+name+" objective\tsparse: "+str(sparse_results['objective'])+"\toptlang: "+str(optlang_results['objective']))
@@ -10,6 +10,7 @@ import cobra
 from fva import FVA
 from fba import FBA
 from steadycom import SteadyCom
+from result_writer import ResultWriter
 from datetime import datetime
 from cobra import Model, Reaction, Metabolite
 import re
@@ -97,17 +98,19 @@ comm_obj.build_comm_x(biomass_eqns)      #returns nothing
 print("running steadycom...")
 mu_soln = comm_obj.max_mu()
 
-#report results
-output=open('steadycom_results_test.txt','w',buffering=1)
-output.write("SEADYCOM MAX MU SOLUTION REPORT\n")
-output.write("----------------------------------------------------\n\n")
+#report results, the reaction and community exchange tables are written in bulk by the result writer
+#tsv gives gzip compressed tables in the folder, use file_format='parquet' or 'hdf5' to keep many runs compactly
+writer = ResultWriter.from_community('steadycom_results_test',comm_obj,file_format='tsv')
+
+writer.write(mu_soln,name='max_mu')
+
+writer.close()
 
 #check if an exception occured
 if mu_soln['exception']:
 
     #if here, an exception occured, we have no solution
-    output.write("time to solve: "+str(mu_soln['soln_time'])+"\n")
-    output.write("exception occured, no solution exception: \n"+mu_soln['exception_str']+"\n")
+    print("exception occured, no solution exception: \n"+mu_soln['exception_str'])
 
 else:
 
@@ -115,79 +118,12 @@ else:
     formatted_string1 = "{:.8f}".format(mu_soln['mu_objective'])
     formatted_string2 = "{:.8f}".format(mu_soln['flux_objective'])
 
-    #if here no exception, we have a solution to write about
-    #write our results to the output file
-    output.write("time to solve: "+str(mu_soln['soln_time'])+"\n")
-    output.write("status: "+str(mu_soln['status'])+"\n")
-    output.write("objective value (mu): "+formatted_string1+"\n")
-    output.write("objective value (flux sum): "+formatted_string2+"\n\n")
-    output.write("Community-based reaction rates (V^k_j):")
-    output.write("reaction\tlb\tlevel\tub\n")
-    output.write("----------------------------------------------------------------------------------\n")
-
     print("objective value (mu): ",formatted_string1)
     print("objective value (flux sum): ",formatted_string2)
     print("model status: "+str(mu_soln['status']))
 
-    #for each reaction in the first model
-    for rxn in model1.reactions:
-
-        #make the reaction id that is used in the community model
-        comm_rxn_id = rxn.id+"_"+model1.id
-
-        #write the FBA results
-        output.write(model1.id+"\t"+rxn.id+"\t"+str(mu_soln[comm_rxn_id]['lb'])+"\t"+str(mu_soln[comm_rxn_id]['flux'])+"\t"+str(mu_soln[comm_rxn_id]['ub'])+"\n")
-
-    #also write for each reaction in the secondd model
-    for rxn in model2.reactions:
-
-        #make the reaction id that is used in the community model
-        comm_rxn_id = rxn.id+"_"+model2.id
-
-        #write the FBA results
-        output.write(model2.id+"\t"+rxn.id+"\t"+str(mu_soln[comm_rxn_id]['lb'])+"\t"+str(mu_soln[comm_rxn_id]['flux'])+"\t"+str(mu_soln[comm_rxn_id]['ub'])+"\n")
-
-    #community exchanges
-    output.write("\n\nCOMMUNITY EXCHANGES\n")
-    output.write("metabolite\tx_c\t"+model1.id+"\t"+model2.id+"\n")
-    output.write("------------------------------------------------------\n")
-    
-    #write the community exchange reactions
-    for met in mu_soln['x_c']:
-
-        #create a string for the contributions of the individual models
-        exch_1 = "EXCH_"+met+"_"+model1.id
-        exch_2 = "EXCH_"+met+"_"+model2.id
-
-        #essentially since we don't know what fluxes are associated with reactions are associated with each exchange, use try/except structure to identify them in the simplest manner
-        try:
-
-            #write community and individual model exchanges
-
-            #try writing both
-            output.write(met+"\t"+str(mu_soln['x_c'][met])+"\t"+str(mu_soln[exch_1]['flux'])+"\t"+str(mu_soln[exch_2]['flux'])+"\n")
-
-        except:
-
-            #if there isn't both, figure out which one to write
-
-            try:
-
-                #write community and individual model exchanges
-                output.write(met+"\t"+str(mu_soln['x_c'][met])+"\t0\t"+str(mu_soln[exch_2]['flux'])+"\n")
-
-            except:
-
-                try:
-
-                    #write community and individual model exchanges
-                    output.write(met+"\t"+str(mu_soln['x_c'][met])+"\t"+str(mu_soln[exch_1]['flux'])+"\t0\n")
-                
-                except:
-
-                    #if here reaction doesn't exist, need to have a look
-                    output.write(met+"\t"+str(mu_soln['x_c'][met])+"\t0\t0\tDNE\n")
-        
+print("time to solve: "+str(mu_soln['soln_time']))
+print("results written to steadycom_results_test/")
 
 #get the current time and date for tracking solution time
 end_time = datetime.now()
@@ -0,0 +1,829 @@
+#!/usr/bin/python
+
+#try to specify that we will use python version 3.9
+__author__ = "Wheaton Schroeder"
+#latest version: 10/17/2026
+
+#written as a second LP backend for FBA, pFBA, FVA and the SteadyCom max_mu/max_sum that does not go through
+#optlang. The LP is put together directly as a scipy sparse matrix from the stoichiometric matrix of each model and
+#solved with HiGHS through scipy.optimize.linprog, which skips building and updating optlang/sympy expressions
+#entirely. The LP is the same as the one cobra builds: every reaction has a forward and a reverse variable, both at
+#least zero, so the parsimony stage is the plain sum of all of them. Results come back in the same form as
+#fba.py, fva.py and steadycom.py, except that the exchange sets hold reaction IDs rather than cobra reactions
+
+import re
+import time
+from datetime import datetime
+
+import numpy
+import scipy.sparse
+from scipy.optimize import linprog
+
+from optlang.interface import OPTIMAL, INFEASIBLE, UNBOUNDED, ITERATION_LIMIT, NUMERIC
+
+from cobra.util.array import create_stoichiometric_matrix
+from instrument import Instrument
+from results import FluxResult
+from fva import _open_checkpoint, _record_resumed, _record_blocked, _record_min_max
+
+#linprog status codes as optlang status strings, so results compare with the optlang path
+LINPROG_STATUS = {0: OPTIMAL, 1: ITERATION_LIMIT, 2: INFEASIBLE, 3: UNBOUNDED, 4: NUMERIC}
+
+#a linear program min/max c x subject to row_lb <= A x <= row_ub and col_lb <= x <= col_ub
+class SparseLP(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #A - scipy sparse matrix of the constraint rows
+    #row_lb, row_ub - arrays of the row bounds, -inf/inf where a row has no bound on that side
+    #col_lb, col_ub - arrays of the variable bounds
+    def __init__(self,A,row_lb,row_ub,col_lb,col_ub):
+
+        A = scipy.sparse.csr_matrix(A)
+
+        row_lb = numpy.asarray(row_lb,dtype=float)
+        row_ub = numpy.asarray(row_ub,dtype=float)
+
+        self.col_lb = numpy.asarray(col_lb,dtype=float)
+        self.col_ub = numpy.asarray(col_ub,dtype=float)
+
+        #linprog takes equalities and <= rows, so the rows are sorted into those once here
+        equal = row_lb == row_ub
+
+        self.A_eq = A[equal]
+        self.b_eq = row_lb[equal]
+
+        upper = ~equal & numpy.isfinite(row_ub)
+        lower = ~equal & numpy.isfinite(row_lb)
+
+        self.A_ub = scipy.sparse.vstack([A[upper], -A[lower]],format='csr')
+        self.b_ub = numpy.concatenate([row_ub[upper], -row_lb[lower]])
+
+        #where each row went, to put the duals back in row order
+        self.eq_rows = numpy.flatnonzero(equal)
+        self.upper_rows = numpy.flatnonzero(upper)
+        self.lower_rows = numpy.flatnonzero(lower)
+
+        self.num_rows = A.shape[0]
+        self.num_cols = A.shape[1]
+
+    #solves the LP, returns a dictionary of status, objective, x and duals (None unless optimal)
+    #duals are the shadow prices of the rows given to __init__ (not of extra_rows), the change of the objective per unit
+    #more of the row bound, as optlang reports them
+    #c - array of objective coefficients
+    #direction - "max" or "min"
+    #extra_rows - list of (coefficient array, lb, ub) rows added for this solve only, such as a fixed stage one objective
+    #col_lb, col_ub - variable bounds for this solve only, by default those of the LP
+    def solve(self,c,direction="max",extra_rows=(),col_lb=None,col_ub=None):
+
+        col_lb = self.col_lb if col_lb is None else col_lb
+        col_ub = self.col_ub if col_ub is None else col_ub
+
+        A_ub = self.A_ub
+        b_ub = self.b_ub
+
+        A_eq = self.A_eq
+        b_eq = self.b_eq
+
+        #the extra rows are only ever a few, rows held at one value go with the equalities, others as <= rows
+        if len(extra_rows) > 0:
+
+            eq_rows = []
+            eq_bounds = []
+
+            ub_rows = []
+            ub_bounds = []
+
+            for coefs, lb, ub in extra_rows:
+
+                row = scipy.sparse.csr_matrix(coefs)
+
+                if lb is not None and lb == ub:
+
+                    eq_rows.append(row)
+                    eq_bounds.append(lb)
+
+                    continue
+
+                if ub is not None:
+
+                    ub_rows.append(row)
+                    ub_bounds.append(ub)
+
+                if lb is not None:
+
+                    ub_rows.append(-row)
+                    ub_bounds.append(-lb)
+
+            A_eq = scipy.sparse.vstack([A_eq] + eq_rows,format='csr')
+            b_eq = numpy.concatenate([b_eq, eq_bounds])
+
+            A_ub = scipy.sparse.vstack([A_ub] + ub_rows,format='csr')
+            b_ub = numpy.concatenate([b_ub, ub_bounds])
+
+        #linprog only minimizes
+        sign = -1 if direction == "max" else 1
+
+        solution = linprog(sign * numpy.asarray(c,dtype=float),A_ub=A_ub,b_ub=b_ub,A_eq=A_eq,b_eq=b_eq,bounds=numpy.column_stack([col_lb, col_ub]),method='highs')
+
+        status = LINPROG_STATUS.get(solution.status,NUMERIC)
+
+        if status == OPTIMAL:
+
+            #linprog gives the marginals of the minimized objective, a >= row was negated into a <= row
+            duals = numpy.zeros(self.num_rows)
+
+            duals[self.eq_rows] = solution.eqlin.marginals[:len(self.eq_rows)]
+            duals[self.upper_rows] += solution.ineqlin.marginals[:len(self.upper_rows)]
+            duals[self.lower_rows] -= solution.ineqlin.marginals[len(self.upper_rows):len(self.upper_rows) + len(self.lower_rows)]
+
+            return {'status': status, 'objective': sign * solution.fun, 'x': solution.x, 'duals': sign * duals}
+
+        return {'status': status, 'objective': None, 'x': None, 'duals': None}
+
+#splits reaction bounds into the bounds of the forward and reverse variables, as cobra does
+#returns (forward lb, forward ub, reverse lb, reverse ub) arrays
+#lb, ub - arrays of reaction bounds
+def split_bounds(lb,ub):
+
+    return numpy.maximum(lb,0), numpy.maximum(ub,0), numpy.maximum(-ub,0), numpy.maximum(-lb,0)
+
+#FBA and pFBA on a single cobra model, with the same entry points and results as fba.FBA
+class SparseFBA(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #model - cobra model, only read here, its stoichiometry and bounds are taken once
+    def __init__(self,model):
+
+        self.rxn_ids = [rxn.id for rxn in model.reactions]
+        self.rxn_index = {rxn_id: j for j, rxn_id in enumerate(self.rxn_ids)}
+
+        #rows of the LP, in order
+        self.met_ids = [met.id for met in model.metabolites]
+
+        self.lb = numpy.array([rxn.lower_bound for rxn in model.reactions],dtype=float)
+        self.ub = numpy.array([rxn.upper_bound for rxn in model.reactions],dtype=float)
+
+        stoich = create_stoichiometric_matrix(model,array_type='lil').tocsc()
+
+        #mass balance bounds, zero unless the model says otherwise
+        row_lb = numpy.array([met.constraint.lb if met.constraint.lb is not None else -numpy.inf for met in model.metabolites],dtype=float)
+        row_ub = numpy.array([met.constraint.ub if met.constraint.ub is not None else numpy.inf for met in model.metabolites],dtype=float)
+
+        #forward columns then reverse columns
+        self.lp = SparseLP(scipy.sparse.hstack([stoich, -stoich]),row_lb,row_ub,*self.col_bounds(self.lb,self.ub))
+
+    #returns the forward and reverse variable bounds of reaction bounds, stacked like the columns
+    #lb, ub - arrays of reaction bounds
+    def col_bounds(self,lb,ub):
+
+        fwd_lb, fwd_ub, rev_lb, rev_ub = split_bounds(lb,ub)
+
+        return numpy.concatenate([fwd_lb, rev_lb]), numpy.concatenate([fwd_ub, rev_ub])
+
+    #returns the reaction bounds with the fixed rates applied
+    #fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    def fixed_bounds(self,fixed_rates):
+
+        lb = self.lb.copy()
+        ub = self.ub.copy()
+
+        for rxn_id in fixed_rates:
+
+            if rxn_id in self.rxn_index:
+
+                lb[self.rxn_index[rxn_id]] = fixed_rates[rxn_id]
+                ub[self.rxn_index[rxn_id]] = fixed_rates[rxn_id]
+
+        return lb, ub
+
+    #returns the objective vector of the net flux of one reaction
+    #rxn_id - reaction ID
+    def flux_vector(self,rxn_id):
+
+        c = numpy.zeros(2 * len(self.rxn_ids))
+
+        c[self.rxn_index[rxn_id]] = 1
+        c[len(self.rxn_ids) + self.rxn_index[rxn_id]] = -1
+
+        return c
+
+    #writes the bounds and fluxes of every reaction into a FluxResult
+    #results - FluxResult to write into
+    #lb, ub - arrays of reaction bounds
+    #x - solution, None if not solved, which gives fluxes of NaN
+    def record_fluxes(self,results,lb,ub,x):
+
+        num_rxns = len(self.rxn_ids)
+
+        results.set_columns(self.rxn_ids,lb,float("nan") if x is None else x[:num_rxns] - x[num_rxns:],ub)
+
+    #this will perform FBA, takes the same arguments and returns the same results as FBA.run
+    # objective - the reaction id of the reaction that is to be the objective
+    # obj_dir - direction for optimization, must be "min" or "max"
+    # fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values
+    def run(self,objective,obj_dir="max",fixed_rates=dict()):
+
+        timer = Instrument(report_step=None)
+
+        fba_results = FluxResult()
+
+        start_time_fba = datetime.now()
+
+        try:
+
+            with timer.phase("build"):
+
+                lb, ub = self.fixed_bounds(fixed_rates)
+
+                col_lb, col_ub = self.col_bounds(lb,ub)
+
+                c = self.flux_vector(objective)
+
+            with timer.phase("solve"):
+
+                solution = self.lp.solve(c,obj_dir,col_lb=col_lb,col_ub=col_ub)
+
+            self.record_fluxes(fba_results,lb,ub,solution['x'])
+
+            fba_results['exception'] = False
+
+            fba_results['status'] = solution['status']
+
+            fba_results['total_time'] = str(datetime.now() - start_time_fba)
+
+            fba_results['objective'] = solution['objective'] if solution['status'] == OPTIMAL else "NaN"
+
+        except Exception as e:
+
+            fba_results['exception'] = True
+
+            fba_results['status'] = "exception occurred"
+
+            fba_results['exception_str'] = str(e)
+
+            fba_results['total_time'] = str(datetime.now() - start_time_fba)
+
+            fba_results['objective'] = "NaN"
+
+        fba_results['phase_times'] = timer.phase_times
+
+        return fba_results
+
+    #this will perform pFBA, takes the same arguments and returns the same results as FBA.run_pFBA
+    #the first stage optimizes the objective, the second holds it and minimizes the sum of absolute fluxes
+    # objective - the reaction id of the reaction that is to be the objective
+    # obj_dir - direction for optimization, must be "min" or "max"
+    # fixed_rates - dictionary of fluxes which should be fixed during FBA and keys of the values
+    def run_pFBA(self,objective,obj_dir="max",fixed_rates=dict()):
+
+        timer = Instrument(report_step=None)
+
+        pfba_results = FluxResult()
+
+        start_time_pfba = datetime.now()
+
+        try:
+
+            with timer.phase("build"):
+
+                lb, ub = self.fixed_bounds(fixed_rates)
+
+                col_lb, col_ub = self.col_bounds(lb,ub)
+
+                c = self.flux_vector(objective)
+
+            with timer.phase("solve"):
+
+                solution = self.lp.solve(c,obj_dir,col_lb=col_lb,col_ub=col_ub)
+
+            #as in FBA.run_pFBA, a first stage that cannot be solved is an exception
+            if solution['status'] != OPTIMAL:
+
+                raise ValueError("first problem status: "+str(solution['status']))
+
+            #shadow prices of both stages, as in FBA.run_pFBA
+            pfba_results['shadow_prices'] = {met_id: {'shadow_bio': dual} for met_id, dual in zip(self.met_ids, solution['duals'].tolist())}
+
+            status1 = solution['status']
+
+            with timer.phase("build_parsimony"):
+
+                held = stage_row(c,solution['objective'])
+
+            with timer.phase("solve"):
+
+                solution = self.lp.solve(numpy.ones(len(c)),"min",extra_rows=[held],col_lb=col_lb,col_ub=col_ub)
+
+            if solution['status'] != OPTIMAL:
+
+                raise ValueError("second problem status: "+str(solution['status']))
+
+            self.record_fluxes(pfba_results,lb,ub,solution['x'])
+
+            pfba_results['exception'] = False
+
+            pfba_results['status1'] = status1
+            pfba_results['status2'] = solution['status']
+
+            pfba_results['total_time'] = str(datetime.now() - start_time_pfba)
+
+            pfba_results['objective'] = solution['objective']
+
+            for met_id, dual in zip(self.met_ids, solution['duals'].tolist()):
+
+                pfba_results['shadow_prices'][met_id]['shadow_flux'] = dual
+
+        except Exception as e:
+
+            pfba_results['exception'] = True
+
+            pfba_results['status'] = "exception occurred"
+
+            pfba_results['exception_str'] = str(e)
+
+            pfba_results['total_time'] = str(datetime.now() - start_time_pfba)
+
+            pfba_results['objective'] = "NaN"
+
+        pfba_results['phase_times'] = timer.phase_times
+
+        return pfba_results
+
+#returns an extra row that holds a stage one objective at its optimum
+#it has to be an equality, HiGHS can call a pair of <= rows this tight infeasible by round off
+#c - objective vector of stage one
+#optimum - optimum of stage one
+def stage_row(c,optimum):
+
+    return (c, optimum, optimum)
+
+#FVA on a single cobra model, with the same results as fva.FVA.analyze
+class SparseFVA(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #model - cobra model, only read here
+    def __init__(self,model):
+
+        self.fba = SparseFBA(model)
+
+        #objective of the model, for fraction_of_optimum
+        self.objective = numpy.zeros(2 * len(self.fba.rxn_ids))
+
+        for rxn in model.reactions:
+
+            if rxn.objective_coefficient != 0:
+
+                self.objective += rxn.objective_coefficient * self.fba.flux_vector(rxn.id)
+
+        self.objective_direction = model.objective_direction
+
+    #finds the smallest and largest flux of every reaction, takes the same arguments and returns the same results as
+    #FVA.analyze. linprog starts every solve from scratch, so there is no LP to keep (in_place, prune) or hand to worker
+    #processes (processes, batch_size), asking for those raises a ValueError
+    # fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    # tolerance - not used, as in FVA.analyze
+    # fraction_of_optimum - if given, only explore fluxes that keep the model objective at this fraction of its optimum
+    # blocked - reaction ids known to be blocked, reported with a min and max of 0 without solving, True is not taken
+    #           here since find_blocked needs the cobra model, run FVA.find_blocked first
+    # checkpoint, resume_from - as in FVA.analyze
+    # progress_hook - as in FVA.analyze
+    def analyze(self,fixed_rates=dict(),tolerance=1E-3,processes=None,batch_size=None,in_place=False,prune=False,fraction_of_optimum=None,blocked=None,checkpoint=None,resume_from=None,progress_hook=None):
+
+        if (processes is not None and processes > 1) or batch_size is not None or in_place or prune:
+
+            raise ValueError("processes, batch_size, in_place and prune are not available with the linprog backend")
+
+        if blocked is True:
+
+            raise ValueError("blocked=True needs the cobra model, pass the reactions of FVA.find_blocked instead")
+
+        blocked = set() if blocked is None else set(blocked)
+
+        fba = self.fba
+
+        fva_results = { }
+
+        #reactions finished in an earlier run, and where to write the ones finished in this run
+        resumed, checkpoint_file = _open_checkpoint(checkpoint,resume_from,fixed_rates,fraction_of_optimum)
+
+        start_time_fva = datetime.now()
+
+        lb, ub = fba.fixed_bounds(fixed_rates)
+
+        col_lb, col_ub = fba.col_bounds(lb,ub)
+
+        #the bounds are known before solving, so define them here so that the results keep the model order
+        for j, rxn_id in enumerate(fba.rxn_ids):
+
+            fva_results[rxn_id] = {'lb': lb[j], 'ub': ub[j]}
+
+        #finished and blocked reactions are left out of the solves
+        rxn_ids = _record_blocked(fva_results,_record_resumed(fva_results,fba.rxn_ids,resumed),blocked)
+
+        instrument = Instrument(len(rxn_ids),hook=progress_hook)
+
+        extra_rows = []
+
+        #hold the objective at a fraction of its optimum, as FVA does
+        if fraction_of_optimum is not None:
+
+            with instrument.phase("optimum"):
+
+                optimum = fba.lp.solve(self.objective,self.objective_direction,col_lb=col_lb,col_ub=col_ub)['objective']
+
+            if optimum is not None:
+
+                fva_results['optimum'] = optimum
+
+                #the fraction is taken of the distance from zero in the direction of the objective, as in fva._fix_objective
+                if self.objective_direction == "max":
+
+                    extra_rows.append((self.objective, optimum - (1 - fraction_of_optimum) * abs(optimum), None))
+
+                else:
+
+                    extra_rows.append((self.objective, None, optimum + (1 - fraction_of_optimum) * abs(optimum)))
+
+        for rxn_id in rxn_ids:
+
+            c = fba.flux_vector(rxn_id)
+
+            min_max = []
+
+            for obj_dir in ["min","max"]:
+
+                try:
+
+                    with instrument.phase("solve"):
+
+                        solution = fba.lp.solve(c,obj_dir,extra_rows=extra_rows,col_lb=col_lb,col_ub=col_ub)
+
+                    #a min or max that is not optimal has no answer, as in FVA
+                    if solution['status'] == OPTIMAL:
+
+                        min_max.append({'exception': False, 'objective': solution['objective']})
+
+                    else:
+
+                        min_max.append({'exception': True, 'objective': "NaN", 'exception_str': "solver status: "+str(solution['status'])})
+
+                except Exception as e:
+
+                    min_max.append({'exception': True, 'objective': "NaN", 'exception_str': str(e)})
+
+            _record_min_max(fva_results[rxn_id],min_max[0],min_max[1])
+
+            if checkpoint_file is not None:
+
+                checkpoint_file.write(rxn_id,fva_results[rxn_id])
+
+            instrument.step()
+
+        fva_results['total_time'] = datetime.now() - start_time_fva
+
+        fva_results['instrumentation'] = instrument.summary()
+
+        fva_results['phase_times'] = fva_results['instrumentation']['phase_times']
+
+        if checkpoint_file is not None:
+
+            checkpoint_file.close()
+
+        return fva_results
+
+#max_mu and max_sum of a SteadyCom community, with the LP made straight from the stoichiometric matrices of the members
+#the steps are the same as steadycom.SteadyCom: define_abundance, define_medium, build_comm_x, then max_mu or max_sum
+class SparseSteadyCom(object):
+
+    #initialization of class:
+    #self - needs to be passed itself
+    #models - list of member models, no two with the same ID
+    #exch_tag - unique string tag that identifies an exchange reaction
+    #bigM - bound of mu and of the community exchanges
+    def __init__(self,models,exch_tag,bigM=10000):
+
+        self.members = models
+        self.bigM = bigM
+
+        self.X_k = {}
+        self.media = {}
+
+        exch_pattern = re.compile(exch_tag)
+
+        #reaction ids, member of each reaction, bounds and mass balances of all members, in member order
+        self.rxn_ids = []
+        self.rxn_origin = []
+
+        lb = []
+        ub = []
+
+        row_lb = []
+        row_ub = []
+
+        self.stoich_blocks = []
+
+        #exchange reaction column indices keyed by exchanged metabolite
+        self.exch_sets = {}
+
+        #first column and first row of each member
+        self.member_cols = {}
+        self.member_rows = {}
+
+        num_cols = 0
+        num_rows = 0
+
+        for model in models:
+
+            self.member_cols[model.id] = num_cols
+            self.member_rows[model.id] = num_rows
+
+            stoich = create_stoichiometric_matrix(model,array_type='lil').tocsc()
+
+            self.stoich_blocks.append(stoich)
+
+            for j, rxn in enumerate(model.reactions):
+
+                rxn_id = rxn.id + "_" + model.id
+
+                self.rxn_ids.append(rxn_id)
+                self.rxn_origin.append(model.id)
+
+                lb.append(rxn.lower_bound)
+                ub.append(rxn.upper_bound)
+
+                #each exchange reaction acts on a single metabolite, keyed by its id in the member, one without
+                #metabolites exchanges nothing and is left out as in SteadyCom.member_parts
+                if exch_pattern.search(rxn_id) is not None and stoich.indptr[j + 1] > stoich.indptr[j]:
+
+                    met_id = model.metabolites[stoich.indices[stoich.indptr[j]]].id
+
+                    self.exch_sets.setdefault(met_id,[]).append(num_cols + j)
+
+            for met in model.metabolites:
+
+                row_lb.append(met.constraint.lb if met.constraint.lb is not None else -numpy.inf)
+                row_ub.append(met.constraint.ub if met.constraint.ub is not None else numpy.inf)
+
+            num_cols += len(model.reactions)
+            num_rows += len(model.metabolites)
+
+        self.rxn_index = {rxn_id: j for j, rxn_id in enumerate(self.rxn_ids)}
+
+        self.lb = numpy.array(lb,dtype=float)
+        self.ub = numpy.array(ub,dtype=float)
+
+        self.mass_balance_lb = numpy.array(row_lb,dtype=float)
+        self.mass_balance_ub = numpy.array(row_ub,dtype=float)
+
+        #the metabolite order of the x_c columns and exchange rows
+        self.exch_mets = list(self.exch_sets)
+
+        self.lp = None
+
+    #sets the relative abundances, same rules as SteadyCom.define_abundance
+    #X_k - dictionary of relative abundances keyed by model ID
+    def define_abundance(self,X_k):
+
+        if len(X_k) == len(self.members) and abs(sum(X_k.values()) - 1) < 1E-9:
+
+            self.X_k = dict(X_k)
+
+            #the LP depends on the abundances, so it is made again
+            if self.lp is not None:
+
+                self.build_lp()
+
+            return True
+
+        return False
+
+    #sets the medium, only the bounds of the x_c variables
+    #media - dictionary of exchanged metabolite ID to the largest community uptake, no uptake if left out
+    def define_medium(self,media):
+
+        self.media = dict(media)
+
+    #sets the biomass reaction of each member and makes the LP
+    #biomass_dict - dictionary of model ID to biomass reaction ID in that member
+    def build_comm_x(self,biomass_dict):
+
+        if not len(biomass_dict) == len(self.members):
+
+            return False
+
+        self.biomass_dict = biomass_dict
+
+        self.build_lp()
+
+        return True
+
+    #makes the LP from the stoichiometric matrices of the members
+    #columns: forward variables of every reaction, reverse variables of every reaction, x_c of every exchanged
+    #metabolite, then mu. Rows: the mass balances scaled by X^k, the community exchanges
+    #x_c + sum X^k (v_fwd - v_rev) = 0 and the biomass rows V_bio - X^k mu = 0
+    def build_lp(self):
+
+        timer = Instrument(report_step=None)
+
+        with timer.phase("build"):
+
+            num_rxns = len(self.rxn_ids)
+            num_exch = len(self.exch_mets)
+
+            #mass balances, block diagonal over the members, each scaled by the abundance of its member
+            scaled = scipy.sparse.block_diag([self.X_k[model.id] * stoich for model, stoich in zip(self.members, self.stoich_blocks)],format='csr')
+
+            row_scale = numpy.concatenate([numpy.full(len(model.metabolites),self.X_k[model.id]) for model in self.members])
+
+            mass_balances = scipy.sparse.hstack([scaled, -scaled, scipy.sparse.csr_matrix((scaled.shape[0], num_exch + 1))])
+
+            #community exchanges
+            rows = []
+            cols = []
+            vals = []
+
+            for i, met in enumerate(self.exch_mets):
+
+                rows.append(i)
+                cols.append(2 * num_rxns + i)
+                vals.append(1)
+
+                for j in self.exch_sets[met]:
+
+                    rows.extend([i, i])
+                    cols.extend([j, num_rxns + j])
+                    vals.extend([self.X_k[self.rxn_origin[j]], -self.X_k[self.rxn_origin[j]]])
+
+            #biomass rows
+            self.bio_cols = {}
+
+            for k, model in enumerate(self.members):
+
+                j = self.rxn_index[self.biomass_dict[model.id] + "_" + model.id]
+
+                self.bio_cols[model.id] = j
+
+                rows.extend([num_exch + k, num_exch + k, num_exch + k])
+                cols.extend([j, num_rxns + j, 2 * num_rxns + num_exch])
+                vals.extend([1, -1, -self.X_k[model.id]])
+
+            coupling = scipy.sparse.csr_matrix((vals, (rows, cols)),shape=(num_exch + len(self.members), 2 * num_rxns + num_exch + 1))
+
+            A = scipy.sparse.vstack([mass_balances, coupling],format='csr')
+
+            row_lb = numpy.concatenate([self.mass_balance_lb * row_scale, numpy.zeros(coupling.shape[0])])
+            row_ub = numpy.concatenate([self.mass_balance_ub * row_scale, numpy.zeros(coupling.shape[0])])
+
+            col_lb, col_ub = self.col_bounds(self.lb,self.ub)
+
+            self.lp = SparseLP(A,row_lb,row_ub,col_lb,col_ub)
+
+        self.build_time = timer.phase_times['build']
+
+    #returns the bounds of every column for the given reaction bounds, with the medium and mu
+    #lb, ub - arrays of reaction bounds
+    def col_bounds(self,lb,ub):
+
+        fwd_lb, fwd_ub, rev_lb, rev_ub = split_bounds(lb,ub)
+
+        x_lb = numpy.full(len(self.exch_mets),-float(self.bigM))
+        x_ub = numpy.array([self.media.get(met,0) for met in self.exch_mets],dtype=float)
+
+        return numpy.concatenate([fwd_lb, rev_lb, x_lb, [0]]), numpy.concatenate([fwd_ub, rev_ub, x_ub, [self.bigM]])
+
+    #same as SteadyCom.max_mu: maximizes mu, then holds it and minimizes the sum of absolute fluxes
+    #fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    def max_mu(self,fixed_rates=dict()):
+
+        c = numpy.zeros(self.lp.num_cols)
+
+        c[-1] = 1
+
+        return self.lexicographic(c,fixed_rates,'mu_objective')
+
+    #same as SteadyCom.max_sum: maximizes the sum of the biomass rates, then holds it and minimizes the sum of
+    #absolute fluxes
+    #biomass_dict - dictionary of biomass reaction identifiers
+    #fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    def max_sum(self,biomass_dict,fixed_rates=dict()):
+
+        num_rxns = len(self.rxn_ids)
+
+        c = numpy.zeros(self.lp.num_cols)
+
+        for model in self.members:
+
+            rxn_id = biomass_dict[model.id] + "_" + model.id
+
+            if rxn_id in self.rxn_index:
+
+                c[self.rxn_index[rxn_id]] = 1
+                c[num_rxns + self.rxn_index[rxn_id]] = -1
+
+        return self.lexicographic(c,fixed_rates,'bio_objective')
+
+    #two stage solve shared by max_mu and max_sum, returns the same results as SteadyCom.lexicographic
+    #stage_one - objective vector of stage one
+    #fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    #objective_key - key the stage one optimum is returned under
+    def lexicographic(self,stage_one,fixed_rates,objective_key):
+
+        timer = Instrument(report_step=None)
+
+        num_rxns = len(self.rxn_ids)
+
+        lex_results = FluxResult()
+
+        #exchange sets by reaction ID
+        lex_results['ex_sets'] = {met: [self.rxn_ids[j] for j in self.exch_sets[met]] for met in self.exch_mets}
+
+        start_time_lex = datetime.now()
+
+        try:
+
+            with timer.phase("build"):
+
+                lb = self.lb.copy()
+                ub = self.ub.copy()
+
+                for rxn_id in fixed_rates:
+
+                    if rxn_id in self.rxn_index:
+
+                        lb[self.rxn_index[rxn_id]] = fixed_rates[rxn_id]
+                        ub[self.rxn_index[rxn_id]] = fixed_rates[rxn_id]
+
+                col_lb, col_ub = self.col_bounds(lb,ub)
+
+            with timer.phase("solve"):
+
+                solution = self.lp.solve(stage_one,"max",col_lb=col_lb,col_ub=col_ub)
+
+            status = solution['status']
+
+            if status == OPTIMAL:
+
+                stage_one_optimum = solution['objective']
+
+                #the parsimony stage is the sum of the forward and reverse variables of every reaction
+                with timer.phase("build_parsimony"):
+
+                    parsimony = numpy.zeros(self.lp.num_cols)
+
+                    parsimony[:2 * num_rxns] = 1
+
+                    held = stage_row(stage_one,stage_one_optimum)
+
+                with timer.phase("solve"):
+
+                    solution = self.lp.solve(parsimony,"min",extra_rows=[held],col_lb=col_lb,col_ub=col_ub)
+
+                status = solution['status']
+
+            lex_results['exception'] = False
+
+            lex_results['status'] = status
+
+            lex_results['solve_time'] = datetime.now() - start_time_lex
+            lex_results['soln_time'] = str(lex_results['solve_time'])
+
+            x = solution['x']
+
+            if status == OPTIMAL:
+
+                lex_results[objective_key] = stage_one_optimum
+                lex_results['flux_objective'] = solution['objective']
+
+            else:
+
+                lex_results[objective_key] = 0
+                lex_results['flux_objective'] = 0
+
+            lex_results.set_columns(self.rxn_ids,lb,0 if x is None else x[:num_rxns] - x[num_rxns:2 * num_rxns],ub)
+
+            lex_results.set_x_c(self.exch_mets,0 if x is None else x[2 * num_rxns:2 * num_rxns + len(self.exch_mets)])
+
+        except Exception as e:
+
+            lex_results['exception'] = True
+
+            lex_results['status'] = "exception occurred"
+
+            lex_results['exception_str'] = str(e)
+
+            lex_results['solve_time'] = datetime.now() - start_time_lex
+            lex_results['soln_time'] = str(lex_results['solve_time'])
+
+            lex_results[objective_key] = 0
+            lex_results['flux_objective'] = 0
+
+            lex_results.set_columns(self.rxn_ids,self.lb,float("nan"),self.ub)
+
+            lex_results.set_x_c(self.exch_mets,float("nan"))
+
+        lex_results['phase_times'] = timer.phase_times
+
+        return lex_results
@@ -21,15 +21,28 @@ from optlang.symbolics import Zero, add
 import os
 import sys
 import warnings
+import logging
 import re
+import time
+import multiprocessing
 import cobra
 from datetime import datetime
-from fba import FBA
+from fba import FBA, parsimony_objective
 from fva import FVA
+from checkpoint import Checkpoint, as_stored
+from instrument import Instrument
+from compact_model import read_model
+from results import FluxResult
 
 import copy
+import numpy
+import scipy.sparse
 
 from cobra import Model, Reaction, Metabolite, Solution
+from cobra.util.array import create_stoichiometric_matrix
+
+#the log of each community is a child of this logger, see SteadyCom.open_log
+logger = logging.getLogger(__name__)
 
 #now that we have defined the import library, let us create a class for the mintransfers algorithm
 class SteadyCom(object):
@@ -39,436 +52,493 @@ class SteadyCom(object):
     #model1 - first model of the coculture
     #model2 - second model of the coculture
     #exch_tag - unique string tag that identifies an exchange reaction
-    #note initiation is always for two models, will add a function to add additional models later
+    #note initiation is for two models, use from_members for a community of more than two members
     #note: this only really works if each exchange reaction has only one exchanged metatolite!
-    def __init__(self,model1,model2,exch_tag,log_file='steadycom_log.txt',bigM=10000):
+    #remove_blocked - if True, reactions that are blocked in a member model are left out of the community model
+    #session - if True, max_mu and max_sum solve both stages on the combined model itself rather than on a copy, see lexicographic
+    #more_members - any further member models of the community, all members are built in the same pass
+    #log_level - lowest level written to the log file, logging.DEBUG also writes out every constraint that is built
+    def __init__(self,model1,model2,exch_tag,log_file='steadycom_log.txt',bigM=10000,remove_blocked=False,session=False,more_members=(),log_level=logging.INFO):
 
         #define an output log file which may be useful for debugging purposes
         #log file for building the community
-        self.log=open(log_file,'w',buffering=1)
-        
-        #define a combined model, start it out as as copy of model 1
-        self.combined_model = model1.copy()
+        self.open_log(log_file,log_level)
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+        #in session mode the two stage solves reuse the combined model
+        self.session = session
 
-        #initialize a dictionary for exchange reaction sets
-        self.exch_sets = {}
+        #reactions left out of the community model, keys are community reaction ids, values are (lb, ub)
+        self.removed_rxns = {}
 
         #create a list of the models/members of the community
         #note this list will contain the models, not just the model names
-        self.members = []
+        self.members = [model1, model2] + list(more_members)
+
+        #drop the blocked reactions before anything is merged
+        if remove_blocked:
+
+            self.members = [self.remove_blocked(model) for model in self.members]
+
+        #initialize a dictionary for exchange reaction sets
+        self.exch_sets = {}
 
         #let the user define a bigM, otherwise just use a large default value
         self.bigM = bigM
 
-        #add the members
-        self.members.append(model1)
-        self.members.append(model2)
-
         #initialize a dictionary of X^K values, where value is the relative abundance of member species, key is the model ID
         #this list will be populated later
         self.X_k = {}
 
-        #add an attribute to the combined model noting which model the reactions originally belonged to
-        for rxn in self.combined_model.reactions:
+        #medium of the community, set by define_medium
+        self.media = {}
 
-            #add origin attribute, use the original model ID for the origin attribute
-            setattr(rxn,'origin',model1.id)
+        #exchange reactions are found with the same pattern for every member, so compile it once
+        self.exch_pattern = re.compile(exch_tag)
 
-            #add origin tag to the reaction id, metaid, and name sp don't get "ignoring reaction since it already exists" issue
-            rxn.id = rxn.id + "_" + model1.id
-            rxn.name = rxn.name + " " + model1.name
+        #build the combined model from all of the members at once
+        self.build_community()
 
-            #while we are at it find exchange reactions, set attributes of if exchange reaction and exchanged metabolite
-            #search using the regulat expression tag
-            if bool(re.search(exch_tag,rxn.id)):
+        self.log.info("current model id: %s",self.combined_model.id)
+        self.log.info("current model name: %s",self.combined_model.name)
+        self.log.info("current model members: %s",self.members)
 
-                #state that it is an exchange
-                setattr(rxn,"isexch",True)
+        #write the exchange dictionary to make sure I have done this right
+        if self.log.isEnabledFor(logging.DEBUG):
 
-                #set metabolite which is exchanged
-                rxn_mets = rxn.metabolites
+            self.log.debug("current model exchange reaction sets: %s",self.combined_model.id)
 
-                #set the metaboltes it is exchanging
-                #note that this will be a dictionary so need to get bare metabolite ID
+            for key in self.exch_sets:
 
-                #get the metabolite key
-                met_key = str(rxn_mets.keys())
+                self.log.debug("key: %s; value: %s",key,self.exch_sets[key])
 
-                #split the key to get just the metabolite ID
-                split_key = re.findall(r'\w+', met_key)
+    #creates a community of any number of members, such as three- and four-species consortia
+    #takes the same options as __init__
+    #models - list of member models, at least two, no two with the same ID
+    @classmethod
+    def from_members(cls,models,exch_tag,log_file='steadycom_log.txt',bigM=10000,remove_blocked=False,session=False,log_level=logging.INFO):
 
-                setattr(rxn,"exchof",split_key[2])
-                setattr(rxn,"exchstoich",rxn.get_coefficient(split_key[2]))
+        if len(models) < 2:
 
-                #add the exchange reaction to the appropriate list in the dictionary of exchange reactions
-                if split_key[2] in self.exch_sets:
+            raise ValueError("a community needs at least two members, got "+str(len(models)))
 
-                    #if here, add the new reaction to the list of reactions which are exchanges of that key in the dictionary
-                    self.exch_sets.append(rxn)
+        member_ids = [model.id for model in models]
 
-                else:
+        if len(set(member_ids)) < len(member_ids):
 
-                    #if here, then need to create a new dictionary item for a list of reactions
-                    #list will have just one reaction at this time
-                    self.exch_sets[split_key[2]] = [rxn]
+            raise ValueError("no two members of a community can have the same ID: "+str(member_ids))
 
-            else:
+        return cls(models[0],models[1],exch_tag,log_file=log_file,bigM=bigM,remove_blocked=remove_blocked,session=session,more_members=models[2:],log_level=log_level)
 
-                #state that the reactions is not an exchange
-                setattr(rxn,"isexch",False)
+    #creates a fully built community (abundances, medium and build_comm_x done) from member SBML files
+    #with a cache the finished community is loaded from disk when the same files and settings were built before
+    #sbml_files - paths of the member SBML files
+    #media, X_k, biomass_dict - as given to define_medium, define_abundance and build_comm_x
+    #cache - ModelCache to load from and store in, None to always build from the SBML files
+    #store_dir - folder for the compact format of the SBML files (see compact_model), None for compact_model.STORE_DIR
+    #the other options are as in __init__
+    @classmethod
+    def from_sbml(cls,sbml_files,exch_tag,media,X_k,biomass_dict,log_file='steadycom_log.txt',bigM=10000,remove_blocked=False,session=False,cache=None,store_dir=None,log_level=logging.INFO):
 
-                #give a blank for the exchanged metabolites
-                setattr(rxn,"exchof","")
+        key = None
 
-                #give a blank dictionary for the exchanged metabolites
-                setattr(rxn,"exchstoich",0)
+        if cache is not None and cache.enabled:
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+            key = cache.key(sbml_files,exch_tag,media,X_k,biomass_dict,bigM,options={'remove_blocked': remove_blocked, 'session': session})
 
-        #also give origins and updated ids to metabolites
-        for met in self.combined_model.metabolites:
+            community = cache.load(key)
 
-            #add origin attribute, use the original model ID for the origin attribute
-            setattr(met,'origin',model1.id)
+            if community is not None:
 
-            #add origin tag to the reaction id, metaid, and name sp don't get "ignoring reaction since it already exists" issue
-            met.id = met.id + "_" + model1.id
-            met.name = met.name + " " + model1.name
+                #start a new log for this run, as building would have
+                community.open_log(log_file,log_level)
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+                community.log.info("loaded community %s from cache entry %s",community.combined_model.id,key)
 
-        #add the second model
-        self.combined_model.merge(copy.copy(model2))
+                return community
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+        #the SBML files are only parsed the first time, after that the members are made from the compact format
+        models = [read_model(sbml_file,store_dir) for sbml_file in sbml_files]
 
-        #for each reaction now in the combined model
-        for rxn in self.combined_model.reactions:
+        community = cls.from_members(models,exch_tag,log_file=log_file,bigM=bigM,remove_blocked=remove_blocked,session=session,log_level=log_level)
 
-            #if it does not yet have an origin, then the origin is the second model
-            if not hasattr(rxn,'origin'):
+        if not community.define_abundance(X_k):
 
-                #add origin attribute, use the original model ID for the origin attribute
-                setattr(rxn,'origin',model2.id)
+            raise ValueError("abundances do not match the members or do not add up to one: "+str(X_k))
 
-                #add origin tag to the reaction id, metaid, and name sp don't get "ignoring reaction since it already exists" issue
-                rxn.id = rxn.id + "_" + model2.id
-                rxn.name = rxn.name + " " + model2.name
+        community.define_medium(media)
 
-            #while we are at it find exchange reactions, set attributes of if exchange reaction and exchanged metabolite
-            #search using the regulat expression tag
-            #not need to only make notes on exchange if it was part of the second model originally
-            if bool((re.search(exch_tag,rxn.id))) and (bool(re.match(model2.id,rxn.origin))):
+        community.build_comm_x(biomass_dict)
 
-                #state that it is an exchange
-                setattr(rxn,"isexch",True)
+        if key is not None:
 
-                #set metabolite which is exchanged
-                rxn_mets = rxn.metabolites
+            cache.store(key,community)
 
-                #set the metaboltes it is exchanging
-                #note that this will be a dictionary
-                
-                #get the metabolite key
-                met_key = str(rxn_mets.keys())
+        return community
 
-                #split the key to get just the metabolite ID
-                split_key = re.findall(r'\w+', met_key)
+    #sets self.log to a logger of this community that writes to log_file
+    #messages also go on to the "steadycom" logger, so they show up in whatever logging the calling script set up
+    #log_file - path of the log file, only created once something is written
+    #log_level - lowest level written, such as logging.INFO or logging.DEBUG
+    #mode - 'w' to start a new log file, 'a' to add to an existing one
+    def open_log(self,log_file,log_level=logging.INFO,mode='w'):
 
-                setattr(rxn,"exchof",split_key[2])
-                setattr(rxn,"exchstoich",rxn.get_coefficient(split_key[2]))
+        #close the file of a log opened before
+        if getattr(self,'log',None) is not None:
 
-                #add the exchange reaction to the appropriate list in the dictionary of exchange reactions
-                if split_key[2] in self.exch_sets:
+            for handler in self.log.handlers:
 
-                    #if here, add the new reaction to the list of reactions which are exchanges of that key in the dictionary
-                    self.exch_sets[split_key[2]].append(rxn)
+                handler.close()
 
-                else:
+        self.log_file = log_file
+        self.log_level = log_level
 
-                    #if here, then need to create a new dictionary item for a list of reactions
-                    #list will have just one reaction at this time
-                    self.exch_sets[split_key[2]] = [rxn]
+        #a logger of its own rather than one from logging.getLogger, so each community has its own file and the
+        #logger is freed along with the community
+        self.log = logging.Logger(logger.name+"."+str(id(self)),level=log_level)
+        self.log.parent = logger
 
-            else:
+        handler = logging.FileHandler(log_file,mode=mode,delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
 
-                #state that the reactions is not an exchange
-                setattr(rxn,"isexch",False)
+        self.log.addHandler(handler)
 
-                #give a blank for the exchanged metabolites
-                setattr(rxn,"exchof","")
+    #the log cannot be pickled, so it is left out and opened again (appending) on unpickling
+    def __getstate__(self):
 
-                #give a blank dictionary for the exchanged metabolites
-                setattr(rxn,"exchstoich",0)
+        state = self.__dict__.copy()
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
-        
-        #also give origins and updated ids to metabolites
-        for met in self.combined_model.metabolites:
+        del state['log']
 
-            #if it does not yet have an origin, then the origin is the second model
-            if not hasattr(met,'origin'):
-                
-                #add origin attribute, use the original model ID for the origin attribute
-                setattr(met,'origin',model2.id)
+        return state
 
-                #add origin tag to the reaction id, metaid, and name sp don't get "ignoring reaction since it already exists" issue
-                met.id = met.id + "_" + model2.id
-                met.name = met.name + " " + model2.name
+    def __setstate__(self,state):
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+        self.__dict__.update(state)
 
-        #set the name and ID of the combined model
-        new_name = ""
-        new_id = ""
+        self.open_log(self.log_file,self.log_level,mode='a')
+
+    #builds the combined model from self.members in one pass
+    #new reactions and metabolites are made straight from the sparse stoichiometric matrix of each member, with the
+    #member id added to their ids, and then added to an empty model all at once. Copying the first member and merging in
+    #the rest goes over the whole combined model for every member, so this keeps the build linear in the total size
+    def build_community(self):
+
+        self.combined_model = Model()
+
+        self.name_community()
+
+        #use the same solver and tolerance as the first member
+        self.combined_model.solver = self.members[0].solver.interface
+        self.combined_model.tolerance = self.members[0].tolerance
+
+        compartments = {}
+
+        new_mets = []
+        new_rxns = []
+        exch_rxns = []
+
+        #the objective of the first member is kept, as merging did before
+        objective = {}
 
-        #make a count for the number of names, used for formatting
-        num_names = 0
-        
-        #for each model
         for model in self.members:
 
-            if num_names == 0: 
+            compartments.update(model.compartments)
 
-                #add that model to the community model name
-                new_name = new_name+model.name
-                new_id = new_id+model.id
+            member_mets, member_rxns, member_exch_rxns = self.member_parts(model,self.exch_pattern)
 
-            else: 
+            if model is self.members[0]:
 
-                #add that model to the community model name, with appropriate formatting
-                new_name = new_name+"&"+model.name
-                new_id = new_id+"&"+model.id
-        
-            num_names = num_names + 1
-            
-        self.combined_model.id = new_id+"_community"
-        self.combined_model.name = new_name+"_community"
+                for rxn, new_rxn in zip(model.reactions, member_rxns):
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+                    if rxn.objective_coefficient != 0:
 
-        self.log.write("current model id: "+self.combined_model.id+"\n")
-        self.log.write("current model name: "+self.combined_model.name+"\n")
-        self.log.write("current model members: "+str(self.members)+"\n\n")
+                        objective[new_rxn] = rxn.objective_coefficient
 
-        self.log.write("current model exchange reaction sets: "+self.combined_model.id+"\n")
-        #write the exchange dictionary to make sure I have done this right
-        for key in self.exch_sets:
+            new_mets.extend(member_mets)
+            new_rxns.extend(member_rxns)
+            exch_rxns.extend(member_exch_rxns)
+
+        #add everything to the model at once
+        self.combined_model.add_metabolites(new_mets)
+        self.combined_model.add_reactions(new_rxns)
 
-            self.log.write("key: "+key+"; value: "+str(self.exch_sets[key])+"\n")
+        self.combined_model.compartments = compartments
 
         #need to sprinkle these around whenever changing the model so changes stick correctly
         self.combined_model.solver.update()
         self.combined_model.repair()
 
-    #sets up the equations related to the medium based on the 
-    def define_medium(self,media):
+        self.combined_model.objective = objective
 
-        """
-        THIS SECTION DEALS WITH DEFINING u^c_i AND e^c_i VARIABLES AND THE CONSTRAINT RELATED TO CLASS-LEVEL 
-        BECAUSE u^c_i AND e^c_i CAN TAKE ANY VALUE WITH RESPECT TO EACH OTHER WE WILL INSTEAD DEFINE A NEW VARIABLE
-        x^c_i WHICH REPRESENTS THE COMMUNITY EXCHANGE OF METABOLITE i
-        """
+        self.add_exch_sets(exch_rxns)
 
-        #included for formatting of the log file
-        self.log.write("\n\n")
+        #need to sprinkle these around whenever changing the model so changes stick correctly
+        self.combined_model.solver.update()
+        self.combined_model.repair()
 
-        #we determine which metabolites need community constraints by self.exch_sets
-        #recall that the keys of self.exch_sets are metabolites
-        for met in self.exch_sets:
+    #sets the ID and name of the combined model from those of the members
+    def name_community(self):
 
-            #for each metabolite, we define one new variable and one new constraint to relate its exchanges to a community exchange
-            #initiate x_c for the metabolite, default assumption it is not in the medium
-            x_met = self.combined_model.problem.Variable(name='x_c_{}'.format(met),lb=-self.bigM,ub=0)
+        self.combined_model.id = "&".join([model.id for model in self.members])+"_community"
+        self.combined_model.name = "&".join([model.name for model in self.members])+"_community"
 
-            #define x_c based on its presence/absence in the medium
-            if met in media.keys():
+    #makes the metabolites and reactions of a member for the combined model, with the member id added to their ids, the
+    #origin attribute and the exchange attributes (isexch, exchof, exchstoich). The member model itself is not changed
+    #returns the list of new metabolites, the list of new reactions (in the order of the member reactions) and the list
+    #of the new reactions that are exchanges
+    #model - member model
+    #exch_pattern - compiled regular expression that identifies an exchange reaction
+    def member_parts(self,model,exch_pattern):
 
-                #first make the variable, this depends on if it is in the medium
-                x_met.ub = media[met]
+        suffix = "_" + model.id
 
-            #add the new variable to the model
-            self.combined_model.add_cons_vars([x_met], sloppy=False)
+        #stoichiometry of the member, one column per reaction
+        stoich_matrix = create_stoichiometric_matrix(model,array_type='lil').tocsc()
 
-            #apparently this is needed otherwise the new constraint won't register
-            self.combined_model.solver.update()
-            self.combined_model.repair()
+        #new metabolites in the same order as the rows
+        member_mets = []
 
-            #now defined the new constraint
-            exch_const = self.combined_model.problem.Constraint(x_met,lb=0,ub=0,name='exch_const_{}'.format(met),sloppy=False)
+        for met in model.metabolites:
 
-            #need to add constraint to the model before I can chang their coefficients
-            self.combined_model.add_cons_vars([exch_const], sloppy=False)
+            #add origin tag to the reaction id, metaid, and name sp don't get "ignoring reaction since it already exists" issue
+            new_met = Metabolite(met.id+suffix,formula=met.formula,name=met.name+" "+model.name,charge=met.charge,compartment=met.compartment)
 
-            #apparently this is needed otherwise the new constraint won't register
-            self.combined_model.solver.update()
-            self.combined_model.repair()
+            new_met.annotation = dict(met.annotation)
+            new_met.notes = dict(met.notes)
 
-            #need add each exchange reaction in the set to the constraint
-            for exch_rxn in self.exch_sets[met]:
+            #add origin attribute, use the original model ID for the origin attribute
+            setattr(new_met,'origin',model.id)
 
-                #add flux expression of that reaction to the constraint
-                exch_const.set_linear_coefficients({exch_rxn.forward_variable: 1 * self.X_k[exch_rxn.origin]})
-                exch_const.set_linear_coefficients({exch_rxn.reverse_variable: -1 * self.X_k[exch_rxn.origin]})
+            member_mets.append(new_met)
 
-            #by this point the exchange constraint should be written
-            self.log.write("\nCommunity exchange constraint for "+met+":\n"+str(exch_const)+"\n")
-            self.log.write("x_c bounds, lb: "+str(x_met.lb)+"\tub: "+str(x_met.ub)+"\n\n")
+        member_rxns = []
+        exch_rxns = []
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+        for index, rxn in enumerate(model.reactions):
 
-    #this adds another member to the community
-    #modeln - the model of the nth member to add to the community
-    #exch_tag - as in __init__, the exchange tag is what 
-    def add_member(self,modeln,exch_tag):
+            new_rxn = Reaction(rxn.id+suffix,name=rxn.name+" "+model.name,subsystem=rxn.subsystem,lower_bound=rxn.lower_bound,upper_bound=rxn.upper_bound)
 
-        self.members.append(modeln)
+            new_rxn.annotation = dict(rxn.annotation)
+            new_rxn.notes = dict(rxn.notes)
+            new_rxn.gene_reaction_rule = rxn.gene_reaction_rule
 
-        #add the second model
-        self.combined_model.merge(modeln.copy())
+            #column of the stoichiometric matrix of this reaction
+            start = stoich_matrix.indptr[index]
+            end = stoich_matrix.indptr[index + 1]
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+            rows = stoich_matrix.indices[start:end]
+            values = stoich_matrix.data[start:end]
 
-        #for each reaction now in the combined model
-        for rxn in self.combined_model.reactions:
+            new_rxn.add_metabolites({member_mets[row]: value for row, value in zip(rows, values)})
 
-            #if it does not yet have an origin, then the origin is the second model
-            if not hasattr(rxn,'origin'):
+            #add origin attribute, use the original model ID for the origin attribute
+            setattr(new_rxn,'origin',model.id)
 
-                #add origin attribute, use the original model ID for the origin attribute
-                setattr(rxn,'origin',modeln.id)
+            #an exchange reaction without metabolites exchanges nothing, so it is not put in an exchange set
+            if exch_pattern.search(new_rxn.id) is not None and len(rows) == 0:
 
-                #add origin tag to the reaction id, metaid, and name sp don't get "ignoring reaction since it already exists" issue
-                rxn.id = rxn.id + "_" + modeln.id
-                rxn.name = rxn.name + " " + modeln.name
+                self.log.warning("exchange reaction %s has no metabolites, it is not treated as an exchange",new_rxn.id)
 
             #while we are at it find exchange reactions, set attributes of if exchange reaction and exchanged metabolite
             #search using the regulat expression tag
-            #not need to only make notes on exchange if it was part of the second model originally
-            if (bool(re.search(exch_tag,rxn.id))) and (bool(re.match(modeln.id,rxn.origin))):
+            if exch_pattern.search(new_rxn.id) is not None and len(rows) > 0:
 
-                #state that it is an exchange
-                setattr(rxn,"isexch",True)
+                #each exchange reaction acts on a single metabolite, the key of the exchange set is its id in the member
+                setattr(new_rxn,"isexch",True)
+                setattr(new_rxn,"exchof",model.metabolites[rows[0]].id)
+                setattr(new_rxn,"exchstoich",values[0])
 
-                #set metabolite which is exchanged
-                rxn_mets = rxn.metabolites
+                exch_rxns.append(new_rxn)
 
-                #set the metaboltes it is exchanging
-                #note that this will be a dictionary
-                
-                #get the metabolite key
-                met_key = str(rxn_mets.keys())
+            else:
 
-                #split the key to get just the metabolite ID
-                split_key = re.findall(r'\w+', met_key)
+                #state that the reactions is not an exchange
+                setattr(new_rxn,"isexch",False)
 
-                setattr(rxn,"exchof",split_key[2])
-                setattr(rxn,"exchstoich",rxn.get_coefficient(split_key[2]))
+                #give a blank for the exchanged metabolites
+                setattr(new_rxn,"exchof","")
 
-                #add the exchange reaction to the appropriate list in the dictionary of exchange reactions
-                if split_key[2] in self.exch_sets:
+                #give a blank dictionary for the exchanged metabolites
+                setattr(new_rxn,"exchstoich",0)
 
-                    #if here, add the new reaction to the list of reactions which are exchanges of that key in the dictionary
-                    self.exch_sets[split_key[2]].append(rxn)
+            member_rxns.append(new_rxn)
 
-                else:
+        return member_mets, member_rxns, exch_rxns
 
-                    #if here, then need to create a new dictionary item for a list of reactions
-                    #list will have just one reaction at this time
-                    self.exch_sets[split_key[2]] = [rxn]
+    #returns a copy of a member model without the reactions that can never carry flux in it
+    #a reaction blocked in the member on its own is also blocked in the community, since the community only adds
+    #constraints to each member (the community exchanges and the biomass coupling), so it is safe to leave out
+    #the removed reactions are kept in self.removed_rxns so that results can still report them with zero flux
+    #model - member model to remove the blocked reactions from
+    def remove_blocked(self,model):
 
-            else:
+        #FVA works on its own copy of the model, which is the copy that gets returned
+        fva_object = FVA(model)
 
-                #state that the reactions is not an exchange
-                setattr(rxn,"isexch",False)
+        blocked = fva_object.find_blocked()
 
-                #give a blank for the exchanged metabolites
-                setattr(rxn,"exchof","")
+        pruned_model = fva_object.model
 
-                #give a blank dictionary for the exchanged metabolites
-                setattr(rxn,"exchstoich",0)
+        #remember the bounds under the id the reaction would have had in the community
+        for rxn_id in blocked:
+
+            rxn = pruned_model.reactions.get_by_id(rxn_id)
+
+            self.removed_rxns[rxn_id+"_"+model.id] = (rxn.lower_bound, rxn.upper_bound)
+
+        pruned_model.remove_reactions(blocked,remove_orphans=True)
 
         #need to sprinkle these around whenever changing the model so changes stick correctly
+        pruned_model.solver.update()
+        pruned_model.repair()
+
+        self.log.info("removed %d blocked reactions from %s",len(blocked),model.id)
+
+        return pruned_model
+
+    #adds the reactions that were removed as blocked to a results dictionary, with zero flux
+    #results - FluxResult of max_mu, max_sum, lexicographic or solve_steadycom
+    def add_removed_rxns(self,results):
+
+        if len(self.removed_rxns) == 0:
+
+            return
+
+        rxn_ids = list(self.removed_rxns)
+
+        results.append(rxn_ids,[self.removed_rxns[rxn_id][0] for rxn_id in rxn_ids],0,[self.removed_rxns[rxn_id][1] for rxn_id in rxn_ids])
+
+    #sets up the equations related to the medium based on the media dictionary
+    #the x_c variables and community exchange constraints are made the first time, after that a new medium only changes
+    #the upper bounds of the x_c variables, so switching between media does not need the community to be built again
+    #media - dictionary of exchanged metabolite ID (as in exch_sets) to the largest community uptake, no uptake if left out
+    def define_medium(self,media):
+
+        """
+        THIS SECTION DEALS WITH DEFINING u^c_i AND e^c_i VARIABLES AND THE CONSTRAINT RELATED TO CLASS-LEVEL 
+        BECAUSE u^c_i AND e^c_i CAN TAKE ANY VALUE WITH RESPECT TO EACH OTHER WE WILL INSTEAD DEFINE A NEW VARIABLE
+        x^c_i WHICH REPRESENTS THE COMMUNITY EXCHANGE OF METABOLITE i
+        """
+
+        #keep the medium, scan_media puts it back when it is done
+        self.media = dict(media)
+
+        #once the x_c variables are there a medium is just their bounds
+        if self.has_medium():
+
+            for met in self.exch_sets:
+
+                self.combined_model.variables['x_c_{}'.format(met)].set_bounds(-self.bigM,media.get(met,0))
+
+            self.log.debug("medium changed to %s",media)
+
+            return
+
+        x_vars = []
+        exch_consts = []
+
+        #we determine which metabolites need community constraints by self.exch_sets
+        #recall that the keys of self.exch_sets are metabolites
+        for met in self.exch_sets:
+
+            #for each metabolite, we define one new variable and one new constraint to relate its exchanges to a community exchange
+            #define x_c based on its presence/absence in the medium, no uptake if it is not in the medium
+            x_met = self.combined_model.problem.Variable(name='x_c_{}'.format(met),lb=-self.bigM,ub=media.get(met,0))
+
+            #now defined the new constraint
+            exch_const = self.combined_model.problem.Constraint(x_met,lb=0,ub=0,name='exch_const_{}'.format(met),sloppy=False)
+
+            x_vars.append(x_met)
+            exch_consts.append(exch_const)
+
+        #add all of the variables and constraints at once, with a single update rather than one per metabolite
+        self.combined_model.add_cons_vars(x_vars + exch_consts, sloppy=False)
+
+        #apparently this is needed otherwise the new constraint won't register
         self.combined_model.solver.update()
-        self.combined_model.repair()
 
-        #also give origins and updated ids to metabolites
-        for met in self.combined_model.metabolites:
+        for met, x_met, exch_const in zip(self.exch_sets, x_vars, exch_consts):
+
+            new_coefs = { }
+
+            #need add each exchange reaction in the set to the constraint
+            for exch_rxn in self.exch_sets[met]:
+
+                #add flux expression of that reaction to the constraint
+                new_coefs[exch_rxn.forward_variable] = 1 * self.X_k[exch_rxn.origin]
+                new_coefs[exch_rxn.reverse_variable] = -1 * self.X_k[exch_rxn.origin]
 
-            #if it does not yet have an origin, then the origin is the second model
-            if not hasattr(met,'origin'):
-                
-                #add origin attribute, use the original model ID for the origin attribute
-                setattr(met,'origin',modeln.id)
+            exch_const.set_linear_coefficients(new_coefs)
 
-                #add origin tag to the reaction id, metaid, and name sp don't get "ignoring reaction since it already exists" issue
-                met.id = met.id + "_" + modeln.id
-                met.name = met.name + " " + modeln.name
+            #by this point the exchange constraint should be written, only turned into a string at debug level
+            self.log.debug("Community exchange constraint for %s:\n%s",met,exch_const)
+            self.log.debug("x_c bounds, lb: %s\tub: %s",x_met.lb,x_met.ub)
 
         #need to sprinkle these around whenever changing the model so changes stick correctly
         self.combined_model.solver.update()
         self.combined_model.repair()
 
-        #set the name and ID of the combined model
-        new_name = ""
-        new_id = ""
+    #returns True once define_medium has made the x_c variables
+    def has_medium(self):
 
-        #make a count for the number of names, used for formatting
-        num_names = 0
-        
-        #for each model
-        for model in self.members:
+        return any('x_c_{}'.format(met) in self.combined_model.variables for met in self.exch_sets)
 
-            if num_names == 0: 
+    #adds exchange reactions to the dictionary of exchange reaction sets, keyed by the exchanged metabolite
+    #exch_rxns - exchange reactions of the combined model, made by member_parts
+    def add_exch_sets(self,exch_rxns):
 
-                #add that model to the community model name
-                new_name = new_name+model.name
-                new_id = new_id+model.id
+        for rxn in exch_rxns:
 
-            else: 
+            #add the exchange reaction to the appropriate list in the dictionary of exchange reactions
+            if rxn.exchof in self.exch_sets:
 
-                #add that model to the community model name, with appropriate formatting
-                new_name = new_name+"&"+model.name
-                new_id = new_id+"&"+model.id
-        
-            num_names = num_names + 1
-            
-        self.combined_model.id = new_id+"_community"
-        self.combined_model.name = new_name+"_community"
+                #if here, add the new reaction to the list of reactions which are exchanges of that key in the dictionary
+                self.exch_sets[rxn.exchof].append(rxn)
+
+            else:
+
+                #if here, then need to create a new dictionary item for a list of reactions
+                #list will have just one reaction at this time
+                self.exch_sets[rxn.exchof] = [rxn]
+
+    #this adds another member to the community
+    #the new reactions and metabolites are made the same way as in build_community and added to the combined model
+    #modeln - the model of the nth member to add to the community
+    #exch_tag - as in __init__, the exchange tag is what 
+    def add_member(self,modeln,exch_tag):
+
+        self.members.append(modeln)
+
+        new_mets, new_rxns, exch_rxns = self.member_parts(modeln,re.compile(exch_tag))
+
+        #add the new member
+        self.combined_model.add_metabolites(new_mets)
+        self.combined_model.add_reactions(new_rxns)
+
+        #cobra adds these to the compartments already there, as build_community does
+        self.combined_model.compartments = modeln.compartments
 
         #need to sprinkle these around whenever changing the model so changes stick correctly
         self.combined_model.solver.update()
         self.combined_model.repair()
 
-        self.log.write("current model id: "+self.combined_model.id)
-        self.log.write("current model name: "+self.combined_model.name)
-        self.log.write("current model members: "+str(self.members)+"\n")
+        self.add_exch_sets(exch_rxns)
+
+        #set the name and ID of the combined model
+        self.name_community()
+
+        self.log.info("current model id: %s",self.combined_model.id)
+        self.log.info("current model name: %s",self.combined_model.name)
+        self.log.info("current model members: %s",self.members)
 
-        self.log.write("current model exchange reaction sets: "+self.combined_model.id)
         #write the exchange dictionary to make sure I have done this right
-        for key in self.exch_sets:
+        if self.log.isEnabledFor(logging.DEBUG):
+
+            self.log.debug("current model exchange reaction sets: %s",self.combined_model.id)
 
-            self.log.write("key: "+key+"; value: "+str(self.exch_sets[key]))
+            for key in self.exch_sets:
+
+                self.log.debug("key: %s; value: %s",key,self.exch_sets[key])
 
     #method to define the abundances of the species members
     #note - length of X_k needs to be the same as the number of members of the community for the assignement to work
@@ -485,7 +555,8 @@ class SteadyCom(object):
             sum_abund = sum_abund + X_k[key]
     
         #check if abundanecs add up to one and have the same number in the list as members
-        if (len(X_k) == len(self.members)) and (sum_abund == 1):
+        #allow for round off, e.g. x + (1 - x) is not always exactly one
+        if (len(X_k) == len(self.members)) and (abs(sum_abund - 1) < 1E-9):
 
             #if so, make the abundances assignement
             self.X_k = X_k
@@ -494,7 +565,7 @@ class SteadyCom(object):
         else:
 
             print("Wrong number of abundances given")
-            self.log.write("Wrong number of abundances given")
+            self.log.error("Wrong number of abundances given")
             return False
         
     #self - needs to be passed itself
@@ -506,13 +577,15 @@ class SteadyCom(object):
     #allows tracking community-based exchange rates without mass imbalances that might get flagged because "gDW" is different for each
     #community member and the community as a whole
     #note this is pretty much SteadyCom 
-    def build_comm_x(self,biomass_dict): 
+    #progress_hook - function called with a progress dictionary (done, total, items_per_second, eta) after every
+    #                metabolite, and with the summary kept as self.build_instrumentation at the end, see instrument.py
+    def build_comm_x(self,biomass_dict,progress_hook=None): 
 
         #check if abundances add up to one and have the same number in the list as members
         if not len(biomass_dict) == len(self.members):
 
             print("\n\nWrong number of biomass equations given!")
-            self.log.write("\n\nWrong number of biomass equations given!")
+            self.log.error("Wrong number of biomass equations given!")
             return False 
 
         #keep the biomass_dict for later use in other functions
@@ -520,7 +593,7 @@ class SteadyCom(object):
 
         #if here, then the right number of biomass equations given
 
-        self.log.write("\n\nBegin log for building the following community model of with constant community composition: \n")
+        self.log.info("Begin log for building the following community model of with constant community composition:")
 
         #since variable number of models, need to next writing these models and abundanes in a loop
         num_models = 0
@@ -528,11 +601,11 @@ class SteadyCom(object):
         for model in self.members:
 
             #write what the component models are abundances are to the log file
-            self.log.write("Model "+str(num_models)+": "+model.id+", (abundance: "+str(self.X_k[model.id])+")\n")
+            self.log.info("Model %d: %s, (abundance: %s)",num_models,model.id,self.X_k[model.id])
 
             num_models = num_models + 1
 
-        self.log.write("Community Model: "+self.combined_model.id+"\n")
+        self.log.info("Community Model: %s",self.combined_model.id)
 
         """
         THIS SECTION DEALS WITH CHANGING v^k_j TO V^k_j (E.G. SCALING EVERYTHING BY X^K)
@@ -540,143 +613,19 @@ class SteadyCom(object):
         FOR EACH REAECTION IN THE MODEL
         """
 
-        #number of metabolite constraints changed
-        num_mets_done = 0
-
-        #stores the number of metabolites in the model
-        num_mets = len(self.combined_model.metabolites)
-
-        #determines if the first time above a certain percentage
-        done_10 = False
-        done_20 = False
-        done_30 = False
-        done_40 = False
-        done_50 = False
-        done_60 = False
-        done_70 = False
-        done_80 = False
-        done_90 = False
-        done_100 = False
-
-        #note that the [1:2] bit means that the list has only one element, big time saver when debugging
-        #for met in self.combined_model.metabolites[1:2]:
-        for met in self.combined_model.metabolites:
-
-            #get the constraints it is involved with
-            constraint = met.constraint
-            
-            #get the constraint expression
-            const_expr = constraint.expression
-
-            #use the expression, split into terms
-            #note that pulling coefficients using "get_linear_coefficients" always showed coefficients of zero, so have to go through expression to get 
-            #them using find all since there should be multiple matches
-            #this captures sign, stoichiometry, and reaction in order, ignores the rest of the framework
-            
-            self.log.write("\nconstraint to update\n")
-            self.log.write("constraint: "+str(const_expr)+"\n")
-
-            expr_terms = re.findall(r"(?P<sign>\-|\+)*\s*(?P<stoich>\d+\.\d+)\*(?P<rxn>.+?)(\s|$)", str(const_expr))
-
-            self.log.write("split constraint: "+str(expr_terms)+"\n")
-
-            #loop through each term getting stoichiometry and reaction
-            for term in expr_terms:
-
-                #multiply abundance by old stoichiometry to get the new stoichiometry
-                new_stoich = float(term[1])*self.X_k[met.origin]
-
-                #get the variable
-                #specify an empty string as a placeholder
-                term_var = ""
+        #progress reports and time spent in each phase of the build
+        instrument = Instrument(len(self.combined_model.metabolites),hook=progress_hook)
 
-                #for each variable
-                for var in constraint.variables:
+        #scale the coefficients straight from the stoichiometric matrix rather than parsing the constraint strings
+        with instrument.phase("scale"):
 
-                    #check if name matches the term[2] value
-                    if bool(re.match("^"+term[2]+"$",var.name)):
-
-                        #then var is the variable we are looking for
-                        term_var = var
-
-                #aupdate constraint coefficient for the new term
-                #needed to concatenate the sign with the coefficient when passing it to update the stoichiometry
-                constraint.set_linear_coefficients({term_var: float(str(term[0])+str(new_stoich))})  
-
-                #update the bounds of the constraint based on species abundance
-                constraint.lb = constraint.lb * self.X_k[met.origin]
-                constraint.ub = constraint.ub * self.X_k[met.origin]
-
-            #after this, the constraint in question should be updated and reaction rates will now be V^k_j
-            #here, we write those results to the log for inspection in case that is necesssary 
-            self.log.write("new mass balance constraint on: "+met.id+"\n"+str(constraint)+"\n\n")
-
-            #decide if need to report on progress
-            num_mets_done += 1
-
-            if num_mets_done >= 0.1 * num_mets and not done_10:
-
-                done_10 = True
-
-                print("10% complete")
-
-            elif num_mets_done >= 0.2 * num_mets and not done_20:
-
-                done_20 = True
-
-                print("20% complete")
-
-            elif num_mets_done >= 0.3 * num_mets and not done_30:
-
-                done_30 = True
-
-                print("30% complete")
-
-            elif num_mets_done >= 0.4 * num_mets and not done_40:
-
-                done_40 = True
-
-                print("40% complete")    
-
-            elif num_mets_done >= 0.5 * num_mets and not done_50:
-
-                done_50 = True
-
-                print("50% complete")    
-
-            elif num_mets_done >= 0.6 * num_mets and not done_60:
-
-                done_60 = True
-
-                print("60% complete")    
-
-            elif num_mets_done >= 0.7 * num_mets and not done_70:
-
-                done_70 = True
-
-                print("70% complete")    
-
-            elif num_mets_done >= 0.8 * num_mets and not done_80:
-
-                done_80 = True
-
-                print("80% complete")    
-
-            elif num_mets_done >= 0.9 * num_mets and not done_90:
-
-                done_90 = True
-
-                print("90% complete")    
-
-            elif num_mets_done >= 1 * num_mets and not done_100:
-
-                done_100 = True
-
-                print("100% complete")      
+            self.scale_mass_balances(instrument)
 
         #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+        with instrument.phase("update_repair"):
+
+            self.combined_model.solver.update()
+            self.combined_model.repair()
         
         """
         THIS SECTION DEALS WITH DEFINING A BIOMASS CONSTRAINT
@@ -684,6 +633,8 @@ class SteadyCom(object):
         and link each biomass to mu
         """
         
+        start_time_phase = time.perf_counter()
+
         #first create the variable mu
         mu_var = self.combined_model.problem.Variable('mu',lb=0,ub=self.bigM)
 
@@ -712,38 +663,170 @@ class SteadyCom(object):
                 self.combined_model.solver.update()
 
                 #by this point the exchange constraint should be written
-                self.log.write("Biomass constraint for "+rxn.id+" (model: "+rxn.origin+"):\n"+str(bio_const)+"\n\n")
+                self.log.debug("Biomass constraint for %s (model: %s):\n%s",rxn.id,rxn.origin,bio_const)
+
+        instrument.add_time("biomass",time.perf_counter() - start_time_phase)
 
         #need to sprinkle these around whenever changing the model so changes stick correctly
-        self.combined_model.solver.update()
-        self.combined_model.repair()
+        with instrument.phase("update_repair"):
+
+            self.combined_model.solver.update()
+            self.combined_model.repair()
         
         """
         THIS SECTION SETS MAXIMIZING BIOMASS AS THE OBJECTIVE OF THE MODEL
         """
 
         #start by creating a new objective equations
-        self.combined_model.objective = self.combined_model.problem.Objective(mu_var, direction='max')
+        with instrument.phase("objective"):
+
+            self.combined_model.objective = self.combined_model.problem.Objective(mu_var, direction='max')
         
         #I think this is all that is needed, lets check
-        self.log.write("Ojective equation for "+self.combined_model.id+":\n"+str(self.combined_model.objective)+"\n")
+        self.log.debug("Ojective equation for %s:\n%s",self.combined_model.id,self.combined_model.objective)
 
         #need to sprinkle these around whenever changing the model so changes stick correctly
+        with instrument.phase("update_repair"):
+
+            self.combined_model.solver.update()
+            self.combined_model.repair()
+
+        #rate and time spent in each phase of the build
+        self.build_instrumentation = instrument.summary()
+
+        self.log.info("Build phase times (s): %s",self.build_instrumentation['phase_times'])
+
+    #sets the coefficients of every mass balance constraint to the stoichiometry times X^k of the member the metabolite
+    #belongs to, turning the member fluxes v^k_j into V^k_j. The coefficients are read from the reactions as a sparse
+    #matrix (metabolites x reactions), the columns are scaled by X^k of their member in one product and each row is written
+    #to its constraint with a single call. Always starts from the unscaled stoichiometry, so can be called again with new X^k
+    #instrument - Instrument to report progress to, one step per metabolite
+    #reuse - if True, use the stoichiometric matrix kept from the last call rather than reading it from the reactions again
+    def scale_mass_balances(self,instrument=None,reuse=False):
+
+        #make sure the solver has every reaction before coefficients are written
         self.combined_model.solver.update()
-        self.combined_model.repair()
 
-    #pass a string to set the solver to that string
-    def set_solver(self,solver):
+        reactions = self.combined_model.reactions
+        metabolites = self.combined_model.metabolites
 
-        #set the solver to the passed string
-        try:
+        #unscaled stoichiometric matrix, stored by column for the scaling
+        if not reuse or not hasattr(self,'stoich_matrix'):
 
-            self.model.solver = solver
+            self.stoich_matrix = create_stoichiometric_matrix(self.combined_model,array_type='lil').tocsc()
 
-        #if an exception occurs, store as "e"
-        except Exception as e:
+        stoich = self.stoich_matrix
 
-            print("solver assignement unsuccessful, exception: "+str(e))
+        #abundance of the member each reaction belongs to
+        col_scale = numpy.array([self.X_k[rxn.origin] for rxn in reactions])
+
+        #scale every column at once, then go back to rows to write the constraints
+        scaled = (stoich @ scipy.sparse.diags(col_scale)).tocsr()
+
+        #forward and reverse variable of each column
+        fwd_vars = [rxn.forward_variable for rxn in reactions]
+        rev_vars = [rxn.reverse_variable for rxn in reactions]
+
+        #the unscaled bounds are kept the first time so scaling again does not compound
+        if not hasattr(self,'mass_balance_bounds'):
+
+            self.mass_balance_bounds = {met.id: (met.constraint.lb, met.constraint.ub) for met in metabolites}
+
+        for row in range(scaled.shape[0]):
+
+            met = metabolites[row]
+
+            constraint = met.constraint
+
+            #the row of the scaled matrix holds the new coefficient of every reaction the metabolite takes part in
+            cols = scaled.indices[scaled.indptr[row]:scaled.indptr[row + 1]]
+            vals = scaled.data[scaled.indptr[row]:scaled.indptr[row + 1]]
+
+            new_coefs = { }
+
+            for col, val in zip(cols, vals):
+
+                new_coefs[fwd_vars[col]] = val
+                new_coefs[rev_vars[col]] = -val
+
+            constraint.set_linear_coefficients(new_coefs)
+
+            #update the bounds of the constraint based on species abundance
+            lb, ub = self.mass_balance_bounds[met.id]
+
+            constraint.lb = None if lb is None else lb * self.X_k[met.origin]
+            constraint.ub = None if ub is None else ub * self.X_k[met.origin]
+
+            if instrument is not None:
+
+                instrument.step()
+
+        self.log.debug("scaled %d mass balance constraints (%d coefficients) by the abundance of their member",scaled.shape[0],scaled.nnz)
+
+    #changes the relative abundances of an already built community without building it again
+    #only the coefficients that depend on X^k are rewritten on the existing solver problem: the mass balances, the
+    #community exchange constraints (exch_const_*) and the biomass constraints (bio_const_*). Everything else, including
+    #the medium and the solver basis, is left as it is, so sweeping many compositions only costs the coefficient updates
+    #X_k - dictionary of relative abundances keyed by model ID, same rules as define_abundance
+    #returns false if the abundances are not valid, true if the community was updated
+    def update_abundance(self,X_k):
+
+        #check and store the new abundances
+        if not self.define_abundance(X_k):
+
+            return False
+
+        #mass balances, from the stoichiometric matrix kept by build_comm_x
+        self.scale_mass_balances(reuse=True)
+
+        #community exchange constraints, only there once define_medium has run
+        for met in self.exch_sets:
+
+            if 'exch_const_{}'.format(met) not in self.combined_model.constraints:
+
+                continue
+
+            exch_const = self.combined_model.constraints['exch_const_{}'.format(met)]
+
+            new_coefs = { }
+
+            for exch_rxn in self.exch_sets[met]:
+
+                new_coefs[exch_rxn.forward_variable] = 1 * self.X_k[exch_rxn.origin]
+                new_coefs[exch_rxn.reverse_variable] = -1 * self.X_k[exch_rxn.origin]
+
+            exch_const.set_linear_coefficients(new_coefs)
+
+        #biomass constraints, V_bio - X^k * mu = 0
+        if 'mu' in self.combined_model.variables:
+
+            mu_var = self.combined_model.variables['mu']
+
+            for model in self.members:
+
+                if 'bio_const_{}'.format(model.id) in self.combined_model.constraints:
+
+                    self.combined_model.constraints['bio_const_{}'.format(model.id)].set_linear_coefficients({mu_var: -1 * self.X_k[model.id]})
+
+        #need to sprinkle these around whenever changing the model so changes stick correctly
+        self.combined_model.solver.update()
+
+        self.log.debug("updated abundances: %s",self.X_k)
+
+        return True
+
+    #pass a string to set the solver to that string
+    def set_solver(self,solver):
+
+        #set the solver to the passed string
+        try:
+
+            self.model.solver = solver
+
+        #if an exception occurs, store as "e"
+        except Exception as e:
+
+            print("solver assignement unsuccessful, exception: "+str(e))
 
             #if here, it didn't work, return false
             return False
@@ -760,8 +843,18 @@ class SteadyCom(object):
     #media - a dictionary of metabolites which comprises allowed community uptake metabolites and the max uptake rate
     def max_mu(self,fixed_rates=dict()):
 
+        #in session mode nothing is copied
+        if self.session:
+
+            return self.lexicographic({self.combined_model.variables.mu: 1},fixed_rates,'mu_objective')
+
+        #time spent copying, building each stage and solving, returned as mu_results['phase_times']
+        timer = Instrument(report_step=None)
+
         #create a duplicate model for adding constraints without affecting the base model
-        max_mu_model = self.combined_model.copy()
+        with timer.phase("copy"):
+
+            max_mu_model = self.combined_model.copy()
 
         #give the problem a name
         max_mu_model.problem.name = "Find parsimonious maximum growth sum"
@@ -771,21 +864,22 @@ class SteadyCom(object):
         max_mu_model.repair()
 
         #initialize an empty dictionary for returning with results
-        mu_results = { }
+        mu_results = FluxResult()
 
         #add to the results the list of exchange sets
         mu_results['ex_sets'] = self.exch_sets
     
         #at this point, everything should be set up to maximize for mu
-        self.log.write("\n\nAttempting to solve "+max_mu_model.id+" for maximum growth rate\n\n")
+        self.log.info("Attempting to solve %s for maximum growth rate",max_mu_model.id)
+
+        #fix the rates that need to be fixed, if any, setting both bounds at once avoids lb > ub errors
+        with timer.phase("build"):
 
-        #fix the rates that need to be fixed, if any
-        for rxn in max_mu_model.reactions:
+            for rxn_id in fixed_rates:
 
-            if rxn.id in fixed_rates.keys():
+                if rxn_id in max_mu_model.reactions:
 
-                rxn.lower_bound = fixed_rates[rxn.id]
-                rxn.upper_bound = fixed_rates[rxn.id]
+                    max_mu_model.reactions.get_by_id(rxn_id).bounds = (fixed_rates[rxn_id], fixed_rates[rxn_id])
 
         #solve, but put in a try/except framework in case there is an error
         try:
@@ -798,7 +892,9 @@ class SteadyCom(object):
 
             #try to solve, here is where the error may get thrown
             #this will be to maximize mu
-            mu_soln = max_mu_model.optimize()
+            with timer.phase("solve"):
+
+                mu_soln = max_mu_model.optimize()
 
             #get the sum of biomass reaction rates so we can fix them
             max_mu = mu_soln.objective_value
@@ -807,48 +903,37 @@ class SteadyCom(object):
 
             print("solver status: \n"+str(mu_soln.status)+"\n")
             print("Objective value (mu): \n"+str(max_mu)+"\n\n")
-            self.log.write("solver status: \n"+str(mu_soln.status)+"\n")
-            self.log.write("Objective value (mu): \n"+str(max_mu)+"\n\n")
+            self.log.info("solver status: %s",mu_soln.status)
+            self.log.info("Objective value (mu): %s",max_mu)
 
             #fix the value of mu based on this solution so that biomass rates must be maintained while minimizing reaction rates
 
-            #do this by fixing the bounds
-            max_mu_model.variables.mu.lb = max_mu
-            max_mu_model.variables.mu.ub = max_mu
-
-            #create a new objective equation minimizing the sum of flux rates
-            #set a dummy objective to add coefficients for each reaction to
-            max_mu_model.objective = max_mu_model.problem.Objective(Zero, direction='min')
+            #build the whole parsimony stage in one batch
+            with timer.phase("build_parsimony"):
 
-            #go through each reaction, see which matches the identifier
-            for rxn in max_mu_model.reactions:
+                #do this by fixing the bounds
+                max_mu_model.variables.mu.set_bounds(max_mu,max_mu)
 
-                #make a variable to store the absolute value of each reaction rate
-                v_plus_rxn = max_mu_model.problem.Variable(name='v_+_{}'.format(rxn.id),lb=0,ub=2*self.bigM)
+                #create a new objective equation minimizing the sum of flux rates
+                parsimony_objective(max_mu_model)
 
-                #create two constraints to get back the absolute value
-                v_plus_const_1 = max_mu_model.problem.Constraint(v_plus_rxn - rxn.flux_expression,lb=0,ub=2*self.bigM,name='v_+_1_{}'.format(rxn.id),sloppy=False)
-                v_plus_const_2 = max_mu_model.problem.Constraint(v_plus_rxn + rxn.flux_expression,lb=0,ub=2*self.bigM,name='v_+_2_{}'.format(rxn.id),sloppy=False)
-
-                #add these constraints to the model
-                max_mu_model.add_cons_vars([v_plus_const_1, v_plus_const_2], sloppy=False)
-
-                #set the objective so that we are minimizing the sum of absolute values
-                max_mu_model.objective.set_linear_coefficients({v_plus_rxn: 1})
+                #need to sprinkle these around whenever changing the model so changes stick correctly
+                max_mu_model.solver.update()
+                max_mu_model.repair()
 
-            #need to sprinkle these around whenever changing the model so changes stick correctly
-            max_mu_model.solver.update()
-            max_mu_model.repair()
+            self.log.info("parsimony stage built in %s s",timer.phase_times['build_parsimony'])
 
             #solve with a fixed growth rate, minimizing sum of reaction fluxes
-            mu_soln = max_mu_model.optimize()
+            with timer.phase("solve"):
+
+                mu_soln = max_mu_model.optimize()
 
             print("solver status: \n"+str(mu_soln.status)+"\n")
             print("Objective value (mu): \n"+str(mu_results['mu_objective'])+"\n")
             print("Objective value (flux sum): \n"+str(mu_soln.objective_value)+"\n\n")
-            self.log.write("solver status: \n"+str(mu_soln.status)+"\n")
-            self.log.write("Objective value (mu): \n"+str(mu_results['mu_objective'])+"\n")
-            self.log.write("Objective value (flux sum): \n"+str(mu_soln.objective_value)+"\n\n")
+            self.log.info("solver status: %s",mu_soln.status)
+            self.log.info("Objective value (mu): %s",mu_results['mu_objective'])
+            self.log.info("Objective value (flux sum): %s",mu_soln.objective_value)
 
             end_time_mu = datetime.now()
 
@@ -871,23 +956,11 @@ class SteadyCom(object):
                 mu_results['mu_objective'] = 0
                 mu_results['flux_objective'] = 0
 
-                #write and store the lower bound, flux, and upper bound for each reaction
-                for rxn in max_mu_model.reactions:
-
-                    #initialize element to nest
-                    mu_results[rxn.id] = { }
-                
-                    mu_results[rxn.id]['lb'] = rxn.lower_bound
-                    mu_results[rxn.id]['flux'] = 0
-                    mu_results[rxn.id]['ub'] = rxn.upper_bound
+                #store the lower bound, flux, and upper bound of every reaction as columns
+                mu_results.set_reactions(max_mu_model.reactions,0)
 
-                #initialize x_c dictionary
-                mu_results['x_c'] = { }
-                
-                #save the community exchange reactions
-                for met in self.exch_sets.keys():
-                    
-                    mu_results['x_c'][met] = 0
+                #community exchanges, in the order of the exchange sets
+                mu_results.set_x_c(self.exch_sets,0)
 
             else:
 
@@ -895,27 +968,14 @@ class SteadyCom(object):
                 mu_results['mu_objective'] = max_mu
                 mu_results['flux_objective'] = mu_soln.objective_value
 
-                #store the lower bound, flux, and upper bound for each reaction
-                for rxn in max_mu_model.reactions:
+                #store the lower bound, flux, and upper bound of every reaction as columns, the fluxes are in reaction order
+                mu_results.set_reactions(max_mu_model.reactions,mu_soln.fluxes.to_numpy())
 
-                    #store the results to the output dictionary
-                    #I believe this would be most useful set up as a nested dictionary
+                #community exchanges, in the order of the exchange sets
+                #primal_values makes a new dictionary every time it is read, so read it once
+                x_c_primals = max_mu_model.solver.primal_values
 
-                    #initialize element to nest
-                    mu_results[rxn.id] = { }
-
-                    #nest bounds and flux rates
-                    mu_results[rxn.id]['lb'] = rxn.lower_bound
-                    mu_results[rxn.id]['flux'] = mu_soln.fluxes[rxn.id]
-                    mu_results[rxn.id]['ub'] = rxn.upper_bound
-
-                #initialize x_c dictionary
-                mu_results['x_c'] = { }
-
-                #save the community exchange reactions
-                for met in self.exch_sets.keys():
-                    
-                    mu_results['x_c'][met] = max_mu_model.solver.primal_values.get('x_c_{}'.format(met))
+                mu_results.set_x_c(self.exch_sets,[x_c_primals.get('x_c_{}'.format(met)) for met in self.exch_sets])
 
         #if an exception occurs, store as "e"
         except Exception as e:
@@ -942,284 +1002,1238 @@ class SteadyCom(object):
             mu_results['mu_objective'] = 0
             mu_results['flux_objective'] = 0
 
-            #write and store the lower bound, flux, and upper bound for each reaction
-            for rxn in max_mu_model.reactions:
+            #store the lower bound, flux, and upper bound of every reaction as columns
+            mu_results.set_reactions(max_mu_model.reactions,0)
 
-                #initialize element to nest
-                mu_results[rxn.id] = { }
+            #community exchanges, in the order of the exchange sets
+            mu_results.set_x_c(self.exch_sets,0)
+        
+        #seconds spent in each phase
+        mu_results['phase_times'] = timer.phase_times
 
-                mu_results[rxn.id]['lb'] = rxn.lower_bound
-                mu_results[rxn.id]['flux'] = 0
-                mu_results[rxn.id]['ub'] = rxn.upper_bound
+        #reactions left out as blocked carry no flux
+        self.add_removed_rxns(mu_results)
 
-            #initialize x_c dictionary
-            mu_results['x_c'] = { }
-            
-            #save the community exchange reactions
-            for met in self.exch_sets.keys():
-                    
-                mu_results['x_c'][met] = 0
-        
         #return the solution that it got
         return mu_results
 
-    #this function will seek to maximize the sum of species biomasses
-    #will do this on a copy of the combined mode to avoid messing up the combined
-    #model. Need to pass in a dictionary of biomass equations
-    #media - an array of metabolite ids which are allowed to be uptaken by the community
-    def max_sum(self,biomass_dict):
+    #runs max_mu for each scenario in a sweep, writing each finished scenario to a checkpoint so a killed sweep can be restarted
+    #scenarios - dictionary of scenario name to the fixed_rates dictionary passed to max_mu
+    #checkpoint - path of a JSONL file each finished scenario is appended to, see checkpoint.py
+    #resume_from - path of a checkpoint file from an earlier sweep, scenarios in it are not solved again
+    #              new scenarios are appended to the same file unless checkpoint says otherwise
+    #              a checkpoint of other abundances or another medium, or a scenario finished with other fixed rates,
+    #              raises a ValueError
+    #returns a dictionary of scenario name to max_mu results
+    def sweep_max_mu(self,scenarios,checkpoint=None,resume_from=None):
 
-        """
-        This section deals with initial checks and setting the biomass sum as the objective equation        
-        """
+        sweep_results = { }
 
-        #check if abundances add up to one and have the same number in the list as members
-        if not len(biomass_dict) == len(self.members):
+        #the settings every scenario depends on, the fixed rates of each scenario are kept with its record
+        settings = {'X_k': self.X_k, 'media': self.media}
 
-            print("\n\nWrong number of biomass equations given!")
-            self.log.write("\n\nWrong number of biomass equations given!")
-            return False 
+        #scenarios finished in an earlier sweep
+        resumed = { }
 
-        max_sum_model = self.combined_model.copy()
+        if resume_from is not None:
 
-        #initialize an empty dictionary for returning with results
-        max_results = { }
+            resumed = Checkpoint(resume_from,settings).load()
 
-        #add to the results the list of exchange sets
-        max_results['ex_sets'] = self.exch_sets
+            self.log.info("resuming sweep with %d scenarios already finished",len(resumed))
 
-        #need to sprinkle these around whenever changing the model so changes stick correctly
-        max_sum_model.solver.update()
-        max_sum_model.repair()
+        if checkpoint is None:
 
-        #set a dummy objective to add biomass equations to
-        max_sum_model.objective = max_sum_model.problem.Objective(Zero, direction='max')
+            checkpoint = resume_from
 
-        #go through each reaction, see which matches the identifier
-        for rxn in max_sum_model.reactions:
+        checkpoint_file = None
 
-            for model in biomass_dict:
+        if checkpoint is not None:
 
-                if bool(re.fullmatch(str(rxn.id),biomass_dict[model]+"_"+model)):
+            checkpoint_file = Checkpoint(checkpoint,settings)
 
-                    #set the linear coefficient
-                    max_sum_model.objective.set_linear_coefficients({rxn.forward_variable: 1})
-                    max_sum_model.objective.set_linear_coefficients({rxn.reverse_variable: -1})
-        
-        #try solving
-        #solve, but put in a try/except framework in case there is an error
-        try:
+        for scenario in scenarios:
 
-            start_time_max = datetime.now()
+            if scenario in resumed:
 
-            #need to sprinkle these around whenever changing the model so changes stick correctly
-            max_sum_model.solver.update()
-            max_sum_model.repair()
-            
-            #need to sprinkle these around whenever changing the model so changes stick correctly
-            max_sum_model.solver.update()
-            max_sum_model.repair()
-            
-            #solve in a pfba-like manner, start by finding the maximum value of mu
-            max_soln = max_sum_model.optimize()
+                record = dict(resumed[scenario])
 
-            #get the sum of biomass reaction rates so we can fix them
-            max_bio_sum = max_soln.objective_value
+                if record.pop('fixed_rates',None) != as_stored(scenarios[scenario]):
 
-            print("solver status: \n"+str(max_soln.status)+"\n")
-            print("Objective value (bio sum): \n"+str(max_bio_sum)+"\n")
-            self.log.write("solver status: \n"+str(max_soln.status)+"\n")
-            self.log.write("Objective value (bio sum): \n"+str(max_bio_sum)+"\n")
-            self.log.write("Individual biomass flux rates:\n")
-            
-            #create a constraint to ensure the next solution has the same sum of biomass rates
-            bio_sum_const = max_sum_model.problem.Constraint(Zero,lb=max_bio_sum,ub=max_bio_sum,name='bio_sum_const',sloppy=False)
+                    raise ValueError("scenario "+str(scenario)+" of checkpoint "+str(resume_from)+" was solved with other fixed rates")
 
-            #add the new constraint to the model so we can change its coefficients
-            max_sum_model.add_cons_vars(bio_sum_const)
+                #checkpoints hold the plain nested dictionaries, turn them back into results like the new scenarios
+                sweep_results[scenario] = FluxResult.from_dict(record)
 
-            #need to sprinkle these around whenever changing the model so changes stick correctly
-            max_sum_model.solver.update()
-            max_sum_model.repair()
+            else:
 
-            #find the biomass equations, give them a "-1" coefficient
-            for rxn in max_sum_model.reactions:
+                sweep_results[scenario] = self.max_mu(scenarios[scenario])
 
-                for model in biomass_dict:
+                if checkpoint_file is not None:
 
-                    if bool(re.fullmatch(str(rxn.id),biomass_dict[model]+"_"+model)):
+                    #the exchange sets hold reaction objects and are the same for every scenario, so are not written
+                    record = {key: value for key, value in sweep_results[scenario].to_dict().items() if key != 'ex_sets'}
 
-                        #set the linear coefficient
-                        bio_sum_const.set_linear_coefficients({rxn.forward_variable: 1})
-                        bio_sum_const.set_linear_coefficients({rxn.reverse_variable: -1})
+                    record['fixed_rates'] = scenarios[scenario]
 
-            self.log.write("biomass constraint for second solve: "+str(bio_sum_const)+"\n\n")
+                    checkpoint_file.write(scenario,record)
 
-            #need to sprinkle these around whenever changing the model so changes stick correctly
-            max_sum_model.solver.update()
-            max_sum_model.repair()
+            #put the exchange sets back so resumed and new scenarios look the same
+            sweep_results[scenario]['ex_sets'] = self.exch_sets
 
-            #create a new objective equation minimizing the sum of flux rates
-            #set a dummy objective to add coefficients for each reaction to
-            max_sum_model.objective = max_sum_model.problem.Objective(Zero, direction='min')
-            
-            #go through each reaction, see which matches the identifier
-            for rxn in max_sum_model.reactions:
+            self.log.info("finished scenario %s",scenario)
 
-                #make a variable to store the absolute value of each reaction rate
-                #note that the max needs to be 2*bigM in case any reactions are at bigM for rate
-                v_plus_rxn = max_sum_model.problem.Variable(name='v_+_{}'.format(rxn.id),lb=0,ub=2*self.bigM)
+        if checkpoint_file is not None:
 
-                #create two constraints to get back the absolute value
-                v_plus_const_1 = max_sum_model.problem.Constraint(v_plus_rxn - rxn.flux_expression,lb=0,ub=2*self.bigM,name='v_+_1_{}'.format(rxn.id),sloppy=False)
-                v_plus_const_2 = max_sum_model.problem.Constraint(v_plus_rxn + rxn.flux_expression,lb=0,ub=2*self.bigM,name='v_+_2_{}'.format(rxn.id),sloppy=False)
+            checkpoint_file.close()
 
-                #add these constraints to the model
-                max_sum_model.add_cons_vars([v_plus_const_1, v_plus_const_2], sloppy=False)
+        return sweep_results
 
-                #set the objective so that we are minimizing the sum of absolute values
-                max_sum_model.objective.set_linear_coefficients({v_plus_rxn: 1})
+    #maps mu against the composition of the community by running max_mu at many abundance vectors
+    #the community is built once, each point only changes the abundances with update_abundance. With more than one
+    #process the points are spread over a pool of workers, each holding its own copy of the built community
+    #points - list of X_k dictionaries to solve, by default a grid over the abundance of one member (two member communities)
+    #member - model ID whose abundance the grid runs over, by default the first member
+    #num_points - number of grid points strictly between 0 and 1
+    #refine - number of refinement rounds, each adds the midpoints of the intervals where mu changes the most
+    #refine_points - number of intervals split in each refinement round
+    #processes - number of worker processes, None or 1 solves the points one after another here
+    #returns a columnar table: dictionary of column name to list, one entry per point, with X_<model ID> for each member,
+    #mu, flux_sum, status and x_c_<metabolite> for each community exchange. Grid points are sorted by the abundance of member
+    def scan_abundance(self,points=None,member=None,num_points=9,refine=0,refine_points=4,processes=None):
 
-                #need to sprinkle these around whenever changing the model so changes stick correctly
-                max_sum_model.solver.update()
-                max_sum_model.repair()
+        if member is None:
 
-            #need to sprinkle these around whenever changing the model so changes stick correctly
-            max_sum_model.solver.update()
-            max_sum_model.repair()
+            member = self.members[0].id
 
-            #solve with a fixed growth rate, minimizing sum of reaction fluxes
-            max_soln = max_sum_model.optimize()
+        #build the grid over the abundance of member, the rest of the community shares what is left evenly
+        if points is None:
 
-            #go through each reaction, get a sum for the biomass reaction rates
-            bio_sum_2 = 0
+            others = [model.id for model in self.members if model.id != member]
 
-            for rxn in max_sum_model.reactions:
+            points = [self.grid_point(member,others,(i + 1) / (num_points + 1)) for i in range(num_points)]
 
-                for model in biomass_dict:
+        #keep the abundances the community was built with, the serial scan changes them
+        original_X_k = dict(self.X_k)
 
-                    if bool(re.fullmatch(str(rxn.id),biomass_dict[model]+"_"+model)):
+        scan_rows = []
 
-                        #write the biomass flux rate
-                        bio_sum_2 = bio_sum_2 + max_soln.fluxes[rxn.id]
+        start_time_scan = datetime.now()
 
-            print("solver status: \n"+str(max_soln.status)+"\n")
-            print("Objective value (bio sum): \n"+str(bio_sum_2)+"\n\n")
-            print("Objective value (flux sum): \n"+str(max_soln.objective_value)+"\n")
-            self.log.write("solver status: \n"+str(max_soln.status)+"\n")
-            self.log.write("Objective value (bio sum): \n"+str(bio_sum_2)+"\n")
-            self.log.write("Objective value (flux sum): \n"+str(max_soln.objective_value)+"\n\n")
+        if processes is not None and processes > 1:
 
-            end_time_max = datetime.now()
+            pool = self.scan_pool(processes)
 
-            #get the total solve time
-            total_time_max = end_time_max - start_time_max
+            solve_points = lambda new_points: pool.map(_scan_point,new_points)
 
-            max_results['solve_time'] = total_time_max
+        else:
 
-            #state that no exception occured
-            max_results['exception']=False
+            pool = None
 
-            max_results['status'] = max_soln.status
+            solve_points = lambda new_points: [self.scan_point(X_k) for X_k in new_points]
 
-            #return the solution time in the dictionary
-            max_results['soln_time'] = str(total_time_max)
+        try:
 
-            if max_soln.status == INFEASIBLE:
+            scan_rows = solve_points(points)
 
-                #no objective to return
-                max_results['flux_objective'] = 0
-                max_results['bio_objective'] = 0
+            #split the intervals of member abundance over which mu changes the most
+            for round_num in range(refine):
+
+                scan_rows.sort(key=lambda row: row['X_k'][member])
+
+                steps = [(abs(scan_rows[i + 1]['mu'] - scan_rows[i]['mu']), i) for i in range(len(scan_rows) - 1)]
+
+                steps.sort(reverse=True)
+
+                new_points = []
+
+                for step, i in steps[:refine_points]:
+
+                    #nothing to gain from splitting a flat interval
+                    if step == 0:
+
+                        continue
+
+                    new_points.append({model_id: (scan_rows[i]['X_k'][model_id] + scan_rows[i + 1]['X_k'][model_id]) / 2 for model_id in scan_rows[i]['X_k']})
+
+                if len(new_points) == 0:
+
+                    break
+
+                self.log.info("abundance scan refinement round %d: %d new points",round_num + 1,len(new_points))
 
-                #write and store the lower bound, flux, and upper bound for each reaction
-                for rxn in max_sum_model.reactions:
+                scan_rows = scan_rows + solve_points(new_points)
 
-                    #initialize element to nest
-                    max_results[rxn.id] = { }
-                
-                    max_results[rxn.id]['lb'] = rxn.lower_bound
-                    max_results[rxn.id]['flux'] = 0
-                    max_results[rxn.id]['ub'] = rxn.upper_bound
+        finally:
 
-                #initialize x_c dictionary
-                max_results['x_c'] = { }
-                
-                #save the community exchange reactions dummy values
-                for met in self.exch_sets.keys():
-                    
-                    max_results['x_c'][met] = 0
+            if pool is not None:
+
+                pool.close()
+                pool.join()
 
             else:
 
-                #return the objective
-                max_results['flux_objective'] = max_soln.objective_value
-                max_results['bio_objective'] = max_bio_sum
+                self.update_abundance(original_X_k)
 
-                #store the lower bound, flux, and upper bound for each reaction
-                for rxn in max_sum_model.reactions:
+        scan_rows.sort(key=lambda row: row['X_k'].get(member,0))
 
-                    #store the results to the output dictionary
-                    #I believe this would be most useful set up as a nested dictionary
+        #put the rows into columns
+        scan_table = { }
 
-                    #initialize element to nest
-                    max_results[rxn.id] = { }
+        for model in self.members:
 
-                    #nest bounds and flux rates
-                    max_results[rxn.id]['lb'] = rxn.lower_bound
-                    max_results[rxn.id]['flux'] = max_soln.fluxes[rxn.id]
-                    max_results[rxn.id]['ub'] = rxn.upper_bound
+            scan_table['X_{}'.format(model.id)] = [row['X_k'][model.id] for row in scan_rows]
 
-                #initialize x_c dictionary
-                max_results['x_c'] = { }
-                
-                #save the community exchange reactions
-                for met in self.exch_sets.keys():
-                    
-                    max_results['x_c'][met] = max_sum_model.solver.primal_values.get('x_c_{}'.format(met))
+        for column in ['mu', 'flux_sum', 'status']:
 
-        #if an exception occurs, store as "e"
-        except Exception as e:
+            scan_table[column] = [row[column] for row in scan_rows]
 
-            #get the timein information
-            end_time_max = datetime.now()
+        for met in self.exch_sets:
 
-            #print the total solve time
-            total_time_max = end_time_max - start_time_max
-            
-            #state that an exception occured
-            max_results['exception']=True
+            scan_table['x_c_{}'.format(met)] = [row['x_c'].get(met,"NaN") for row in scan_rows]
 
-            max_results['status'] = "exception occurred"
+        self.log.info("abundance scan of %d points took %s",len(scan_rows),datetime.now() - start_time_scan)
 
-            #save the exception string to return
-            max_results['exception_str']=str(e)
+        return scan_table
 
-            #return the solution time in the dictionary
-            max_results['soln_time'] = str(total_time_max)
+    #abundance vector of a grid point, member gets fraction and the other members share the rest evenly
+    #member - model ID whose abundance is given
+    #others - list of the other model IDs
+    #fraction - abundance of member
+    def grid_point(self,member,others,fraction):
 
-            max_results['solve_time'] = total_time_max
+        X_k = {model_id: (1 - fraction) / len(others) for model_id in others}
 
-            #return objective value of NaN since the problem was not solved
-            max_results['bio_objective'] = 0
-            max_results['flux_objective'] = 0
+        X_k[member] = fraction
 
-            #write and store the lower bound, flux, and upper bound for each reaction
-            for rxn in max_sum_model.reactions:
+        return X_k
 
-                #initialize element to nest
-                max_results[rxn.id] = { }
+    #solves max_mu at one abundance vector for scan_abundance, returns a row of the scan
+    #the point is solved on the combined model itself (as in session mode) rather than a copy of it, so each solve starts
+    #from the basis of the one before
+    #X_k - dictionary of relative abundances keyed by model ID
+    def scan_point(self,X_k):
 
-                max_results[rxn.id]['lb'] = rxn.lower_bound
-                max_results[rxn.id]['flux'] = "NaN"
-                max_results[rxn.id]['ub'] = rxn.upper_bound
+        if not self.update_abundance(X_k):
 
-            #initialize x_c dictionary
-            max_results['x_c'] = { }
-            
-            #save the community exchange reactions dummy values
-            for met in self.exch_sets:
-            
-                max_results['x_c'][met] = "NaN"
-        
-        #return the solution that it got
-        return max_results
+            return {'X_k': X_k, 'mu': "NaN", 'flux_sum': "NaN", 'status': "wrong abundances", 'x_c': { }}
+
+        mu_results = self.lexicographic({self.combined_model.variables.mu: 1},dict(),'mu_objective')
+
+        return {'X_k': X_k, 'mu': mu_results['mu_objective'], 'flux_sum': mu_results['flux_objective'], 'status': mu_results['status'], 'x_c': mu_results['x_c']}
+
+    #returns a pool of worker processes that each hold a copy of the community, for scan_abundance and scan_media
+    #processes - number of worker processes
+    def scan_pool(self,processes):
+
+        #prefer fork so the workers start with the community already built
+        if "fork" in multiprocessing.get_all_start_methods():
+
+            mp_context = multiprocessing.get_context("fork")
+
+        else:
+
+            mp_context = multiprocessing.get_context()
+
+        return mp_context.Pool(processes,initializer=_init_scan_worker,initargs=(self,))
+
+    #solves max_mu for each of many media, the media are only bound changes on the x_c variables so the community is built
+    #once. The points are solved on the combined model itself (as in session mode), so each solve starts from the basis of
+    #the one before, in parallel each worker goes through its own share of the media the same way
+    #needs define_medium and build_comm_x to have been run, the medium of define_medium is put back at the end
+    #media_list - list of media dictionaries as given to define_medium
+    #fixed_rates - dictionary of fluxes which should be fixed for every medium, as in max_mu
+    #names - list of names of the media for the table, by default their position in media_list
+    #processes - number of worker processes, None or 1 solves the media one after another here
+    #returns a columnar table: dictionary of column name to list, one entry per medium in the order given, with medium,
+    #mu, flux_sum, status and x_c_<metabolite> for each community exchange
+    def scan_media(self,media_list,fixed_rates=dict(),names=None,processes=None):
+
+        if names is None:
+
+            names = list(range(len(media_list)))
+
+        #keep the medium the community was built with, the serial scan changes it
+        original_media = dict(self.media)
+
+        start_time_scan = datetime.now()
+
+        if processes is not None and processes > 1:
+
+            pool = self.scan_pool(processes)
+
+            try:
+
+                #contiguous chunks, so that each worker warm starts from media next to each other in the list
+                chunk_size = max(1, -(-len(media_list) // processes))
+
+                media_rows = pool.map(_media_point,[(media, fixed_rates) for media in media_list],chunksize=chunk_size)
+
+            finally:
+
+                pool.close()
+                pool.join()
+
+        else:
+
+            try:
+
+                media_rows = [self.media_point(media,fixed_rates) for media in media_list]
+
+            finally:
+
+                self.define_medium(original_media)
+
+        #put the rows into columns
+        media_table = { }
+
+        media_table['medium'] = list(names)
+
+        for column in ['mu', 'flux_sum', 'status']:
+
+            media_table[column] = [row[column] for row in media_rows]
+
+        for met in self.exch_sets:
+
+            media_table['x_c_{}'.format(met)] = [row['x_c'].get(met,"NaN") for row in media_rows]
+
+        self.log.info("media scan of %d media took %s",len(media_rows),datetime.now() - start_time_scan)
+
+        return media_table
+
+    #solves max_mu on the combined model in one medium for scan_media, returns a row of the scan
+    #media - media dictionary as given to define_medium
+    #fixed_rates - dictionary of fluxes which should be fixed
+    def media_point(self,media,fixed_rates=dict()):
+
+        self.define_medium(media)
+
+        mu_results = self.lexicographic({self.combined_model.variables.mu: 1},fixed_rates,'mu_objective')
+
+        return {'mu': mu_results['mu_objective'], 'flux_sum': mu_results['flux_objective'], 'status': mu_results['status'], 'x_c': mu_results['x_c']}
+
+    #phenotype phase plane of mu over the uptake bounds of two substrates, by default cellobiose and xylose
+    #the grid is solved on the combined model itself in a serpentine order, so from one point to the next only one x_c
+    #bound changes and the solve starts from the basis of the point before. Phases are told apart by the shadow prices
+    #of the two substrates (reduced costs of their x_c variables in the max mu stage), refinement adds grid lines midway
+    #between neighbouring points whose shadow prices differ, so the grid gets finer only near phase boundaries
+    #needs define_medium and build_comm_x to have been run, the x_c bounds of the medium are put back at the end
+    #met1, met2 - exchanged metabolite IDs (as in exch_sets) of the two axes
+    #values1, values2 - uptake bounds of each axis, by default num_points values from zero to twice the current medium
+    #num_points - number of grid values of each axis when values1 or values2 are not given
+    #refine - number of refinement rounds
+    #tolerance - smallest difference between shadow prices that counts as a different phase
+    #fixed_rates - dictionary of fluxes which should be fixed at every point, as in max_mu
+    #returns a dictionary of numpy arrays indexed [i, j] for values1[i] and values2[j]: mu, flux_sum, status, shadow
+    #prices (dictionary keyed by met1 and met2) and cross_fed (dictionary of metabolite to amount, only for metabolites
+    #cross-fed at one point at least, see cross_feeding), along with the axes values1 and values2
+    def phase_plane(self,met1='cellb_e',met2='xylb_e',values1=None,values2=None,num_points=11,refine=0,tolerance=1E-6,fixed_rates=dict()):
+
+        if values1 is None:
+
+            values1 = numpy.linspace(0,2 * self.media.get(met1,0),num_points)
+
+        if values2 is None:
+
+            values2 = numpy.linspace(0,2 * self.media.get(met2,0),num_points)
+
+        values1 = sorted(set([float(value) for value in values1]))
+        values2 = sorted(set([float(value) for value in values2]))
+
+        x_var1 = self.combined_model.variables['x_c_{}'.format(met1)]
+        x_var2 = self.combined_model.variables['x_c_{}'.format(met2)]
+
+        stage_one = {self.combined_model.variables.mu: 1}
+
+        #solved points keyed by (value1, value2)
+        points = { }
+
+        start_time_plane = datetime.now()
+
+        try:
+
+            for round_num in range(refine + 1):
+
+                #serpentine order, every other row of the grid backwards
+                for i, value1 in enumerate(values1):
+
+                    row = values2 if i % 2 == 0 else values2[::-1]
+
+                    for value2 in row:
+
+                        if (value1, value2) in points:
+
+                            continue
+
+                        #incremental bound changes, only the ones that differ from the point before reach the solver
+                        if x_var1.ub != value1:
+
+                            x_var1.set_bounds(-self.bigM,value1)
+
+                        if x_var2.ub != value2:
+
+                            x_var2.set_bounds(-self.bigM,value2)
+
+                        lex_results = self.lexicographic(stage_one,fixed_rates,'mu_objective',reduced_costs=[x_var1.name,x_var2.name])
+
+                        points[(value1, value2)] = {
+
+                            'mu': lex_results['mu_objective'],
+                            'flux_sum': lex_results['flux_objective'],
+                            'status': lex_results['status'],
+                            'shadow_prices': {met1: lex_results['reduced_costs'].get(x_var1.name,numpy.nan), met2: lex_results['reduced_costs'].get(x_var2.name,numpy.nan)},
+                            'cross_fed': self.cross_feeding(lex_results) if lex_results['status'] == OPTIMAL else { },
+
+                        }
+
+                if round_num == refine:
+
+                    break
+
+                #split the grid intervals over which the shadow prices change
+                new_values1 = set()
+                new_values2 = set()
+
+                for i in range(len(values1)):
+
+                    for j in range(len(values2)):
+
+                        here = points[(values1[i], values2[j])]['shadow_prices']
+
+                        if i + 1 < len(values1) and self.phase_change(here,points[(values1[i + 1], values2[j])]['shadow_prices'],tolerance):
+
+                            new_values1.add((values1[i] + values1[i + 1]) / 2)
+
+                        if j + 1 < len(values2) and self.phase_change(here,points[(values1[i], values2[j + 1])]['shadow_prices'],tolerance):
+
+                            new_values2.add((values2[j] + values2[j + 1]) / 2)
+
+                if len(new_values1) == 0 and len(new_values2) == 0:
+
+                    break
+
+                self.log.info("phase plane refinement round %d: %d new %s values, %d new %s values",round_num + 1,len(new_values1),met1,len(new_values2),met2)
+
+                values1 = sorted(set(values1) | new_values1)
+                values2 = sorted(set(values2) | new_values2)
+
+        finally:
+
+            #put back the medium
+            x_var1.set_bounds(-self.bigM,self.media.get(met1,0))
+            x_var2.set_bounds(-self.bigM,self.media.get(met2,0))
+
+        #put the points into dense arrays
+        shape = (len(values1), len(values2))
+
+        phase_results = { }
+
+        phase_results['met1'] = met1
+        phase_results['met2'] = met2
+        phase_results['values1'] = numpy.array(values1)
+        phase_results['values2'] = numpy.array(values2)
+
+        phase_results['mu'] = numpy.array([[points[(value1, value2)]['mu'] for value2 in values2] for value1 in values1],dtype=float)
+        phase_results['flux_sum'] = numpy.array([[points[(value1, value2)]['flux_sum'] for value2 in values2] for value1 in values1],dtype=float)
+        phase_results['status'] = numpy.array([[points[(value1, value2)]['status'] for value2 in values2] for value1 in values1],dtype=object)
+
+        phase_results['shadow_prices'] = { }
+
+        for met in [met1, met2]:
+
+            phase_results['shadow_prices'][met] = numpy.array([[points[(value1, value2)]['shadow_prices'][met] for value2 in values2] for value1 in values1],dtype=float)
+
+        #metabolites cross-fed anywhere on the plane
+        cross_fed_mets = sorted(set([met for point in points.values() for met in point['cross_fed']]))
+
+        phase_results['cross_fed'] = { }
+
+        for met in cross_fed_mets:
+
+            phase_results['cross_fed'][met] = numpy.array([[points[(value1, value2)]['cross_fed'].get(met,0.0) for value2 in values2] for value1 in values1],dtype=float)
+
+        phase_results['num_solves'] = len(points)
+
+        self.log.info("phase plane of %d points over %s and %s took %s",len(points),met1,met2,datetime.now() - start_time_plane)
+
+        return phase_results
+
+    #returns True if two points of a phase plane have different shadow prices, NaN (not solved) counts as its own phase
+    #shadow_prices1, shadow_prices2 - dictionaries of metabolite to shadow price
+    #tolerance - smallest difference that counts
+    def phase_change(self,shadow_prices1,shadow_prices2,tolerance):
+
+        for met in shadow_prices1:
+
+            price1 = shadow_prices1[met]
+            price2 = shadow_prices2[met]
+
+            if numpy.isnan(price1) != numpy.isnan(price2):
+
+                return True
+
+            if not numpy.isnan(price1) and abs(price1 - price2) > tolerance:
+
+                return True
+
+        return False
+
+    #returns the cross-feeding in a solution, the amount of each metabolite that one member secretes and another takes up
+    #on the community basis (flux times abundance), which is the smaller of the total secretion and the total uptake
+    #results - results dictionary of max_mu, max_sum or lexicographic
+    def cross_feeding(self,results):
+
+        cross_fed = { }
+
+        for met in self.exch_sets:
+
+            #a metabolite can only be cross-fed between two members or more
+            if len(self.exch_sets[met]) < 2:
+
+                continue
+
+            secreted = 0
+            taken_up = 0
+
+            for exch_rxn in self.exch_sets[met]:
+
+                #positive when the member secretes the metabolite
+                rate = -exch_rxn.exchstoich * results[exch_rxn.id]['flux'] * self.X_k[exch_rxn.origin]
+
+                if rate > 0:
+
+                    secreted += rate
+
+                else:
+
+                    taken_up -= rate
+
+            if min(secreted, taken_up) > 0:
+
+                cross_fed[met] = min(secreted, taken_up)
+
+        return cross_fed
+
+    #two stage (lexicographic) solve on the combined model itself, used by max_mu and max_sum in session mode
+    #stage one maximizes the given expression, stage two holds it at its optimum and minimizes the sum of absolute fluxes
+    #the stage one optimum is held by one row (lex_const) which stays in the model for good: its coefficients are set
+    #to the stage one expression and for stage two its lower bound is set to the optimum less the feasibility tolerance
+    #of the solver (an exact equality leaves stage two on the edge of infeasible), then it is released (free) again.
+    #fixed_rates and the objectives are applied in a model context, so the combined model is left as it was
+    #the statuses of both stages are returned as status1 and status2, if only stage two fails the stage one optimum is
+    #still returned
+    #stage_one - dictionary of solver variables to coefficients of the expression maximized in stage one
+    #fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    #objective_key - key the stage one optimum is returned under, 'mu_objective' for max_mu and 'bio_objective' for max_sum
+    #reduced_costs - names of solver variables whose stage one reduced costs are returned under 'reduced_costs', such as
+    #x_c variables, whose reduced cost is the gain in the stage one objective per unit more uptake allowed
+    #returns a dictionary like max_mu and max_sum
+    def lexicographic(self,stage_one,fixed_rates=dict(),objective_key='mu_objective',reduced_costs=()):
+
+        #time spent building each stage and solving, there is no copy
+        timer = Instrument(report_step=None)
+
+        model = self.combined_model
+
+        #initialize an empty dictionary for returning with results
+        lex_results = FluxResult()
+
+        #add to the results the list of exchange sets
+        lex_results['ex_sets'] = self.exch_sets
+
+        #only filled in if stage one is solved to optimality
+        lex_results['reduced_costs'] = { }
+
+        #the row holding the stage one optimum is made the first time it is needed
+        if 'lex_const' not in model.constraints:
+
+            lex_const = model.problem.Constraint(Zero,name='lex_const',sloppy=True)
+
+            model.add_cons_vars([lex_const], sloppy=True)
+
+            #apparently this is needed otherwise the new constraint won't register
+            model.solver.update()
+
+            self.lex_coefs = { }
+
+        lex_const = model.constraints['lex_const']
+
+        start_time_lex = datetime.now()
+
+        #everything changed through cobra inside of this block is reverted when the block exits
+        with model:
+
+            #solve, but put in a try/except framework in case there is an error
+            try:
+
+                with timer.phase("build"):
+
+                    #fix the rates that need to be fixed, setting both bounds at once avoids lb > ub errors
+                    for rxn_id in fixed_rates:
+
+                        if rxn_id in model.reactions:
+
+                            model.reactions.get_by_id(rxn_id).bounds = (fixed_rates[rxn_id], fixed_rates[rxn_id])
+
+                    #stage one objective
+                    model.objective = model.problem.Objective(Zero, direction='max')
+
+                    model.objective.set_linear_coefficients(stage_one)
+
+                    #the row gets the stage one expression, the coefficients of the last call are cleared
+                    new_coefs = {var: 0 for var in self.lex_coefs}
+                    new_coefs.update(stage_one)
+
+                    lex_const.set_linear_coefficients(new_coefs)
+
+                    self.lex_coefs = dict(stage_one)
+
+                with timer.phase("solve"):
+
+                    status = model.solver.optimize()
+
+                self.log.debug("stage one status: %s",status)
+
+                lex_results['status1'] = status
+
+                #only filled in if stage one is solved to optimality
+                stage_one_optimum = None
+
+                if status == OPTIMAL:
+
+                    stage_one_optimum = model.solver.objective.value
+
+                    #reduced costs have to be read before the objective changes for stage two
+                    lex_results['reduced_costs'] = {name: model.variables[name].dual for name in reduced_costs}
+
+                    #hold the stage one optimum and switch to the parsimony objective
+                    with timer.phase("build_parsimony"):
+
+                        lex_const.ub = None
+                        lex_const.lb = stage_one_optimum - model.solver.configuration.tolerances.feasibility * max(1,abs(stage_one_optimum))
+
+                        parsimony_objective(model)
+
+                    with timer.phase("solve"):
+
+                        status = model.solver.optimize()
+
+                    lex_results['status2'] = status
+
+                    self.log.debug("stage one optimum: %s\tstage two status: %s",stage_one_optimum,status)
+
+                end_time_lex = datetime.now()
+
+                #get the total solve time
+                total_time_lex = end_time_lex - start_time_lex
+
+                lex_results['solve_time'] = total_time_lex
+
+                #state that no exception occured
+                lex_results['exception'] = False
+
+                lex_results['status'] = status
+
+                #return the solution time in the dictionary
+                lex_results['soln_time'] = str(total_time_lex)
+
+                if status == OPTIMAL:
+
+                    primals = model.solver.primal_values
+
+                    lex_results[objective_key] = stage_one_optimum
+                    lex_results['flux_objective'] = model.solver.objective.value
+
+                else:
+
+                    #no fluxes to return, but a stage one optimum is still the optimum
+                    primals = None
+
+                    lex_results[objective_key] = 0 if stage_one_optimum is None else stage_one_optimum
+                    lex_results['flux_objective'] = 0
+
+                #store the lower bound, flux, and upper bound of every reaction as columns
+                lex_results.set_reactions(model.reactions,0 if primals is None else [primals[rxn.forward_variable.name] - primals[rxn.reverse_variable.name] for rxn in model.reactions])
+
+                #community exchanges, in the order of the exchange sets
+                lex_results.set_x_c(self.exch_sets,0 if primals is None else [primals.get('x_c_{}'.format(met)) for met in self.exch_sets])
+
+            #if an exception occurs, store as "e"
+            except Exception as e:
+
+                #get the timein information
+                end_time_lex = datetime.now()
+
+                #print the total solve time
+                total_time_lex = end_time_lex - start_time_lex
+
+                #state that an exception occured
+                lex_results['exception'] = True
+
+                lex_results['status'] = "exception occurred"
+
+                #save the exception string to return
+                lex_results['exception_str'] = str(e)
+
+                #return the solution time in the dictionary
+                lex_results['soln_time'] = str(total_time_lex)
+                lex_results['solve_time'] = str(total_time_lex)
+
+                #return objective value of NaN since the problem was not solved
+                lex_results[objective_key] = 0
+                lex_results['flux_objective'] = 0
+
+                #store the lower bound, flux, and upper bound of every reaction as columns
+                lex_results.set_reactions(model.reactions,float("nan"))
+
+                #community exchanges, in the order of the exchange sets
+                lex_results.set_x_c(self.exch_sets,float("nan"))
+
+            finally:
+
+                #release the stage one optimum, the row is free until the next call
+                lex_const.lb = None
+                lex_const.ub = None
+
+        #seconds spent in each phase
+        lex_results['phase_times'] = timer.phase_times
+
+        #reactions left out as blocked carry no flux
+        self.add_removed_rxns(lex_results)
+
+        #return the solution that it got
+        return lex_results
+
+    #this function will seek to maximize the sum of species biomasses
+    #will do this on a copy of the combined mode to avoid messing up the combined
+    #model. Need to pass in a dictionary of biomass equations
+    #media - an array of metabolite ids which are allowed to be uptaken by the community
+    #fixed_rates - dictionary of fluxes which should be fixed and keys of the values
+    def max_sum(self,biomass_dict,fixed_rates=dict()):
+
+        """
+        This section deals with initial checks and setting the biomass sum as the objective equation        
+        """
+
+        #check if abundances add up to one and have the same number in the list as members
+        if not len(biomass_dict) == len(self.members):
+
+            print("\n\nWrong number of biomass equations given!")
+            self.log.error("Wrong number of biomass equations given!")
+            return False 
+
+        #in session mode nothing is copied
+        if self.session:
+
+            bio_coefs = { }
+
+            for model in biomass_dict:
+
+                if biomass_dict[model]+"_"+model in self.combined_model.reactions:
+
+                    bio_rxn = self.combined_model.reactions.get_by_id(biomass_dict[model]+"_"+model)
+
+                    bio_coefs[bio_rxn.forward_variable] = 1
+                    bio_coefs[bio_rxn.reverse_variable] = -1
+
+            return self.lexicographic(bio_coefs,fixed_rates,'bio_objective')
+
+        #time spent copying, building each stage and solving, returned as max_results['phase_times']
+        timer = Instrument(report_step=None)
+
+        with timer.phase("copy"):
+
+            max_sum_model = self.combined_model.copy()
+
+        #fix the rates that need to be fixed, if any, setting both bounds at once avoids lb > ub errors
+        for rxn_id in fixed_rates:
+
+            if rxn_id in max_sum_model.reactions:
+
+                max_sum_model.reactions.get_by_id(rxn_id).bounds = (fixed_rates[rxn_id], fixed_rates[rxn_id])
+
+        #initialize an empty dictionary for returning with results
+        max_results = FluxResult()
+
+        #add to the results the list of exchange sets
+        max_results['ex_sets'] = self.exch_sets
+
+        #need to sprinkle these around whenever changing the model so changes stick correctly
+        max_sum_model.solver.update()
+        max_sum_model.repair()
+
+        #coefficients of the biomass sum, the biomass reactions are looked up by id rather than matching every reaction
+        bio_coefs = { }
+
+        #community ids of the biomass reactions, for the biomass sum of the second solve
+        bio_ids = [biomass_dict[model]+"_"+model for model in biomass_dict if biomass_dict[model]+"_"+model in max_sum_model.reactions]
+
+        for bio_id in bio_ids:
+
+            bio_rxn = max_sum_model.reactions.get_by_id(bio_id)
+
+            bio_coefs[bio_rxn.forward_variable] = 1
+            bio_coefs[bio_rxn.reverse_variable] = -1
+
+        #set a dummy objective to add biomass equations to
+        with timer.phase("build"):
+
+            max_sum_model.objective = max_sum_model.problem.Objective(Zero, direction='max')
+
+            max_sum_model.objective.set_linear_coefficients(bio_coefs)
+        
+        #try solving
+        #solve, but put in a try/except framework in case there is an error
+        try:
+
+            start_time_max = datetime.now()
+
+            #need to sprinkle these around whenever changing the model so changes stick correctly
+            max_sum_model.solver.update()
+            max_sum_model.repair()
+            
+            #need to sprinkle these around whenever changing the model so changes stick correctly
+            max_sum_model.solver.update()
+            max_sum_model.repair()
+            
+            #solve in a pfba-like manner, start by finding the maximum value of mu
+            with timer.phase("solve"):
+
+                max_soln = max_sum_model.optimize()
+
+            #get the sum of biomass reaction rates so we can fix them
+            max_bio_sum = max_soln.objective_value
+
+            print("solver status: \n"+str(max_soln.status)+"\n")
+            print("Objective value (bio sum): \n"+str(max_bio_sum)+"\n")
+            self.log.info("solver status: %s",max_soln.status)
+            self.log.info("Objective value (bio sum): %s",max_bio_sum)
+            self.log.info("Individual biomass flux rates:")
+            
+            #build the whole parsimony stage in one batch with a single solver update
+            with timer.phase("build_parsimony"):
+
+                #create a constraint to ensure the next solution has the same sum of biomass rates
+                bio_sum_const = max_sum_model.problem.Constraint(Zero,lb=max_bio_sum,ub=max_bio_sum,name='bio_sum_const',sloppy=False)
+
+                #add the new constraint to the model so we can change its coefficients
+                max_sum_model.add_cons_vars(bio_sum_const)
+
+                #apparently this is needed otherwise the new constraint won't register
+                max_sum_model.solver.update()
+
+                bio_sum_const.set_linear_coefficients(bio_coefs)
+
+                #create a new objective equation minimizing the sum of flux rates
+                parsimony_objective(max_sum_model)
+
+                #need to sprinkle these around whenever changing the model so changes stick correctly
+                max_sum_model.solver.update()
+                max_sum_model.repair()
+
+            self.log.debug("biomass constraint for second solve: %s",bio_sum_const)
+            self.log.info("parsimony stage built in %s s",timer.phase_times['build_parsimony'])
+
+            #solve with a fixed growth rate, minimizing sum of reaction fluxes
+            with timer.phase("solve"):
+
+                max_soln = max_sum_model.optimize()
+
+            #sum of the biomass reaction rates, read by id
+            bio_sum_2 = sum([max_soln.fluxes[bio_id] for bio_id in bio_ids])
+
+            print("solver status: \n"+str(max_soln.status)+"\n")
+            print("Objective value (bio sum): \n"+str(bio_sum_2)+"\n\n")
+            print("Objective value (flux sum): \n"+str(max_soln.objective_value)+"\n")
+            self.log.info("solver status: %s",max_soln.status)
+            self.log.info("Objective value (bio sum): %s",bio_sum_2)
+            self.log.info("Objective value (flux sum): %s",max_soln.objective_value)
+
+            end_time_max = datetime.now()
+
+            #get the total solve time
+            total_time_max = end_time_max - start_time_max
+
+            max_results['solve_time'] = total_time_max
+
+            #state that no exception occured
+            max_results['exception']=False
+
+            max_results['status'] = max_soln.status
+
+            #return the solution time in the dictionary
+            max_results['soln_time'] = str(total_time_max)
+
+            if max_soln.status == INFEASIBLE:
+
+                #no objective to return
+                max_results['flux_objective'] = 0
+                max_results['bio_objective'] = 0
+
+                #store the lower bound, flux, and upper bound of every reaction as columns
+                max_results.set_reactions(max_sum_model.reactions,0)
+
+                #community exchanges, in the order of the exchange sets
+                max_results.set_x_c(self.exch_sets,0)
+
+            else:
+
+                #return the objective
+                max_results['flux_objective'] = max_soln.objective_value
+                max_results['bio_objective'] = max_bio_sum
+
+                #store the lower bound, flux, and upper bound of every reaction as columns, the fluxes are in reaction order
+                max_results.set_reactions(max_sum_model.reactions,max_soln.fluxes.to_numpy())
+
+                #community exchanges, in the order of the exchange sets
+                #primal_values makes a new dictionary every time it is read, so read it once
+                x_c_primals = max_sum_model.solver.primal_values
+
+                max_results.set_x_c(self.exch_sets,[x_c_primals.get('x_c_{}'.format(met)) for met in self.exch_sets])
+
+        #if an exception occurs, store as "e"
+        except Exception as e:
+
+            #get the timein information
+            end_time_max = datetime.now()
+
+            #print the total solve time
+            total_time_max = end_time_max - start_time_max
+            
+            #state that an exception occured
+            max_results['exception']=True
+
+            max_results['status'] = "exception occurred"
+
+            #save the exception string to return
+            max_results['exception_str']=str(e)
+
+            #return the solution time in the dictionary
+            max_results['soln_time'] = str(total_time_max)
+
+            max_results['solve_time'] = total_time_max
+
+            #return objective value of NaN since the problem was not solved
+            max_results['bio_objective'] = 0
+            max_results['flux_objective'] = 0
+
+            #store the lower bound, flux, and upper bound of every reaction as columns
+            max_results.set_reactions(max_sum_model.reactions,float("nan"))
+
+            #community exchanges, in the order of the exchange sets
+            max_results.set_x_c(self.exch_sets,float("nan"))
+        
+        #seconds spent in each phase
+        max_results['phase_times'] = timer.phase_times
+
+        #reactions left out as blocked carry no flux
+        self.add_removed_rxns(max_results)
+
+        #return the solution that it got
+        return max_results
+
+    #this function implements SteadyCom as published, with the abundances X^k as variables rather than fixed ahead of time
+    #fluxes are the aggregate V^k_j, held by lb^k_j * X^k <= V^k_j <= ub^k_j * X^k, and each biomass by V^k_bio = mu * X^k.
+    #For a given mu the LP maximizes the sum of the X^k, and mu can be reached by the community if that sum is at least one.
+    #mu is then bisected on a single LP: each step only changes the -mu coefficients of X^k in the bio_const_* rows and
+    #solves again from the basis of the step before. Needs define_medium and build_comm_x to have been run
+    #tolerance - bisection stops once the bracket on mu is narrower than this
+    #mu_guess - first upper end of the bracket, doubled until it can no longer be reached
+    #max_iter - limit on the number of LPs solved, if it is reached before mu is bracketed to within tolerance the status
+    #            is "max_iter" and converged is False, mu_objective is then only the highest mu reached so far
+    #returns a dictionary like max_mu with mu_objective, the abundances and the per-reaction fluxes, normalized to a total abundance of one
+    def solve_steadycom(self,tolerance=1E-6,mu_guess=1,max_iter=100):
+
+        #initialize an empty dictionary for returning with results
+        steadycom_results = FluxResult()
+
+        #add to the results the list of exchange sets
+        steadycom_results['ex_sets'] = self.exch_sets
+
+        start_time_steadycom = datetime.now()
+
+        #all changes go to a copy, the combined model keeps its fixed abundances
+        steadycom_model = self.combined_model.copy()
+
+        steadycom_model.problem.name = "SteadyCom with variable abundances"
+
+        #one abundance variable per member
+        X_vars = {model.id: steadycom_model.problem.Variable('X_{}'.format(model.id),lb=0,ub=1) for model in self.members}
+
+        steadycom_model.add_cons_vars(list(X_vars.values()), sloppy=False)
+
+        #apparently this is needed otherwise the new constraint won't register
+        steadycom_model.solver.update()
+
+        #mu is not a variable here, the bisection sets it through the coefficients
+        steadycom_model.variables.mu.set_bounds(0,0)
+
+        for model in self.members:
+
+            steadycom_model.constraints['bio_const_{}'.format(model.id)].set_linear_coefficients({steadycom_model.variables.mu: 0, X_vars[model.id]: 0})
+
+        #the mass balances go back to the unscaled stoichiometry, since V^k_j already includes the abundance
+        stoich = self.stoich_matrix.tocsr()
+
+        for row in range(stoich.shape[0]):
+
+            cols = stoich.indices[stoich.indptr[row]:stoich.indptr[row + 1]]
+            vals = stoich.data[stoich.indptr[row]:stoich.indptr[row + 1]]
+
+            new_coefs = { }
+
+            for col, val in zip(cols, vals):
+
+                rxn = steadycom_model.reactions[col]
+
+                new_coefs[rxn.forward_variable] = val
+                new_coefs[rxn.reverse_variable] = -val
+
+            steadycom_model.metabolites[row].constraint.set_linear_coefficients(new_coefs)
+
+        #community exchanges are the plain sum of the member V^k_j
+        for met in self.exch_sets:
+
+            new_coefs = { }
+
+            for exch_rxn in self.exch_sets[met]:
+
+                rxn = steadycom_model.reactions.get_by_id(exch_rxn.id)
+
+                new_coefs[rxn.forward_variable] = 1
+                new_coefs[rxn.reverse_variable] = -1
+
+            steadycom_model.constraints['exch_const_{}'.format(met)].set_linear_coefficients(new_coefs)
+
+        #the reaction bounds become bounds relative to the abundance of the member
+        #forward and reverse variables are bounded separately, a zero bound stays a variable bound
+        #bounds are clipped to bigM, an infinite bound would otherwise become an infinite coefficient of X
+        bound_consts = []
+        bound_coefs = []
+
+        for rxn in steadycom_model.reactions:
+
+            X_var = X_vars[rxn.origin]
+
+            for var, var_lb, var_ub in [(rxn.forward_variable, max(rxn.lower_bound,0), max(rxn.upper_bound,0)), (rxn.reverse_variable, max(-rxn.upper_bound,0), max(-rxn.lower_bound,0))]:
+
+                var_lb = min(var_lb,self.bigM)
+                var_ub = min(var_ub,self.bigM)
+
+                if var_ub == 0:
+
+                    var.set_bounds(0,0)
+
+                    continue
+
+                var.set_bounds(0,None)
+
+                #V <= ub * X
+                ub_const = steadycom_model.problem.Constraint(Zero,ub=0,name='V_ub_{}'.format(var.name),sloppy=True)
+
+                bound_consts.append(ub_const)
+                bound_coefs.append((ub_const, {var: 1, X_var: -var_ub}))
+
+                #V >= lb * X
+                if var_lb > 0:
+
+                    lb_const = steadycom_model.problem.Constraint(Zero,lb=0,name='V_lb_{}'.format(var.name),sloppy=True)
+
+                    bound_consts.append(lb_const)
+                    bound_coefs.append((lb_const, {var: 1, X_var: -var_lb}))
+
+        #need to add constraint to the model before I can chang their coefficients
+        steadycom_model.add_cons_vars(bound_consts, sloppy=True)
+
+        #apparently this is needed otherwise the new constraint won't register
+        steadycom_model.solver.update()
+
+        for const, coefs in bound_coefs:
+
+            const.set_linear_coefficients(coefs)
+
+        #maximize the total abundance
+        steadycom_model.objective = steadycom_model.problem.Objective(Zero, direction='max')
+
+        steadycom_model.solver.update()
+
+        steadycom_model.objective.set_linear_coefficients({X_var: 1 for X_var in X_vars.values()})
+
+        self.log.info("SteadyCom LP with variable abundances: %d abundance bound constraints",len(bound_consts))
+
+        #the biomass rows that carry mu
+        bio_consts = {model.id: steadycom_model.constraints['bio_const_{}'.format(model.id)] for model in self.members}
+
+        #number of LPs solved
+        num_solves = [0]
+
+        #solves the LP at growth rate mu, returns the largest total abundance, 0 if it cannot be reached at all
+        def max_abundance(mu):
+
+            for model_id in bio_consts:
+
+                bio_consts[model_id].set_linear_coefficients({X_vars[model_id]: -mu})
+
+            num_solves[0] += 1
+
+            status = steadycom_model.solver.optimize()
+
+            self.log.debug("mu: %s\tstatus: %s\tsum of X: %s",mu,status,steadycom_model.solver.objective.value if status == OPTIMAL else 0)
+
+            if status == OPTIMAL:
+
+                return steadycom_model.solver.objective.value
+
+            return 0
+
+        #solve, but put in a try/except framework in case there is an error
+        try:
+
+            #bracket mu, the lower end can always be reached and the upper end cannot
+            mu_low = 0
+            mu_high = mu_guess
+
+            if max_abundance(mu_low) < 1:
+
+                raise ValueError("the community cannot be sustained even without growth")
+
+            #set to False if max_iter is reached before the bracket is narrow enough
+            converged = True
+
+            while max_abundance(mu_high) >= 1:
+
+                mu_low = mu_high
+                mu_high = 2 * mu_high
+
+                if num_solves[0] >= max_iter:
+
+                    converged = False
+
+                    break
+
+            #halve the bracket until it is narrow enough
+            while converged and mu_high - mu_low > tolerance:
+
+                if num_solves[0] >= max_iter:
+
+                    converged = False
+
+                    break
+
+                mu_mid = (mu_low + mu_high) / 2
+
+                if max_abundance(mu_mid) >= 1:
+
+                    mu_low = mu_mid
+
+                else:
+
+                    mu_high = mu_mid
+
+            #finish on the highest mu that was reached, so the primal values are those of a feasible community
+            sum_X = max_abundance(mu_low)
+
+            primals = steadycom_model.solver.primal_values
+
+            end_time_steadycom = datetime.now()
+
+            #get the total solve time
+            total_time_steadycom = end_time_steadycom - start_time_steadycom
+
+            steadycom_results['solve_time'] = total_time_steadycom
+
+            steadycom_results['soln_time'] = str(total_time_steadycom)
+
+            #state that no exception occured
+            steadycom_results['exception'] = False
+
+            steadycom_results['status'] = steadycom_model.solver.status if converged else "max_iter"
+
+            steadycom_results['converged'] = converged
+
+            steadycom_results['mu_objective'] = mu_low
+
+            if not converged:
+
+                self.log.warning("SteadyCom stopped after %d LPs with mu between %s and %s",num_solves[0],mu_low,mu_high)
+
+            steadycom_results['num_solves'] = num_solves[0]
+
+            #scale the solution to a total abundance of one
+            steadycom_results['abundance'] = {model_id: primals[X_vars[model_id].name] / sum_X for model_id in X_vars}
+
+            #store the lower bound, flux, and upper bound of every reaction as columns, bounds are those of the member per gDW
+            steadycom_results.set_reactions(steadycom_model.reactions,numpy.array([primals[rxn.forward_variable.name] - primals[rxn.reverse_variable.name] for rxn in steadycom_model.reactions]) / sum_X)
+
+            #community exchanges, in the order of the exchange sets
+            steadycom_results.set_x_c(self.exch_sets,numpy.array([primals['x_c_{}'.format(met)] for met in self.exch_sets]) / sum_X)
+
+            print("SteadyCom mu: "+str(mu_low)+" in "+str(num_solves[0])+" LPs, abundances: "+str(steadycom_results['abundance'])+"\n")
+            self.log.info("SteadyCom mu: %s in %d LPs, abundances: %s",mu_low,num_solves[0],steadycom_results['abundance'])
+
+        #if an exception occurs, store as "e"
+        except Exception as e:
+
+            #get the timein information
+            end_time_steadycom = datetime.now()
+
+            #print the total solve time
+            total_time_steadycom = end_time_steadycom - start_time_steadycom
+
+            #state that an exception occured
+            steadycom_results['exception'] = True
+
+            steadycom_results['status'] = "exception occurred"
+
+            steadycom_results['converged'] = False
+
+            #save the exception string to return
+            steadycom_results['exception_str'] = str(e)
+
+            #return the solution time in the dictionary
+            steadycom_results['soln_time'] = str(total_time_steadycom)
+            steadycom_results['solve_time'] = total_time_steadycom
+
+            #no objective to return
+            steadycom_results['mu_objective'] = 0
+
+            steadycom_results['num_solves'] = num_solves[0]
+
+            steadycom_results['abundance'] = {model_id: "NaN" for model_id in X_vars}
+
+            #store the lower bound, flux, and upper bound of every reaction as columns
+            steadycom_results.set_reactions(steadycom_model.reactions,float("nan"))
+
+            #community exchanges, in the order of the exchange sets
+            steadycom_results.set_x_c(self.exch_sets,float("nan"))
+
+        #reactions left out as blocked carry no flux
+        self.add_removed_rxns(steadycom_results)
+
+        #return the solution that it got
+        return steadycom_results
+
+#built community of a worker process, set once per worker by _init_scan_worker
+_worker_community = None
+
+#runs once in each worker process of SteadyCom.scan_abundance
+#community - built SteadyCom object the worker solves its points with
+def _init_scan_worker(community):
+
+    global _worker_community
+
+    _worker_community = community
+
+    #the workers would otherwise all write into the log of the parent
+    _worker_community.open_log(os.devnull,_worker_community.log_level)
+
+#solves one point of an abundance scan in a worker process
+#X_k - dictionary of relative abundances keyed by model ID
+def _scan_point(X_k):
+
+    return _worker_community.scan_point(X_k)
+
+#solves one medium of a media scan in a worker process
+#point - tuple of the media dictionary and the fixed rates
+def _media_point(point):
+
+    return _worker_community.media_point(point[0],point[1])